@@ -2,12 +2,13 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
 from bubble.bookings.models import Booking, BookingStatus, Message
+from bubble.core.api.sparse import SparseFieldsSerializerMixin
 from bubble.items.api.serializers import ItemMinimalSerializer
 from bubble.items.models import Item
 from bubble.users.api.serializers import UserSerializer
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Detailed serializer for Booking where `item` is represented only by UUID."""
 
     item = serializers.PrimaryKeyRelatedField(queryset=Item.objects.published())
@@ -33,6 +34,9 @@ class BookingSerializer(serializers.ModelSerializer):
             "unread_messages_count",
         ]
         read_only_fields = ["id", "user", "created_at", "updated_at"]
+        expandable_fields = ["item_details", "user"]
+        # Annotated by the view
+        field_columns = {"unread_messages_count": []}
 
     def get_unread_messages_count(self, obj) -> int | None:
         """Return unread_messages_count if it exists as an annotated field."""
@@ -139,8 +143,7 @@ class BookingSerializer(serializers.ModelSerializer):
 class BookingListSerializer(BookingSerializer):
     item = serializers.PrimaryKeyRelatedField(read_only=True)
 
-    class Meta:
-        model = Booking
+    class Meta(BookingSerializer.Meta):
         fields = [
             "id",
             "status",
@@ -167,7 +170,8 @@ class MessageSerializer(serializers.ModelSerializer):
             "booking",
             "sender",
             "created_at",
+            "updated_at",
             "message",
             "is_read",
         ]
-        read_only_fields = ["id", "sender", "created_at"]
+        read_only_fields = ["id", "sender", "created_at", "updated_at"]
@@ -16,9 +16,19 @@ from bubble.bookings.api.serializers import (
     MessageSerializer,
 )
 from bubble.bookings.models import Booking, BookingStatus, Message
-
-
-class PublicBookingViewSet(viewsets.ReadOnlyModelViewSet):
+from bubble.core.api.conditional import ConditionalGetMixin
+from bubble.core.api.pagination import OptionalCursorPagination
+from bubble.core.api.response_cache import ResponseCacheMixin
+from bubble.core.api.sparse import SparseFieldsViewMixin
+from bubble.items.models import first_image_prefetch
+
+
+class PublicBookingViewSet(
+    SparseFieldsViewMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     Public read-only ViewSet for confirmed bookings.
 
@@ -28,6 +38,9 @@ class PublicBookingViewSet(viewsets.ReadOnlyModelViewSet):
 
     lookup_field = "id"
     serializer_class = BookingSerializer
+    pagination_class = OptionalCursorPagination
+    # Bookings show details of their item
+    conditional_fields = ("updated_at", "item__updated_at")
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
@@ -38,34 +51,55 @@ class PublicBookingViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ["created_at", "updated_at"]
     ordering = ["-created_at"]
     permission_classes = [IsAuthenticatedOrReadOnly]
+    list_cache_tags = ("bookings",)
+    object_cache_tag = "booking"
+    public_deletions = True
 
     def get_serializer_class(self):
         if self.action in ("list",):
             return BookingListSerializer
         return BookingSerializer
 
+    def get_row_cache_tags(self, row):
+        """Bookings show details of their item."""
+        tags = super().get_row_cache_tags(row)
+        item = row.get("item_details")
+        item_id = item.get("id") if isinstance(item, dict) else row.get("item")
+        return [*tags, f"item:{item_id}"] if item_id else tags
+
     def get_queryset(self):
         """Return only confirmed bookings."""
-        return Booking.objects.filter(status=BookingStatus.CONFIRMED).select_related(
-            "item", "user", "accepted_by"
+        return self.select_details(
+            Booking.objects.filter(status=BookingStatus.CONFIRMED)
         )
 
+    def select_details(self, queryset):
+        """Join the item and user only when their details are embedded."""
+        queryset = queryset.select_related("accepted_by")
+        if self.expands("item_details"):
+            queryset = queryset.select_related("item").prefetch_related(
+                first_image_prefetch("item__images")
+            )
+        if self.expands("user"):
+            queryset = queryset.select_related("user")
+        return queryset
+
 
 class BookingViewSet(viewsets.ModelViewSet, PublicBookingViewSet):
     """ViewSet for bookings with filtering and permissions."""
 
     permission_classes = [DjangoModelPermissions]
+    public_deletions = False
 
     def get_queryset(self):
-        return (
-            Booking.objects.get_for_user(self.request.user)
-            .select_related("item", "user", "accepted_by")
-            .annotate(
-                unread_messages_count=Count(
-                    "messages",
-                    filter=Q(messages__is_read=False)
-                    & ~Q(messages__sender=self.request.user),
-                )
+        queryset = self.select_details(Booking.objects.get_for_user(self.request.user))
+        if not self.wants("unread_messages_count"):
+            return queryset
+        return queryset.annotate(
+            unread_messages_count=Count(
+                "messages",
+                filter=Q(messages__is_read=False)
+                & ~Q(messages__sender=self.request.user),
             )
         )
 
@@ -122,6 +156,7 @@ class MessageViewSet(viewsets.ModelViewSet):
     lookup_field = "id"
     queryset = Message.objects.select_related("booking", "sender").all()
     serializer_class = MessageSerializer
+    pagination_class = OptionalCursorPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = MessageFilter
     ordering_fields = ["created_at", "sender"]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "bookings",
+            "0004_booking_exclude_overlapping_confirmed_bookings_with_time_to_and_more",
+        ),
+        ("items", "0006_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="booking_created_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["booking", "-created_at", "-id"],
+                name="message_booking_created_idx",
+            ),
+        ),
+    ]
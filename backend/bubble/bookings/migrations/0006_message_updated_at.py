@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    Message = apps.get_model("bookings", "Message")
+    Message.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bookings", "0005_keyset_pagination_indexes"),
+        ("items", "0009_item_updated_at_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["updated_at", "id"], name="booking_updated_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["updated_at", "id"], name="message_updated_at_id_idx"
+            ),
+        ),
+    ]
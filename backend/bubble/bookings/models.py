@@ -7,10 +7,10 @@ from django.db.models import F, Func, Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from djmoney.models.fields import MoneyField
-from guardian.shortcuts import get_objects_for_user
 from simple_history.models import HistoricalRecords
 
 from bubble.items.models import Item, money_defaults
+from bubble.items.permissions import item_access
 from config.settings.base import AUTH_USER_MODEL
 
 
@@ -24,16 +24,11 @@ class BookingStatus(models.IntegerChoices):
 
 class BookingManager(models.Manager):
     def get_for_user(self, user):
-        items_with_change_permission = get_objects_for_user(
-            user,
-            "items.change_item",
-            klass=Item,
-            accept_global_perms=False,
-        )
-
-        return self.filter(user=user) | self.filter(
-            item__in=items_with_change_permission
-        )
+        """Return bookings of the user and of items the user may change."""
+        condition = item_access(user, Item, prefix="item__")
+        if user.is_authenticated:
+            condition |= Q(user=user)
+        return self.filter(condition)
 
 
 class Booking(models.Model):
@@ -87,6 +82,14 @@ class Booking(models.Model):
     objects = BookingManager()
 
     class Meta:
+        indexes = [
+            # Keyset pagination, see bubble.core.api.pagination
+            models.Index(
+                fields=["-created_at", "-id"], name="booking_created_at_id_idx"
+            ),
+            # Change feeds, see bubble.core.api.pagination.DeltaPagination
+            models.Index(fields=["updated_at", "id"], name="booking_updated_at_id_idx"),
+        ]
         # Prevent overlapping confirmed bookings for the same item.
         # Uses PostgreSQL exclusion constraint on the tstzrange(time_from, time_to)
         # and item equality. Only applies when status is CONFIRMED.
@@ -111,6 +114,19 @@ class Booking(models.Model):
     def __str__(self):
         return f"Booking for {self.item.name} by {self.user}"
 
+    @classmethod
+    def sync_audiences(cls, bookings) -> dict:
+        """Return the booking users and those of the items, and if they are public."""
+        items = Item.objects.in_bulk({booking.item_id for booking in bookings})
+        item_audiences = Item.sync_audiences(items.values())
+        return {
+            booking.pk: (
+                [booking.user_id, *item_audiences[booking.item_id][0]],
+                booking.status == BookingStatus.CONFIRMED,
+            )
+            for booking in bookings
+        }
+
     @property
     def is_active(self):
         """Check if the booking is currently active."""
@@ -131,11 +147,44 @@ class Message(models.Model):
         related_name="sent_messages",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination of the messages of a booking
+            models.Index(
+                fields=["booking", "-created_at", "-id"],
+                name="message_booking_created_idx",
+            ),
+            # Change feeds, see bubble.core.api.pagination.DeltaPagination
+            models.Index(fields=["updated_at", "id"], name="message_updated_at_id_idx"),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.touch_booking()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.touch_booking()
+        return result
+
+    def touch_booking(self):
+        """Mark the booking as modified for conditional requests."""
+        Booking.objects.filter(pk=self.booking_id).update(updated_at=timezone.now())
+
+    @classmethod
+    def sync_audiences(cls, messages) -> dict:
+        """Return the users of the bookings, messages are never public."""
+        bookings = Booking.objects.in_bulk({message.booking_id for message in messages})
+        booking_audiences = Booking.sync_audiences(bookings.values())
+        return {
+            message.pk: (booking_audiences[message.booking_id][0], False)
+            for message in messages
+        }
@@ -1,12 +1,14 @@
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext as _
-from guardian.shortcuts import get_users_with_perms
 
+from bubble.core import tracing
+from bubble.core.api import response_cache
 from bubble.core.websocket_signals import send_message_notification
 from bubble.items.models import Item, ItemStatus
+from bubble.items.permissions import users_with_change_permission
 
 from .models import Booking, BookingStatus, Message
 
@@ -14,6 +16,7 @@ logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Message)
+@tracing.traced
 def notify_new_message(sender, instance: Message, created, **kwargs):
     """Notify item owners when a new message is created."""
     if not created:
@@ -22,10 +25,8 @@ def notify_new_message(sender, instance: Message, created, **kwargs):
     # Get the item from the booking
     item = instance.booking.item
 
-    # Get all users with change permission on this item
-    users_with_perms = get_users_with_perms(
-        item, only_with_perms_in=["change_item"], with_group_users=False
-    )
+    # Get the owner and all users with change permission on this item
+    users_with_perms = users_with_change_permission(item)
 
     if instance.booking.user != instance.sender:
         send_message_notification(
@@ -55,6 +56,7 @@ def notify_new_message(sender, instance: Message, created, **kwargs):
 
 
 @receiver(post_save, sender=Booking)
+@tracing.traced
 def notify_new_booking(sender, instance: Booking, created, **kwargs):
     """Notify item owners when a new booking is created."""
     if not created:
@@ -63,10 +65,8 @@ def notify_new_booking(sender, instance: Booking, created, **kwargs):
     # Get the item
     item = instance.item
 
-    # Get all users with change permission on this item
-    users_with_perms = get_users_with_perms(
-        item, only_with_perms_in=["change_item"], with_group_users=False
-    )
+    # Get the owner and all users with change permission on this item
+    users_with_perms = users_with_change_permission(item)
 
     # Send notification to each user with change permission (except the booking creator)
     for user in users_with_perms:
@@ -83,6 +83,7 @@ def notify_new_booking(sender, instance: Booking, created, **kwargs):
 
 
 @receiver(post_save, sender=Booking)
+@tracing.traced
 def update_item_status(sender, instance: Booking, created, **kwargs):
     """Notify item owners when a new booking is created."""
     # Get the item
@@ -107,3 +108,16 @@ def update_item_status(sender, instance: Booking, created, **kwargs):
         # If booking is cancelled or rejected, and item is sold or rented, set available
         item.status = ItemStatus.AVAILABLE
         item.save(update_fields=["status"])
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_cached_responses(sender, instance: Booking, **kwargs):
+    response_cache.invalidate("bookings", f"booking:{instance.pk}")
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_message_booking_cached_responses(sender, instance: Message, **kwargs):
+    """Messages change the modification time of their booking."""
+    response_cache.invalidate(f"booking:{instance.booking_id}")
@@ -1,19 +1,24 @@
 """Tests for booking API endpoints and auto-confirmation logic."""
 
+import uuid
 from datetime import timedelta
 
 from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
-from bubble.bookings.models import Booking, BookingStatus
+from bubble.bookings.models import Booking, BookingStatus, Message
 from bubble.bookings.tests.factories import (
     BookingFactory,
     ItemFactory,
     SelfServiceItemFactory,
 )
+from bubble.core.models import Tombstone
 from bubble.core.permissions_config import DefaultGroup
+from bubble.items.tests.utils import ListQueriesMixin, create_image
 from bubble.users.tests.factories import UserFactory
 
 
@@ -189,6 +194,16 @@ class PublicBookingViewSetTestCase(APITestCase):
         assert len(response.data["results"]) == 1
         assert response.data["results"][0]["id"] == str(self.confirmed_booking.id)
 
+    def test_changed_item_invalidates_detail_etag(self):
+        url = f"/api/public-bookings/{self.confirmed_booking.id}/"
+        etag = self.client.get(url)["ETag"]
+
+        self.item.name = "Renamed"
+        self.item.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
     def test_public_bookings_detail_confirmed(self):
         """Test confirmed booking detail is accessible."""
         response = self.client.get(f"/api/public-bookings/{self.confirmed_booking.id}/")
@@ -389,3 +404,101 @@ class BookingTimeToValidationTestCase(APITestCase):
         # Verify in database
         booking = Booking.objects.get(id=response.data["id"])
         assert booking.time_to is None
+
+
+class BookingListQueryCountTestCase(ListQueriesMixin, APITestCase):
+    """Test that booking lists load item images in a constant number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.default_group, _ = Group.objects.get_or_create(name=DefaultGroup.DEFAULT)
+        self.user = UserFactory()
+        self.user.groups.add(self.default_group)
+        self.client.force_authenticate(user=self.user)
+
+    def create_bookings(self, count):
+        for _ in range(count):
+            item = ItemFactory()
+            create_image(item)
+            BookingFactory(user=self.user, item=item, status=BookingStatus.CONFIRMED)
+
+    @staticmethod
+    def first_image(result):
+        return result["item_details"]["first_image"]
+
+    def test_booking_list(self):
+        self.assert_constant_queries(
+            "/api/bookings/", self.create_bookings, self.first_image
+        )
+
+    def test_public_booking_list(self):
+        self.assert_constant_queries(
+            "/api/public-bookings/", self.create_bookings, self.first_image
+        )
+
+    def test_collapsed_details_skip_joins(self):
+        self.create_bookings(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/bookings/", {"fields": "id,item,user", "expand": ""}
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        result = response.data["results"][0]
+        assert set(result) == {"id", "item", "user"}
+        assert result["user"] == self.user.pk
+        assert not [q for q in queries if "items_image" in q["sql"]]
+        assert not [q for q in queries if "bookings_message" in q["sql"]]
+
+
+class MessageDeltaSyncTestCase(APITestCase):
+    """Test the `updated_since` change feed of messages."""
+
+    def setUp(self):
+        self.booking = BookingFactory()
+        self.client.force_authenticate(user=self.booking.user)
+        self.since = timezone.now().isoformat()
+        self.message = Message.objects.create(
+            booking=self.booking, sender=self.booking.item.user, message="Hi"
+        )
+
+    def test_read_and_deleted_messages(self):
+        url = "/api/messages/"
+        response = self.client.get(
+            url, {"booking": str(self.booking.id), "updated_since": self.since}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.content
+        assert [row["id"] for row in response.data["results"]] == [str(self.message.id)]
+
+        self.message.is_read = True
+        self.message.save()
+        message_id = str(self.message.id)
+        self.message.delete()
+
+        response = self.client.get(
+            url, {"booking": str(self.booking.id), "updated_since": self.since}
+        )
+        assert response.data["results"] == []
+        assert response.data["deleted"] == [message_id]
+
+    def test_cascaded_deletions_are_recorded_in_bulk(self):
+        item = self.booking.item
+        for index in range(3):
+            booking = BookingFactory(item=item)
+            Message.objects.create(
+                booking=booking, sender=booking.user, message=f"Hi {index}"
+            )
+        message_ids = set(
+            Message.objects.filter(booking__item=item).values_list("pk", flat=True)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            item.delete()
+
+        # One insert of the tombstones per model, whatever the number of rows
+        inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "core_')]
+        assert len(inserts) == 3  # noqa: PLR2004
+        tombstones = Tombstone.objects.for_model(Message)
+        assert {uuid.UUID(t.object_id) for t in tombstones} == message_ids
+        assert all(item.user_id in t.users for t in tombstones)
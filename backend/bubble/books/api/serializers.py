@@ -24,6 +24,9 @@ class AuthorSerializer(serializers.ModelSerializer):
 
     def get_books_count(self, obj):
         """Get the number of books by this author."""
+        # Annotated by the views, counted for rows nested in books
+        if hasattr(obj, "books_count"):
+            return obj.books_count
         return obj.books.count()
 
 
@@ -55,6 +58,9 @@ class GenreSerializer(serializers.ModelSerializer):
 
     def get_books_count(self, obj):
         """Get the number of books in this genre."""
+        # Annotated by the views, counted for rows nested in books
+        if hasattr(obj, "books_count"):
+            return obj.books_count
         return obj.books.count()
 
 
@@ -75,6 +81,9 @@ class PublisherSerializer(serializers.ModelSerializer):
 
     def get_books_count(self, obj):
         """Get the number of books from this publisher."""
+        # Annotated by the views, counted for rows nested in books
+        if hasattr(obj, "books_count"):
+            return obj.books_count
         return obj.books.count()
 
 
@@ -95,6 +104,9 @@ class ShelfSerializer(serializers.ModelSerializer):
 
     def get_books_count(self, obj):
         """Get the number of books on this shelf."""
+        # Annotated by the views, counted for rows nested in books
+        if hasattr(obj, "books_count"):
+            return obj.books_count
         return obj.books.count()
 
 
@@ -153,3 +165,4 @@ class BookSerializer(ItemSerializer):
     class Meta(ItemSerializer.Meta):
         model = Book
         fields = "__all__"
+        expandable_fields = ["images", "authors", "genres", "verlag", "shelf"]
@@ -1,5 +1,6 @@
 """API views for books."""
 
+from django.db.models import Count, Prefetch
 from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
@@ -28,10 +29,14 @@ from bubble.books.api.serializers import (
 )
 from bubble.books.models import Author, Book, Genre, Publisher, Shelf
 from bubble.books.services import OpenLibraryService
+from bubble.core.api.conditional import ConditionalGetMixin
+from bubble.core.api.pagination import OptionalCursorPagination, PageSizePagination
+from bubble.core.api.response_cache import ResponseCacheMixin
+from bubble.core.api.sparse import SparseFieldsViewMixin
 from bubble.items.models import Item
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing authors.
 
@@ -43,9 +48,12 @@ class AuthorViewSet(viewsets.ModelViewSet):
     destroy: Delete an author
     """
 
-    queryset = Author.objects.all()
+    queryset = Author.objects.annotate(books_count=Count("books"))
     serializer_class = AuthorSerializer
+    pagination_class = PageSizePagination
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    # Every response shows book counts
+    list_cache_tags = ("authors",)
     lookup_field = "id"
     filterset_class = AuthorFilter
     filter_backends = [
@@ -58,7 +66,7 @@ class AuthorViewSet(viewsets.ModelViewSet):
     ordering = ["name"]
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing genres.
 
@@ -70,9 +78,14 @@ class GenreViewSet(viewsets.ModelViewSet):
     destroy: Delete a genre
     """
 
-    queryset = Genre.objects.all().select_related("parent_genre")
+    queryset = Genre.objects.select_related("parent_genre").annotate(
+        books_count=Count("books")
+    )
     serializer_class = GenreSerializer
+    pagination_class = PageSizePagination
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    # Every response shows book counts and parent genres
+    list_cache_tags = ("genres",)
     lookup_field = "id"
     filterset_class = GenreFilter
     filter_backends = [
@@ -85,7 +98,7 @@ class GenreViewSet(viewsets.ModelViewSet):
     ordering = ["name"]
 
 
-class PublisherViewSet(viewsets.ModelViewSet):
+class PublisherViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing publishers.
 
@@ -97,9 +110,12 @@ class PublisherViewSet(viewsets.ModelViewSet):
     destroy: Delete a publisher
     """
 
-    queryset = Publisher.objects.all()
+    queryset = Publisher.objects.annotate(books_count=Count("books"))
     serializer_class = PublisherSerializer
+    pagination_class = PageSizePagination
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    # Every response shows book counts
+    list_cache_tags = ("publishers",)
     lookup_field = "id"
     filterset_class = PublisherFilter
     filter_backends = [
@@ -124,7 +140,7 @@ class ShelfViewSet(viewsets.ModelViewSet):
     destroy: Delete a shelf
     """
 
-    queryset = Shelf.objects.all()
+    queryset = Shelf.objects.annotate(books_count=Count("books"))
     serializer_class = ShelfSerializer
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
     lookup_field = "id"
@@ -139,7 +155,7 @@ class ShelfViewSet(viewsets.ModelViewSet):
     ordering = ["name"]
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(SparseFieldsViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing books.
 
@@ -157,6 +173,7 @@ class BookViewSet(viewsets.ModelViewSet):
 
     serializer_class = BookSerializer
     permission_classes = [DjangoModelPermissions]
+    pagination_class = OptionalCursorPagination
     lookup_field = "id"
     filterset_class = BookFilter
     filter_backends = [
@@ -169,11 +186,30 @@ class BookViewSet(viewsets.ModelViewSet):
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        return (
-            Book.objects.get_for_user(self.request.user)
-            .select_related("user", "verlag", "shelf")
-            .prefetch_related("authors", "genres", "images")
-        )
+        queryset = Book.objects.get_for_user(self.request.user).select_related("user")
+        for relation in ("verlag", "shelf"):
+            if self.expands(relation) or self.wants(f"{relation}_name"):
+                queryset = queryset.select_related(relation)
+        for relation in ("authors", "genres"):
+            if self.wants(relation):
+                queryset = queryset.prefetch_related(self.related_books(relation))
+
+        first_image = self.wants("first_image", "first_image_details")
+        if self.action == "list":
+            return queryset.with_first_image() if first_image else queryset
+        if first_image or self.wants("images"):
+            return queryset.prefetch_related("images")
+        return queryset
+
+    def related_books(self, relation: str) -> Prefetch | str:
+        """Expanded details nest authors and genres with their number of books."""
+        if self.action == "list" or not self.expands(relation):
+            return relation
+        related = {
+            "authors": Author.objects.all(),
+            "genres": Genre.objects.select_related("parent_genre"),
+        }[relation]
+        return Prefetch(relation, queryset=related.annotate(books_count=Count("books")))
 
     def get_serializer_class(self):
         """Return appropriate serializer class based on action."""
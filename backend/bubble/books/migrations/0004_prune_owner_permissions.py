@@ -0,0 +1,66 @@
+from django.db import migrations
+from django.db.models import CharField, Exists, OuterRef
+from django.db.models.functions import Cast
+
+OWNER_CODENAMES = ["change_book", "delete_book"]
+
+
+def owner_permissions(apps):
+    Book = apps.get_model("books", "Book")
+    UserObjectPermission = apps.get_model("guardian", "UserObjectPermission")
+
+    owned = Book.objects.annotate(pk_text=Cast("pk", CharField())).filter(
+        pk_text=OuterRef("object_pk"), user=OuterRef("user")
+    )
+    return UserObjectPermission.objects.filter(
+        content_type__app_label="books",
+        content_type__model="book",
+        permission__codename__in=OWNER_CODENAMES,
+    ).filter(Exists(owned))
+
+
+def prune_owner_permissions(apps, schema_editor):
+    """Owners get these permissions from OwnerPermissionBackend."""
+    owner_permissions(apps).delete()
+
+
+def restore_owner_permissions(apps, schema_editor):
+    Book = apps.get_model("books", "Book")
+    UserObjectPermission = apps.get_model("guardian", "UserObjectPermission")
+    Permission = apps.get_model("auth", "Permission")
+
+    for permission in Permission.objects.filter(
+        content_type__app_label="books",
+        content_type__model="book",
+        codename__in=OWNER_CODENAMES,
+    ):
+        UserObjectPermission.objects.bulk_create(
+            [
+                UserObjectPermission(
+                    permission=permission,
+                    content_type_id=permission.content_type_id,
+                    object_pk=str(book_id),
+                    user_id=user_id,
+                )
+                for book_id, user_id in Book.objects.filter(
+                    user__isnull=False
+                ).values_list("pk", "user_id")
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0003_initial"),
+        (
+            "guardian",
+            "0003_remove_groupobjectpermission_guardian_gr_content_ae6aec_idx_and_more",
+        ),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(prune_owner_permissions, restore_owner_permissions),
+    ]
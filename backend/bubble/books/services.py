@@ -6,6 +6,8 @@ from django.core.files.base import ContentFile
 from django.utils.text import slugify
 from rest_framework.exceptions import APIException, ValidationError
 
+from bubble.core import tracing
+
 from .models import Author, Book, Publisher
 
 
@@ -42,7 +44,8 @@ class OpenLibraryService:
 
         # Use isbnlib.meta to fetch metadata from multiple providers
         # This tries multiple services (Google Books, Open Library, etc.)
-        metadata = isbnlib.meta(clean_isbn, service="default")
+        with tracing.span("isbnlib.meta", kind="client", isbn=clean_isbn):
+            metadata = isbnlib.meta(clean_isbn, service="default")
         if not metadata:
             msg = f"No metadata found for ISBN: {isbn}"
             raise ISBNMetadataNotFoundError(msg)
@@ -122,7 +125,8 @@ class OpenLibraryService:
         # isbnlib.cover returns a dict with different sizes:
         # 'smallThumbnail', 'thumbnail', etc.
         try:
-            cover_urls = isbnlib.cover(clean_isbn)
+            with tracing.span("isbnlib.cover", kind="client", isbn=clean_isbn):
+                cover_urls = isbnlib.cover(clean_isbn)
             if not cover_urls or not isinstance(cover_urls, dict):
                 return
 
@@ -134,11 +138,12 @@ class OpenLibraryService:
             )
 
             if thumbnail_url:
-                response = requests.get(thumbnail_url, timeout=10)
+                with tracing.span("GET", kind="client", **{"url.full": thumbnail_url}):
+                    response = requests.get(thumbnail_url, timeout=10)
                 response.raise_for_status()
                 image_name = f"{slugify(book.name)}-cover.jpg"
                 book.images.create(  # pyright: ignore[reportAttributeAccessIssue]
-                    image=ContentFile(response.content, name=image_name)
+                    original=ContentFile(response.content, name=image_name)
                 )
         except (requests.RequestException, isbnlib.ISBNLibException):
             # Silently fail if cover cannot be fetched
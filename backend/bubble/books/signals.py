@@ -1,15 +1,62 @@
 """Signals for the books app."""
 
-from django.db import transaction
-from django.db.models.signals import post_save
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
+from simple_history.models import HistoricalRecords
 
-from bubble.items.models import CategoryType, Item
+from bubble.core import tracing
+from bubble.core.api import response_cache
+from bubble.items.models import CategoryType, Item, items_bulk_saved
+from bubble.items.signals import (
+    invalidate_item_cached_responses,
+    refresh_catalogue_on_commit,
+    remember_item_category,
+)
 
-from .models import Book
+from .models import Author, Book, Genre, Publisher, Shelf
+
+
+def insert_books(items, history_user=None) -> None:
+    """
+    Promote existing `items` to books.
+
+    The item rows are kept as they are, only the rows of the books table are
+    inserted, in one statement, and the history of the new books is recorded.
+    """
+    item_fields = Item._meta.concrete_fields  # noqa: SLF001
+    books = [
+        Book(
+            item_ptr=item, **{f.attname: getattr(item, f.attname) for f in item_fields}
+        )
+        for item in items
+    ]
+    fields = Book._meta.local_concrete_fields  # noqa: SLF001
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    row = f"({', '.join(['%s'] * len(fields))})"
+    params = [
+        field.get_db_prep_save(getattr(book, field.attname), connection)
+        for book in books
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(Book._meta.db_table)} "  # noqa: SLF001, S608
+            f"({columns}) VALUES {', '.join([row] * len(books))}",
+            params,
+        )
+    Book.history.bulk_history_create(books, default_user=history_user)
 
 
 @receiver(post_save, sender=Item)
+@tracing.traced
 def promote_item_to_book(sender, instance, created, **kwargs):
     """
     Automatically promote an Item to a Book when category is 'books'.
@@ -28,19 +75,43 @@ def promote_item_to_book(sender, instance, created, **kwargs):
         return
 
     # Check if a Book entry already exists for this Item
-    try:
-        Book.objects.get(item_ptr_id=instance.pk)
-    except Book.DoesNotExist:
-        # Promote the Item to a Book
-        with transaction.atomic():
-            # Create a Book instance that points to this Item
-            book = Book(item_ptr_id=instance.pk)
-            # Copy all fields from Item to Book (they share the same database row)
-            book.__dict__.update(instance.__dict__)
-            book.save()
+    if not Book.objects.filter(item_ptr_id=instance.pk).exists():
+        request = getattr(HistoricalRecords.context, "request", None)
+        user = getattr(request, "user", None)
+        insert_books(
+            [instance], history_user=user if user and user.is_authenticated else None
+        )
+
+
+@receiver(items_bulk_saved, sender=Item)
+def promote_items_to_books(
+    sender, items, created, update_fields, history_user=None, **kwargs
+):
+    """
+    Promote items saved in bulk to books with a single insert.
+
+    Same as `promote_item_to_book` for every item, but the rows of the books
+    table and their history are created together.
+    """
+    if not created and "category" not in update_fields:
+        return
+
+    candidates = {
+        item.pk: item
+        for item in items
+        if not isinstance(item, Book) and item.category == CategoryType.BOOKS
+    }
+    if candidates and not created:
+        for pk in Book.objects.filter(pk__in=candidates).values_list("pk", flat=True):
+            del candidates[pk]
+    if not candidates:
+        return
+
+    insert_books(candidates.values(), history_user=history_user)
 
 
 @receiver(post_save, sender=Item)
+@tracing.traced
 def demote_item_book(sender, instance, created, **kwargs):
     """
     Automatically demote a Book to a regular Item when category is changed from 'books'.
@@ -59,3 +130,100 @@ def demote_item_book(sender, instance, created, **kwargs):
         book.delete()
     except Book.DoesNotExist:
         pass
+
+
+@receiver(post_save, sender=Book)
+def refresh_book_catalogue_entry(sender, instance, **kwargs):
+    """Keep the catalogue entry current, saving a book sends no item signal."""
+    if not kwargs.get("raw", False):
+        refresh_catalogue_on_commit([instance.pk])
+
+
+# Books change category like items, see `invalidate_book_cached_responses`
+pre_save.connect(remember_item_category, sender=Book)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_cached_responses(sender, instance, **kwargs):
+    """Books are items and counted by authors, genres and publishers."""
+    invalidate_item_cached_responses(sender, instance, **kwargs)
+    response_cache.invalidate("authors", "genres", "publishers")
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def invalidate_author_book_counts(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        response_cache.invalidate("authors")
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def invalidate_genre_book_counts(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        response_cache.invalidate("genres")
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_cached_responses(sender, **kwargs):
+    response_cache.invalidate("authors")
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_cached_responses(sender, **kwargs):
+    response_cache.invalidate("genres")
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def invalidate_publisher_cached_responses(sender, **kwargs):
+    response_cache.invalidate("publishers")
+
+
+def touch_books(condition: Q) -> None:
+    """Mark books as modified whose responses show a changed related row."""
+    Book.objects.filter(pk__in=Book.objects.filter(condition).values("pk")).touch()
+
+
+# Responses of books show the names of these rows, the genres also the name
+# of their parent genre
+RELATED_BOOKS = {
+    Author: lambda instance: Q(authors=instance),
+    Genre: lambda instance: Q(genres=instance) | Q(genres__parent_genre=instance),
+    Publisher: lambda instance: Q(verlag=instance),
+    Shelf: lambda instance: Q(shelf=instance),
+}
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Shelf)
+def touch_books_of_changed_row(sender, instance, created, **kwargs):
+    """Keep conditional GETs of books current, see ConditionalGetMixin."""
+    if not created and not kwargs.get("raw", False):
+        touch_books(RELATED_BOOKS[sender](instance))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Publisher)
+@receiver(pre_delete, sender=Shelf)
+def touch_books_of_deleted_row(sender, instance, **kwargs):
+    """The relations are removed without signals, so touch the books before."""
+    touch_books(RELATED_BOOKS[sender](instance))
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genres.through)
+def touch_books_of_changed_relations(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            touch_books(Q(pk=instance.pk))
+    elif action in ("post_add", "post_remove"):
+        touch_books(Q(pk__in=pk_set))
+    elif action == "pre_clear":
+        touch_books(RELATED_BOOKS[type(instance)](instance))
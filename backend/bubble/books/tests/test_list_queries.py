@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from bubble.books.api.serializers import BookListSerializer
+from bubble.books.models import Author, Book, Genre, Publisher
+from bubble.core.permissions_config import DefaultGroup
+from bubble.core.signals import create_default_groups_and_permissions
+from bubble.items.tests.utils import ListQueriesMixin, create_image
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestBookListQueries(ListQueriesMixin):
+    def setup_method(self):
+        create_default_groups_and_permissions()
+
+        self.user = User.objects.create_user(  # pyright: ignore[reportAttributeAccessIssue]
+            username="reader",
+            password="test12345",  # noqa: S106
+        )
+        self.user.groups.add(Group.objects.get(name=DefaultGroup.DEFAULT))  # pyright: ignore[reportAttributeAccessIssue]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_books(self, count):
+        for index in range(count):
+            create_image(Book.objects.create(name=f"Book {index}", user=self.user))
+
+    def test_first_images_in_constant_queries(self):
+        self.assert_constant_queries("/api/books/", self.create_books)
+
+    def test_list_matches_generic_serializer(self):
+        book = Book.objects.create(
+            name="Momo",
+            user=self.user,
+            year=1973,
+            metadata={"pages": 304},
+            verlag=Publisher.objects.create(name="Thienemann"),
+        )
+        book.authors.add(Author.objects.create(name="Michael Ende"))
+        book.genres.add(Genre.objects.create(name="Fantasy"))
+
+        _, results = self.count_queries("/api/books/")
+
+        book = Book.objects.prefetch_related("authors", "genres").get(pk=book.pk)
+        serializer = BookListSerializer(context={"request": None})
+        assert results[0] == serializers.Serializer.to_representation(serializer, book)
+        assert results[0]["authors"] == ["Michael Ende"]
+        assert results[0]["verlag_name"] == "Thienemann"
+
+    def test_collapsed_authors_in_detail(self):
+        book = Book.objects.create(name="Momo", user=self.user)
+        author = Author.objects.create(name="Michael Ende")
+        book.authors.add(author)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f"/api/books/{book.id}/", {"fields": "id,name,authors", "expand": ""}
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "id": str(book.id),
+            "name": "Momo",
+            "authors": [author.pk],
+        }
+        assert not [q for q in queries if "COUNT" in q["sql"] and "authors" in q["sql"]]
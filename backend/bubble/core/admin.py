@@ -1 +1,187 @@
-# Register your models here.
+from collections import Counter
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _
+
+from .models import RequestProfile, SlowQuery
+
+# Rows of queries and functions shown on the change page of profiles
+TOP_ROWS = 20
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "protocol",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "query_time_ms",
+        "user",
+    )
+    list_filter = ("protocol", "method", "created_at")
+    search_fields = ("path", "user__username")
+    ordering = ("-created_at",)
+    exclude = ("stacks", "queries")
+    readonly_fields = (
+        "created_at",
+        "user",
+        "protocol",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "sample_count",
+        "query_count",
+        "query_time_ms",
+        "downloads",
+        "slowest_queries",
+        "hottest_functions",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<path:object_id>/download/",
+                self.admin_site.admin_view(self.download),
+                name="core_requestprofile_download",
+            ),
+            *super().get_urls(),
+        ]
+
+    def download(self, request, object_id):
+        """Return the report as JSON, or the stacks with `?format=folded`."""
+        profile = get_object_or_404(RequestProfile, pk=object_id)
+        if not self.has_view_permission(request, profile):
+            raise PermissionDenied
+        if request.GET.get("format") == "folded":
+            response = HttpResponse(profile.folded_stacks(), content_type="text/plain")
+            filename = f"profile-{profile.pk}.folded"
+        else:
+            response = JsonResponse(
+                {
+                    "path": profile.path,
+                    "method": profile.method,
+                    "created_at": profile.created_at,
+                    "duration_ms": profile.duration_ms,
+                    "stacks": profile.stacks,
+                    "queries": profile.queries,
+                }
+            )
+            filename = f"profile-{profile.pk}.json"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.display(description=_("Download"))
+    def downloads(self, obj):
+        url = reverse("admin:core_requestprofile_download", args=[obj.pk])
+        return format_html(
+            '<a href="{}">JSON</a> · <a href="{}?format=folded">{}</a>',
+            url,
+            url,
+            _("Folded stacks"),
+        )
+
+    @admin.display(description=_("Slowest queries"))
+    def slowest_queries(self, obj):
+        queries = sorted(obj.queries, key=lambda q: q["duration_ms"], reverse=True)
+        return format_html(
+            "<table>{}</table>",
+            format_html_join(
+                "",
+                "<tr><td>{}&nbsp;ms</td><td>{}</td><td><code>{}</code></td></tr>",
+                (
+                    (query["duration_ms"], query["origin"], query["sql"])
+                    for query in queries[:TOP_ROWS]
+                ),
+            ),
+        )
+
+    @admin.display(description=_("Hottest functions"))
+    def hottest_functions(self, obj):
+        """Functions by the samples they were running in themselves."""
+        functions = Counter()
+        for stack, count in obj.stacks.items():
+            functions[stack.rsplit(";", 1)[-1]] += count
+        return format_html(
+            "<table>{}</table>",
+            format_html_join(
+                "",
+                "<tr><td>{}</td><td><code>{}</code></td></tr>",
+                (
+                    (count, function)
+                    for function, count in functions.most_common(TOP_ROWS)
+                ),
+            ),
+        )
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Slow queries by total time, delete them to start over, e.g. after a fix."""
+
+    list_display = (
+        "short_sql",
+        "source",
+        "count",
+        "mean_time",
+        "max_ms",
+        "total_ms",
+        "last_seen",
+        "explained",
+    )
+    list_filter = ("last_seen", "explained_at")
+    search_fields = ("sql", "source", "origin")
+    ordering = ("-total_ms",)
+    exclude = ("plan",)
+    readonly_fields = (
+        "fingerprint",
+        "sql",
+        "source",
+        "origin",
+        "stack",
+        "count",
+        "mean_time",
+        "max_ms",
+        "total_ms",
+        "first_seen",
+        "last_seen",
+        "explained_at",
+        "query_plan",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description=_("SQL"))
+    def short_sql(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description=_("Mean ms"))
+    def mean_time(self, obj):
+        return round(obj.mean_ms, 1)
+
+    @admin.display(description=_("Plan"), boolean=True)
+    def explained(self, obj):
+        return bool(obj.plan)
+
+    @admin.display(description=_("Query plan"))
+    def query_plan(self, obj):
+        return format_html("<pre>{}</pre>", obj.plan)
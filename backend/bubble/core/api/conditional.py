@@ -0,0 +1,142 @@
+"""Conditional GET support for API viewsets."""
+
+import hashlib
+from functools import partial
+
+from django.core.cache import cache
+from django.db.models import Count, F, Max
+from django.db.models.functions import Greatest
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from bubble.core import metrics
+
+REQUESTS_METRIC = "conditional_get.requests"
+NOT_MODIFIED_METRIC = "conditional_get.not_modified"
+BYTES_SAVED_METRIC = "conditional_get.bytes_saved"
+METRICS = (REQUESTS_METRIC, NOT_MODIFIED_METRIC, BYTES_SAVED_METRIC)
+
+# Annotation of detail objects with their latest `conditional_fields`
+LAST_MODIFIED = "conditional_last_modified"
+
+
+class ConditionalGetMixin:
+    """
+    Answer list and retrieve requests with 304 Not Modified when possible.
+
+    List validators come from one aggregate query over the filtered
+    queryset: the latest of `conditional_fields` and the number of rows, so
+    deleted rows change the ETag as well. Detail validators are annotated on
+    the object `get_object()` loads anyway, which also checks object
+    permissions before a 304. Nothing is serialized for a 304 response.
+
+    Models keep their `updated_at` current when related rows shown in the
+    response change, e.g. images of an item, messages of a booking, or
+    authors, genres, publishers and shelves of a book. ETags do not change
+    with related rows that do not touch their parent, e.g. the users
+    embedded in bookings. List ETags also miss rows that leave and enter the
+    list together when the count stays the same and no entering row is newer,
+    e.g. when one item is unshared and an older one shared at once.
+
+    Detail responses also carry a Last-Modified header. List responses only
+    use the ETag, as deleting a row does not advance the latest timestamp.
+    """
+
+    conditional_fields = ("updated_at",)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        last_modified, count = self.get_validators(queryset)
+        respond = partial(super().list, request, *args, **kwargs)
+        if not count:
+            return respond()
+        etag = self.get_etag(request, last_modified, count)
+        return self.conditional(request, etag, None, respond)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Raises if the object does not exist or permissions deny access
+        instance = self.get_object()
+        last_modified = getattr(instance, LAST_MODIFIED, None)
+        respond = partial(self.respond_with, instance)
+        if last_modified is None:
+            # E.g. an object built by an overridden `get_object()`
+            return respond()
+        etag = self.get_etag(request, last_modified, 1)
+        return self.conditional(request, etag, last_modified, respond)
+
+    def respond_with(self, instance):
+        """Serialize `instance` like `RetrieveModelMixin.retrieve()`."""
+        return Response(self.get_serializer(instance).data)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == "retrieve":
+            queryset = queryset.annotate(**{LAST_MODIFIED: self.get_last_modified()})
+        return queryset
+
+    def get_last_modified(self):
+        """Return the latest of `conditional_fields` as an expression."""
+        fields = [F(field) for field in self.conditional_fields]
+        return Greatest(*fields) if len(fields) > 1 else fields[0]
+
+    def conditional(self, request, etag, last_modified, respond):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        metrics.incr(REQUESTS_METRIC)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if not_modified is not None:
+            metrics.incr(NOT_MODIFIED_METRIC)
+            metrics.incr(BYTES_SAVED_METRIC, self.get_cached_size(etag))
+            return not_modified
+
+        response = respond()
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def get_validators(self, queryset):
+        """Return the latest modification time and the number of rows."""
+        aggregates = {
+            f"last_{index}": Max(field)
+            for index, field in enumerate(self.conditional_fields)
+        }
+        result = queryset.order_by().aggregate(count=Count("pk"), **aggregates)
+        timestamps = [result[name] for name in aggregates if result[name] is not None]
+        return max(timestamps, default=None), result["count"]
+
+    def get_etag(self, request, last_modified, count) -> str:
+        """Hash the validators with everything else the response depends on."""
+        parts = [
+            request.get_full_path(),
+            str(request.user.pk),
+            request.accepted_media_type or "",
+            last_modified.isoformat() if last_modified else "",
+            str(count),
+        ]
+        digest = hashlib.sha256("|".join(parts).encode()).hexdigest()
+        return quote_etag(digest[:32])
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = response.get("ETag")
+        if (
+            etag
+            and response.status_code == status.HTTP_200_OK
+            and isinstance(response, SimpleTemplateResponse)
+        ):
+            # Render now to remember the size a 304 response saves
+            response.render()
+            self.set_cached_size(etag, len(response.content))
+        return response
+
+    def get_cached_size(self, etag: str) -> int:
+        return cache.get(f"conditional_get.size:{etag}", 0)
+
+    def set_cached_size(self, etag: str, size: int) -> None:
+        cache.set(f"conditional_get.size:{etag}", size)
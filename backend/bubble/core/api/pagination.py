@@ -0,0 +1,320 @@
+"""Pagination classes for the API."""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+
+from bubble.core.models import Tombstone
+
+TRUE_VALUES = ("1", "true", "yes")
+
+# Position in a change feed: modification time and primary key of the last row
+Position = tuple[datetime, str | None]
+
+
+def tie_breaker(model) -> str:
+    """Return `id` where available, inherited models are indexed by it."""
+    fields = {field.name for field in model._meta.fields}  # noqa: SLF001
+    return "id" if "id" in fields else "pk"
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination ordered by `created_at` with `id` as tie breaker.
+
+    Pages are fetched with a range condition on the ordering instead of an
+    OFFSET, so every page costs the same. The total count is only computed
+    when requested with `count=true`.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    count_query_param = "count"
+    count_query_description = _("Include the total number of results.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() in (
+            TRUE_VALUES
+        ):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        """Append `id` to the requested ordering to make it unique."""
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        opts = queryset.model._meta  # noqa: SLF001
+        if not any(
+            field.lstrip("-") in ("id", "pk", opts.pk.name) for field in ordering
+        ):
+            direction = "-" if ordering[0].startswith("-") else ""
+            ordering = (*ordering, f"{direction}{tie_breaker(queryset.model)}")
+        return ordering
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "count": self.count,
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {
+            "type": "integer",
+            "nullable": True,
+            "example": 123,
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.count_query_description),
+                "schema": {"type": "boolean"},
+            },
+        ]
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = _("The cursor is too old, reload all results.")
+    default_code = "cursor_expired"
+
+
+def changed_after(field: str, tie: str, position: Position) -> Q:
+    timestamp, pk = position
+    if pk is None:
+        return Q(**{f"{field}__gte": timestamp})
+    return Q(**{f"{field}__gt": timestamp}) | Q(**{field: timestamp, f"{tie}__gt": pk})
+
+
+class DeltaPagination(BasePagination):
+    """
+    Change feed of the rows modified and deleted since a cursor.
+
+    Clients pass the time of their last full download as `updated_since` and
+    afterwards the `cursor` of the previous response. Responses contain the
+    changed rows ordered by modification time, the primary keys of rows
+    deleted since, a new cursor and whether more changes are waiting. Rows
+    may be repeated, clients apply them in order.
+
+    Only rows still in the queryset are returned, deletions are known for
+    the `SYNC_MODELS`. Views set `public_deletions` to list those of rows
+    that were public, otherwise only those of rows the user could see.
+    """
+
+    query_param = "updated_since"
+    query_description = _(
+        "Return changes since this ISO 8601 time or the cursor of a previous "
+        "change feed response."
+    )
+    updated_field = "updated_at"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        model = queryset.model
+        if model._meta.label not in settings.SYNC_MODELS:  # noqa: SLF001
+            raise ValidationError(
+                {self.query_param: _("Changes are not tracked for these results.")}
+            )
+        rows_since, deleted_since = self.decode_cursor(
+            request.query_params[self.query_param]
+        )
+        size = self.get_page_size(request)
+
+        tie = tie_breaker(model)
+        rows = list(
+            queryset.filter(
+                changed_after(self.updated_field, tie, rows_since)
+            ).order_by(self.updated_field, tie)[: size + 1]
+        )
+        tombstones = list(
+            self.get_tombstones(model, request, view)
+            .filter(changed_after("deleted_at", "id", deleted_since))
+            .order_by("deleted_at", "id")[: size + 1]
+        )
+        rows_done = len(rows) <= size
+        deleted_done = len(tombstones) <= size
+        rows, tombstones = rows[:size], tombstones[:size]
+
+        self.has_more = not (rows_done and deleted_done)
+        self.deleted = [tombstone.object_id for tombstone in tombstones]
+        last_row = last_deleted = None
+        if rows:
+            last_row = (getattr(rows[-1], self.updated_field), str(rows[-1].pk))
+        if tombstones:
+            last_deleted = (tombstones[-1].deleted_at, str(tombstones[-1].pk))
+        self.cursor = self.encode_cursor(
+            self.advance(rows_since, last_row, caught_up=rows_done),
+            self.advance(deleted_since, last_deleted, caught_up=deleted_done),
+        )
+        return rows
+
+    def get_tombstones(self, model, request, view):
+        """Return the tombstones of deleted rows the client could have listed."""
+        tombstones = Tombstone.objects.for_model(model)
+        if getattr(view, "public_deletions", False):
+            return tombstones.filter(public=True)
+        if not request.user.is_authenticated:
+            return tombstones.none()
+        return tombstones.filter(users__contains=[request.user.pk])
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def advance(
+        self, previous: Position, last: Position | None, *, caught_up: bool
+    ) -> Position:
+        """Return the position of the next request, never before `previous`."""
+        last = last or previous
+        if not caught_up:
+            return last
+        horizon = timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        if last[0] < horizon:
+            return last
+        # Repeat recent changes, running transactions may still commit some
+        return previous if previous[0] >= horizon else (horizon, None)
+
+    def decode_cursor(self, value: str) -> tuple[Position, Position]:
+        timestamp = parse_datetime(value)
+        if timestamp is not None:
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            positions = ((timestamp, None), (timestamp, None))
+        else:
+            try:
+                raw = json.loads(base64.urlsafe_b64decode(value.encode()))
+                rows, deleted = (
+                    (datetime.fromisoformat(timestamp), pk) for timestamp, pk in raw
+                )
+                positions = (rows, deleted)
+            except (binascii.Error, TypeError, ValueError):
+                positions = None
+            # Cursors are encoded with aware times, naive ones were altered
+            if positions is None or any(
+                timezone.is_naive(timestamp) for timestamp, _pk in positions
+            ):
+                raise ValidationError({self.query_param: _("Invalid time or cursor.")})
+
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        if positions[1][0] < timezone.now() - retention:
+            raise CursorExpired
+        return positions
+
+    def encode_cursor(self, rows: Position, deleted: Position) -> str:
+        raw = [(timestamp.isoformat(), pk) for timestamp, pk in (rows, deleted)]
+        return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "results": data,
+                "deleted": self.deleted,
+                "cursor": self.cursor,
+                "has_more": self.has_more,
+            }
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.query_description),
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class PageSizePagination(PageNumberPagination):
+    """Page number pagination with the page size chosen by the client."""
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page number pagination that switches to keyset pagination on request.
+
+    Clients opt in with `pagination=cursor` and then follow the `next` and
+    `previous` links, which carry the `cursor` parameter. With
+    `updated_since` the response is a change feed instead, see
+    `DeltaPagination`. Without either the responses are unchanged.
+    """
+
+    cursor_class = KeysetPagination
+    delta_class = DeltaPagination
+    pagination_query_param = "pagination"
+    pagination_query_description = _("Use `cursor` for keyset pagination.")
+
+    def use_cursor(self, request) -> bool:
+        return (
+            self.cursor_class.cursor_query_param in request.query_params
+            or request.query_params.get(self.pagination_query_param) == "cursor"
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.delta_class.query_param in request.query_params:
+            self.cursor_paginator = self.delta_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.pagination_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.pagination_query_description),
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+            *self.cursor_class().get_schema_operation_parameters(view),
+            *self.delta_class().get_schema_operation_parameters(view),
+        ]
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
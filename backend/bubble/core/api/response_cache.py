@@ -0,0 +1,202 @@
+"""Cache of anonymous API responses, invalidated by tags.
+
+Anonymous visitors all receive the same responses, so read requests without
+a user are answered from the cache. Every entry records the versions of the
+tags it depends on, e.g. `item:<id>` for an item or `items` for every list of
+items. Signals call `invalidate()` when the data behind a tag changes, which
+gives the tag a new version and so retires all entries recorded with the old
+one. Entries expire after `RESPONSE_CACHE_TIMEOUT` seconds at the latest.
+"""
+
+import hashlib
+import time
+from collections.abc import Iterable, Sequence
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.translation import get_language
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+from bubble.core import metrics
+
+HITS_METRIC = "response_cache.hits"
+MISSES_METRIC = "response_cache.misses"
+HIT_MICROSECONDS_METRIC = "response_cache.hit_microseconds"
+MISS_MICROSECONDS_METRIC = "response_cache.miss_microseconds"
+METRICS = (
+    HITS_METRIC,
+    MISSES_METRIC,
+    HIT_MICROSECONDS_METRIC,
+    MISS_MICROSECONDS_METRIC,
+)
+
+# Response headers kept with the cached content
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+# Tag of every cached response, e.g. to retire all of them after a deploy
+ALL_TAG = "all"
+
+
+def tag_key(tag: str) -> str:
+    return f"response_cache.tag:{tag}"
+
+
+def tag_versions(tags: Iterable[str]) -> dict[str, int]:
+    """Return the current version of every tag, 0 for tags never invalidated."""
+    keys = {tag_key(tag): tag for tag in tags}
+    values = cache.get_many(keys)
+    return {tag: values.get(key, 0) for key, tag in keys.items()}
+
+
+def bump(tags: Iterable[str]) -> None:
+    version = time.time_ns()
+    cache.set_many({tag_key(tag): version for tag in tags}, None)
+
+
+def invalidate(*tags: str) -> None:
+    """
+    Retire all cached responses depending on any of `tags`.
+
+    Runs again after the commit, so responses other requests cached from the
+    state before the transaction was committed are retired as well.
+    """
+    if not tags:
+        return
+    bump(tags)
+    transaction.on_commit(partial(bump, tags))
+
+
+def elapsed_microseconds(start: float) -> int:
+    return round((time.perf_counter() - start) * 1_000_000)
+
+
+class ResponseCacheMixin:
+    """
+    Answer read requests of anonymous users from the response cache.
+
+    Lists depend on `list_cache_tags`. Details and the rows of lists depend
+    on `<object_cache_tag>:<id>`, views without an object tag use the list
+    tags for details too. Views override `get_cache_tags()` and
+    `get_row_cache_tags()` for other dependencies.
+    """
+
+    list_cache_tags: tuple[str, ...] = ()
+    object_cache_tag: str | None = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, super().retrieve, *args, **kwargs)
+
+    def is_cacheable(self, request) -> bool:
+        return (
+            settings.RESPONSE_CACHE_TIMEOUT > 0
+            and request.method in SAFE_METHODS
+            and not request.user.is_authenticated
+        )
+
+    def get_cache_key(self, request) -> str:
+        """Identify a response by path, sorted query parameters and format."""
+        query = sorted(
+            (name, sorted(values)) for name, values in request.query_params.lists()
+        )
+        parts = [
+            request.get_host(),
+            request.path,
+            repr(query),
+            request.accepted_media_type or "",
+            get_language() or "",
+        ]
+        digest = hashlib.sha256("|".join(parts).encode()).hexdigest()
+        return f"response_cache:{digest}"
+
+    def get_cache_tags(self, request) -> Sequence[str]:
+        """Return the tags known before the response is computed."""
+        if getattr(self, "action", None) == "retrieve" and self.object_cache_tag:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return [f"{self.object_cache_tag}:{self.kwargs[lookup_url_kwarg]}"]
+        return list(self.list_cache_tags)
+
+    def get_row_cache_tags(self, row: dict) -> Sequence[str]:
+        """Return the tags of one serialized object of the response."""
+        if self.object_cache_tag and "id" in row:
+            return [f"{self.object_cache_tag}:{row['id']}"]
+        return []
+
+    def get_response_cache_tags(self, data) -> set[str]:
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            data = data["results"]
+        rows = data if isinstance(data, list) else [data]
+        tags = set()
+        for row in rows:
+            if isinstance(row, dict):
+                tags.update(self.get_row_cache_tags(row))
+        return tags
+
+    def cached(self, request, handler, *args, **kwargs):
+        self.response_cache_pending = None
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        start = time.perf_counter()
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None and tag_versions(entry["tags"]) == entry["tags"]:
+            metrics.incr(HITS_METRIC)
+            metrics.incr(HIT_MICROSECONDS_METRIC, elapsed_microseconds(start))
+            return self.cached_response(request, entry)
+
+        # Read versions first, changes while computing retire the entry
+        versions = tag_versions([ALL_TAG, *self.get_cache_tags(request)])
+        response = handler(request, *args, **kwargs)
+        self.response_cache_pending = (key, versions, start)
+        return response
+
+    def cached_response(self, request, entry) -> HttpResponse:
+        not_modified = get_conditional_response(
+            request,
+            etag=entry["headers"].get("ETag"),
+        )
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        for header, value in entry["headers"].items():
+            response[header] = value
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        pending = getattr(self, "response_cache_pending", None)
+        self.response_cache_pending = None
+        if pending is None:
+            return response
+
+        key, versions, start = pending
+        if response.status_code == status.HTTP_200_OK:
+            self.store(key, response, versions)
+        metrics.incr(MISSES_METRIC)
+        metrics.incr(MISS_MICROSECONDS_METRIC, elapsed_microseconds(start))
+        return response
+
+    def store(self, key: str, response, versions: dict[str, int]) -> None:
+        if isinstance(response, SimpleTemplateResponse):
+            response.render()
+        tags = self.get_response_cache_tags(getattr(response, "data", None))
+        entry = {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "headers": {
+                header: response[header]
+                for header in CACHED_HEADERS
+                if response.has_header(header)
+            },
+            "tags": {**tag_versions(tags - versions.keys()), **versions},
+        }
+        cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,140 @@
+"""Serializer helpers for the API."""
+
+from collections.abc import Callable
+from functools import cached_property
+from operator import attrgetter
+from typing import Any
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import Field, SkipField
+from rest_framework.relations import PKOnlyObject
+
+Reader = Callable[[Any], Any]
+
+
+def model_field(field: Field) -> models.Field | None:
+    """Return the concrete model field a serializer field reads directly."""
+    if len(field.source_attrs) != 1:
+        return None
+    model = getattr(getattr(field.parent, "Meta", None), "model", None)
+    if model is None:
+        return None
+    try:
+        return model._meta.get_field(field.source)  # noqa: SLF001
+    except FieldDoesNotExist:
+        return None
+
+
+def plain_reader(field: Field) -> Reader | None:
+    """Return a reader for fields that only convert a single model attribute."""
+    if type(field).get_attribute is not Field.get_attribute:
+        return None
+    source = model_field(field)
+    if source is None or not source.concrete or source.is_relation:
+        return None
+
+    get = attrgetter(field.source)
+    match type(field):
+        case serializers.CharField | serializers.SlugField | serializers.EmailField:
+            convert = str
+        case serializers.UUIDField if field.uuid_format == "hex_verbose":
+            convert = str
+        case serializers.IntegerField:
+            convert = int
+        case serializers.ChoiceField:
+            choices = field.choice_strings_to_values
+
+            def convert(value):
+                return value if value == "" else choices.get(str(value), value)
+
+        case _:
+            convert = field.to_representation
+
+    def read(instance):
+        value = get(instance)
+        return None if value is None else convert(value)
+
+    return read
+
+
+def relation_reader(field: Field) -> Reader | None:
+    """Return a reader for primary keys and string representations of relations."""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        source = model_field(field)
+        if field.pk_field is not None or source is None or not source.concrete:
+            return None
+        return attrgetter(source.attname)
+
+    if isinstance(field, serializers.ManyRelatedField):
+        if type(field.child_relation) is not serializers.StringRelatedField:
+            return None
+        if model_field(field) is None:
+            return None
+        get = attrgetter(field.source)
+
+        def read(instance):
+            if instance.pk is None:
+                return []
+            return [str(related) for related in get(instance).all()]
+
+        return read
+
+    return None
+
+
+def method_reader(field: Field) -> Reader | None:
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+    return None
+
+
+def generic_reader(field: Field) -> Reader:
+    """Read a field exactly as `Serializer.to_representation` does."""
+
+    def read(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = (
+            attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        )
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+
+    return read
+
+
+class CompiledReadMixin:
+    """
+    Serialize model instances through readers compiled once per serializer.
+
+    DRF resolves the source, checks for `None` and dispatches to the field for
+    every field of every row. For plain model attributes, primary keys of
+    relations, string related fields and method fields this mixin prepares a
+    reader that does the same work directly. Other fields, e.g. nested
+    serializers or dotted sources, keep DRF's code path. The output is the
+    same as without the mixin.
+    """
+
+    @cached_property
+    def readers(self) -> list[tuple[str, Reader]]:
+        readers = []
+        for field in self._readable_fields:
+            reader = (
+                method_reader(field)
+                or relation_reader(field)
+                or plain_reader(field)
+                or generic_reader(field)
+            )
+            readers.append((field.field_name, reader))
+        return readers
+
+    def to_representation(self, instance):
+        ret = {}
+        for name, read in self.readers:
+            try:
+                ret[name] = read(instance)
+            except SkipField:
+                continue
+        return ret
@@ -0,0 +1,191 @@
+"""Sparse fieldsets and explicit expansion of nested serializers.
+
+Clients choose the fields of a response with `?fields=id,name` and which
+nested serializers to embed with `?expand=user`. Nested serializers that are
+not expanded are replaced by the primary keys of their objects. Without the
+parameters responses are unchanged.
+
+Views use `wants()` and `expands()` to skip joins, prefetches and annotations
+nobody asked for, and only load the columns the remaining fields read.
+"""
+
+from functools import cached_property
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from django.utils.translation import gettext_lazy as _
+from djmoney.models.fields import MoneyField
+from djmoney.utils import get_currency_field_name
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        FIELDS_PARAM,
+        OpenApiTypes.STR,
+        description=_("Comma separated fields to include, default all."),
+    ),
+    OpenApiParameter(
+        EXPAND_PARAM,
+        OpenApiTypes.STR,
+        description=_(
+            "Comma separated nested objects to embed, others are replaced by "
+            "their ids. Default all."
+        ),
+    ),
+]
+
+
+def parse_names(value: str | None) -> frozenset[str] | None:
+    if value is None:
+        return None
+    return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Restrict a serializer to the fields and expansions requested in its context.
+
+    `Meta.expandable_fields` names the nested serializers clients may collapse
+    to primary keys. `Meta.field_columns` maps fields not backed by a model
+    field, e.g. method fields, to the columns they read.
+    """
+
+    def is_root(self) -> bool:
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_root():
+            # Nested serializers share the context of the root serializer
+            return fields
+
+        requested = self.context.get(FIELDS_PARAM)
+        if requested is not None:
+            unknown = requested - fields.keys()
+            if unknown:
+                raise serializers.ValidationError(
+                    {FIELDS_PARAM: _("Unknown fields: %s") % ", ".join(sorted(unknown))}
+                )
+            fields = {
+                name: field for name, field in fields.items() if name in requested
+            }
+
+        expand = self.context.get(EXPAND_PARAM)
+        if expand is not None:
+            for name in getattr(self.Meta, "expandable_fields", ()):
+                if name in fields and name not in expand:
+                    fields[name] = self.collapsed_field(fields[name])
+        return fields
+
+    def collapsed_field(self, field):
+        """Return a field representing the objects of `field` by primary key."""
+        return serializers.PrimaryKeyRelatedField(
+            source=field.source,
+            read_only=True,
+            many=isinstance(field, serializers.ListSerializer),
+        )
+
+    def get_columns(self) -> set[str] | None:
+        """
+        Return the columns the readable fields need, None if unknown.
+
+        Relations to many objects need no column, they are prefetched.
+        """
+        field_columns = getattr(self.Meta, "field_columns", {})
+        opts = self.Meta.model._meta  # noqa: SLF001
+        # Parent links of inherited models are read by prefetches
+        columns = {opts.pk.name}
+        columns.update(parent._meta.pk.name for parent in opts.get_parent_list())  # noqa: SLF001
+        for field in self._readable_fields:
+            if field.field_name in field_columns:
+                columns.update(field_columns[field.field_name])
+                continue
+            if field.source == "*":
+                return None
+            try:
+                model_field = opts.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                continue
+            columns.add(model_field.name)
+            if isinstance(model_field, MoneyField):
+                columns.add(get_currency_field_name(model_field.name, model_field))
+        return columns
+
+
+class SparseFieldsViewMixin:
+    """
+    Pass `?fields=` and `?expand=` of read requests on to the serializer.
+
+    Writes always use all fields, so the parameters never change what a
+    request may modify.
+    """
+
+    @cached_property
+    def requested_fields(self) -> frozenset[str] | None:
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return parse_names(self.request.query_params.get(FIELDS_PARAM))
+
+    @cached_property
+    def requested_expansions(self) -> frozenset[str] | None:
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return parse_names(self.request.query_params.get(EXPAND_PARAM))
+
+    def wants(self, *names: str) -> bool:
+        """Return whether any of the fields is part of the response."""
+        requested = self.requested_fields
+        return requested is None or not requested.isdisjoint(names)
+
+    def expands(self, name: str) -> bool:
+        """Return whether the nested serializer `name` is embedded."""
+        expand = self.requested_expansions
+        return self.wants(name) and (expand is None or name in expand)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context[FIELDS_PARAM] = self.requested_fields
+        context[EXPAND_PARAM] = self.requested_expansions
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.requested_fields is None or not isinstance(queryset, QuerySet):
+            return queryset
+
+        columns = self.get_serializer().get_columns()
+        if columns is None:
+            return queryset
+        # Relations the view joins cannot be deferred
+        if isinstance(queryset.query.select_related, dict):
+            columns.update(queryset.query.select_related)
+        # Keep the ordering columns, pagination reads them from the last row
+        opts = queryset.model._meta  # noqa: SLF001
+        for name in queryset.query.order_by:
+            name = str(name).removeprefix("-")  # noqa: PLW2901
+            if name in ("pk", "?"):
+                continue
+            try:
+                columns.add(opts.get_field(name).name)
+            except FieldDoesNotExist:
+                continue
+        return queryset.only(*columns)
+
+    @extend_schema(parameters=SPARSE_PARAMETERS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(parameters=SPARSE_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -5,15 +5,21 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from bubble.core.api.response_cache import ResponseCacheMixin
 
-class ConfigView(APIView):
+
+class ConfigView(ResponseCacheMixin, APIView):
     """
     API endpoint that returns the current Constance configuration.
     """
 
     permission_classes = [AllowAny]
+    list_cache_tags = ("config",)
 
     def get(self, request, *args, **kwargs):
+        return self.cached(request, self.get_config)
+
+    def get_config(self, request):
         # Retrieve all configuration values from django-constance
 
         constance_config = getattr(settings, "CONSTANCE_CONFIG_PUBLIC", []) or []
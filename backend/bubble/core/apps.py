@@ -6,5 +6,6 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         """Import signal handlers when the app is ready."""
+        import bubble.core.beats  # noqa: PLC0415
         import bubble.core.signals  # noqa: PLC0415
         import bubble.core.websocket_signals  # noqa: F401, PLC0415
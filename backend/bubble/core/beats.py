@@ -0,0 +1,18 @@
+from celery.schedules import crontab
+
+from config.celery_app import app
+
+# Periodic tasks schedule
+app.conf.beat_schedule = app.conf.get("beat_schedule", {})
+app.conf.beat_schedule.update(
+    {
+        "core.collect_media_garbage_weekly": {
+            "task": "bubble.core.tasks.collect_media_garbage",
+            "schedule": crontab(minute=30, hour=3, day_of_week="sunday"),
+        },
+        "core.prune_tombstones_daily": {
+            "task": "bubble.core.tasks.prune_tombstones",
+            "schedule": crontab(minute=15, hour=4),
+        },
+    }
+)
@@ -7,6 +7,8 @@ from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.db import close_old_connections
 
+from bubble.core.monitoring import WEBSOCKET_CONNECTIONS
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +40,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.user_channel, self.channel_name)
 
         await self.accept()
+        WEBSOCKET_CONNECTIONS.inc()
         logger.info("WebSocket connected for user %s", self.user.username)
 
         # Send connection confirmation
@@ -55,6 +58,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         """Leave notification group on disconnect."""
         if hasattr(self, "user_channel") and hasattr(self, "user"):
             await self.channel_layer.group_discard(self.user_channel, self.channel_name)
+            WEBSOCKET_CONNECTIONS.dec()
             logger.info(
                 "WebSocket disconnected for user %s (code: %s)",
                 self.user.username,
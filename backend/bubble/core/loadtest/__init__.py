@@ -0,0 +1,6 @@
+"""Load tests of the ASGI application with scenarios of production traffic.
+
+`scenarios` defines what virtual users do, `runner` runs them concurrently
+against a server and summarizes throughput and latency percentiles. Use the
+`loadtest` management command to run them, see its help for the options.
+"""
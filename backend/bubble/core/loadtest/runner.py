@@ -0,0 +1,99 @@
+"""Run scenarios with concurrent virtual users and summarize the latencies."""
+
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Return the nearest-rank percentile of ascending `sorted_values`."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class Recorder:
+    """Collect the latencies and errors of the operations of a scenario."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def record(
+        self, operation: str, start: float, end: float | None = None, *, ok: bool = True
+    ) -> None:
+        """Record an operation timed with `time.perf_counter()`, ending now."""
+        end = time.perf_counter() if end is None else end
+        self.latencies[operation].append(end - start)
+        if not ok:
+            self.errors[operation] += 1
+
+    def summary(self, elapsed: float) -> dict[str, dict]:
+        """Return count, errors, throughput and latencies in ms per operation."""
+        summary = {}
+        for operation, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)  # noqa: PLW2901
+            summary[operation] = {
+                "count": len(latencies),
+                "errors": self.errors[operation],
+                "throughput": round(len(latencies) / elapsed, 2),
+                **{
+                    f"p{percent}": round(percentile(latencies, percent) * 1000, 2)
+                    for percent in PERCENTILES
+                },
+                "max": round(latencies[-1] * 1000, 2),
+            }
+        return summary
+
+
+async def run(scenario, *, concurrency: int, duration: float, seed: int) -> dict:
+    """
+    Run `scenario` with `concurrency` virtual users for `duration` seconds.
+
+    Every virtual user has its own random generator derived from `seed`, so
+    runs of the same scenario make the same choices in the same order.
+    """
+    recorder = Recorder()
+    await scenario.setup(concurrency)
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def virtual_user(index: int) -> None:
+        rng = random.Random(f"{seed}:{scenario.name}:{index}")  # noqa: S311
+        while time.perf_counter() < deadline:
+            await scenario.step(index, rng, recorder)
+            # Steps without requests must not starve the other users
+            await asyncio.sleep(0)
+
+    try:
+        await asyncio.gather(*(virtual_user(index) for index in range(concurrency)))
+    finally:
+        await scenario.teardown()
+    return recorder.summary(time.perf_counter() - start)
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Describe the changes of throughput and p50/p99 against `baseline`."""
+    lines = []
+    for scenario, operations in current.items():
+        for operation, stats in operations.items():
+            before = baseline.get(scenario, {}).get(operation)
+            if not before:
+                continue
+            changes = [
+                f"{key} {change(before[key], stats[key])}"
+                for key in ("throughput", "p50", "p99")
+            ]
+            lines.append(f"{scenario} {operation}: {', '.join(changes)}")
+    return lines
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before:+.1%}"
@@ -0,0 +1,348 @@
+"""Scenarios of the load tests, each a step virtual users repeat.
+
+Scenarios only talk HTTP and WebSocket to the server. The ids and
+credentials they use are read from the database beforehand by
+`prepare_fixture()`, e.g. from a dataset of `seed_perf_data`.
+"""
+
+import asyncio
+import contextlib
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from importlib import import_module
+from io import BytesIO
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+    get_user_model,
+)
+from django.db.models import F
+from PIL import Image as PILImage
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from websockets.asyncio.client import connect
+
+from bubble.bookings.models import Booking
+from bubble.items.models import CategoryType, Item
+
+# Seconds a message notification may take before it counts as lost
+DELIVERY_TIMEOUT = 5.0
+MESSAGES_PER_BURST = 5
+
+
+@dataclass(frozen=True)
+class Credentials:
+    user_id: str
+    token: str
+    session_key: str
+
+
+@dataclass
+class Fixture:
+    """Users, items and bookings the scenarios work with."""
+
+    users: list[Credentials] = field(default_factory=list)
+    # The oldest published item of every user
+    own_items: dict[str, str] = field(default_factory=dict)
+    # Few rentable items many users try to book at once
+    hot_items: list[str] = field(default_factory=list)
+    # Bookings as (id, renter, owner) between users
+    threads: list[tuple[str, str, str]] = field(default_factory=list)
+    search_terms: list[str] = field(default_factory=list)
+    image: bytes = b""
+
+
+def credentials(user) -> Credentials:
+    """Return a token and a session of `user`, creating them as necessary."""
+    token, _ = Token.objects.get_or_create(user=user)
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return Credentials(str(user.pk), token.key, session.session_key)
+
+
+def sample_image() -> bytes:
+    image = PILImage.linear_gradient("L").resize((1024, 768)).convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def prepare_fixture(user_count: int) -> Fixture:
+    """Pick the first `user_count` owners of published items and their data."""
+    published = Item.objects.published()
+    owners = list(
+        get_user_model()
+        .objects.filter(is_active=True, pk__in=published.values("user"))
+        .order_by("pk")[:user_count]
+    )
+    owner_ids = [owner.pk for owner in owners]
+
+    own_items = {}
+    for user_id, item_id in (
+        published.filter(user__in=owner_ids)
+        .order_by("user", "created_at")
+        .values_list("user", "pk")
+    ):
+        own_items.setdefault(str(user_id), str(item_id))
+
+    threads = (
+        Booking.objects.filter(item__user__in=owner_ids, user__in=owner_ids)
+        .exclude(user=F("item__user"))
+        .order_by("pk")
+        .values_list("pk", "user", "item__user")[:100]
+    )
+    hot_items = (
+        published.filter(rental_price__isnull=False)
+        .order_by("-rental_self_service", "pk")
+        .values_list("pk", flat=True)[:5]
+    )
+    names = published.order_by("pk").values_list("name", flat=True)[:500]
+    return Fixture(
+        users=[credentials(owner) for owner in owners],
+        own_items=own_items,
+        hot_items=[str(pk) for pk in hot_items],
+        threads=[tuple(map(str, thread)) for thread in threads],
+        search_terms=sorted(
+            {word.lower() for name in names for word in name.split() if len(word) > 3}  # noqa: PLR2004
+        ),
+        image=sample_image(),
+    )
+
+
+class Scenario:
+    """Base of the scenarios, `step()` is one iteration of a virtual user."""
+
+    name = ""
+    description = ""
+    # Field of the fixture the scenario cannot run without
+    requires = "users"
+
+    def __init__(self, base_url: str, fixture: Fixture):
+        self.base_url = base_url
+        self.fixture = fixture
+
+    async def setup(self, concurrency: int) -> None:
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=concurrency),
+            timeout=30,
+        )
+
+    async def teardown(self) -> None:
+        await self.client.aclose()
+
+    async def step(self, index: int, rng, recorder) -> None:
+        raise NotImplementedError
+
+    def user(self, index: int) -> Credentials:
+        return self.fixture.users[index % len(self.fixture.users)]
+
+    async def request(  # noqa: PLR0913
+        self,
+        recorder,
+        operation: str,
+        method: str,
+        url: str,
+        *,
+        user: Credentials | None = None,
+        expected: tuple[int, ...] = (status.HTTP_200_OK,),
+        **kwargs,
+    ) -> httpx.Response | None:
+        """Send a request as `user` or anonymously and record its latency."""
+        headers = {"Authorization": f"Token {user.token}"} if user else {}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            recorder.record(operation, start, ok=False)
+            return None
+        recorder.record(operation, start, ok=response.status_code in expected)
+        return response
+
+
+class CatalogueScenario(Scenario):
+    name = "catalogue"
+    description = "Anonymous browsing of the catalogue with filters and paging."
+
+    async def step(self, index, rng, recorder):
+        params = {"pagination": "cursor"}
+        if rng.random() < 0.5:  # noqa: PLR2004
+            params["category"] = rng.choice(CategoryType.values)
+        if rng.random() < 0.3:  # noqa: PLR2004
+            low = rng.randrange(0, 20)
+            params.update(min_rental_price=low, max_rental_price=low + 10)
+        if rng.random() < 0.2 and self.fixture.search_terms:  # noqa: PLR2004
+            params["search"] = rng.choice(self.fixture.search_terms)
+        params["ordering"] = rng.choice(("-created_at", "rental_price", "sale_price"))
+
+        response = await self.request(
+            recorder, "list", "GET", "/api/catalogue/", params=params
+        )
+        if response is None or response.status_code != status.HTTP_200_OK:
+            return
+        data = response.json()
+        if data.get("next") and rng.random() < 0.3:  # noqa: PLR2004
+            await self.request(recorder, "next page", "GET", data["next"])
+        if data["results"]:
+            item = rng.choice(data["results"])
+            await self.request(
+                recorder, "detail", "GET", f"/api/public-items/{item['id']}/"
+            )
+
+
+class SearchScenario(Scenario):
+    name = "search"
+    description = "Search by substring on public items and full text on the catalogue."
+
+    async def step(self, index, rng, recorder):
+        term = rng.choice(self.fixture.search_terms or ["item"])
+        await self.request(
+            recorder, "substring", "GET", "/api/public-items/", params={"search": term}
+        )
+        await self.request(
+            recorder, "full text", "GET", "/api/catalogue/", params={"search": term}
+        )
+
+
+class BookingScenario(Scenario):
+    name = "booking"
+    description = "Many users booking few items for overlapping periods."
+    requires = "hot_items"
+
+    async def setup(self, concurrency):
+        await super().setup(concurrency)
+        tomorrow = datetime.now(UTC) + timedelta(days=1)
+        self.start = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def step(self, index, rng, recorder):
+        time_from = self.start + timedelta(hours=rng.randrange(0, 7 * 24))
+        time_to = time_from + timedelta(hours=rng.randrange(1, 48))
+        await self.request(
+            recorder,
+            "create",
+            "POST",
+            "/api/bookings/",
+            user=self.user(index),
+            # Overlaps with confirmed bookings are rejected
+            expected=(status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST),
+            json={
+                "item": rng.choice(self.fixture.hot_items),
+                "time_from": time_from.isoformat(),
+                "time_to": time_to.isoformat(),
+            },
+        )
+
+
+class ChatScenario(Scenario):
+    """
+    Renters send bursts of messages, owners receive them over WebSocket.
+
+    `send` is the latency of posting a message, `delivery` the time from
+    posting until the notification arrives at the owner.
+    """
+
+    name = "chat"
+    description = "Message bursts and their delivery over api/ws/notifications/."
+    requires = "threads"
+
+    async def setup(self, concurrency):
+        await super().setup(concurrency)
+        self.pending: dict[str, asyncio.Future] = {}
+        self.listeners = []
+        ws_url = self.base_url.replace("http", "ws", 1) + "/api/ws/notifications/"
+        credentials = {user.user_id: user for user in self.fixture.users}
+        owners = {owner for _, _, owner in self.fixture.threads[:concurrency]}
+        for owner in sorted(owners):
+            cookie = f"{settings.SESSION_COOKIE_NAME}={credentials[owner].session_key}"
+            websocket = await connect(ws_url, additional_headers={"Cookie": cookie})
+            self.listeners.append(asyncio.create_task(self.listen(websocket)))
+        self.credentials = credentials
+        self.sent = 0
+
+    async def teardown(self):
+        for listener in self.listeners:
+            listener.cancel()
+        await asyncio.gather(*self.listeners, return_exceptions=True)
+        await super().teardown()
+
+    async def listen(self, websocket) -> None:
+        async with websocket:
+            async for text in websocket:
+                event = json.loads(text)
+                if event.get("type") != "new_message":
+                    continue
+                future = self.pending.pop(event["data"]["message"], None)
+                if future is not None and not future.done():
+                    future.set_result(time.perf_counter())
+
+    async def step(self, index, rng, recorder):
+        booking, renter, _ = self.fixture.threads[index % len(self.fixture.threads)]
+        loop = asyncio.get_running_loop()
+        deliveries = []
+        for _ in range(MESSAGES_PER_BURST):
+            self.sent += 1
+            text = f"load test message {index}-{self.sent}"
+            future = self.pending[text] = loop.create_future()
+            start = time.perf_counter()
+            await self.request(
+                recorder,
+                "send",
+                "POST",
+                "/api/messages/",
+                user=self.credentials[renter],
+                expected=(status.HTTP_201_CREATED,),
+                json={"booking": booking, "message": text},
+            )
+            deliveries.append((text, future, start))
+
+        for text, future, start in deliveries:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(future, DELIVERY_TIMEOUT)
+            if future.done():
+                recorder.record("delivery", start, future.result())
+            else:
+                self.pending.pop(text, None)
+                recorder.record("delivery", start, ok=False)
+
+
+class UploadScenario(Scenario):
+    name = "upload"
+    description = "Owners uploading images to their items."
+    requires = "own_items"
+
+    async def step(self, index, rng, recorder):
+        user = self.user(index)
+        item = self.fixture.own_items.get(user.user_id)
+        if item is None:
+            return
+        await self.request(
+            recorder,
+            "upload",
+            "POST",
+            "/api/images/",
+            user=user,
+            expected=(status.HTTP_201_CREATED,),
+            data={"item": item},
+            files={"original": ("load-test.jpg", self.fixture.image, "image/jpeg")},
+        )
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        CatalogueScenario,
+        SearchScenario,
+        BookingScenario,
+        ChatScenario,
+        UploadScenario,
+    )
+}
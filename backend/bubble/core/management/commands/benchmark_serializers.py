@@ -0,0 +1,97 @@
+"""Compare the throughput of compiled list serializers with plain DRF."""
+
+import time
+from functools import partial
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from drf_orjson_renderer.renderers import ORJSONRenderer
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from bubble.books.api.serializers import BookListSerializer
+from bubble.books.models import Book
+from bubble.items.api.serializers import ItemListSerializer, ItemMinimalSerializer
+from bubble.items.models import Item
+
+
+def items():
+    return Item.objects.select_related("user").with_first_image()
+
+
+def books():
+    return (
+        Book.objects.select_related("user", "verlag", "shelf")
+        .prefetch_related("authors", "genres")
+        .with_first_image()
+    )
+
+
+SERIALIZERS = {
+    "items": (ItemListSerializer, items),
+    "minimal": (ItemMinimalSerializer, items),
+    "books": (BookListSerializer, books),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize and render existing rows with the compiled list serializers "
+        "and with DRF's generic code path, and report rows per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--serializer",
+            action="append",
+            choices=list(SERIALIZERS),
+            dest="serializers",
+            help="Serializer to benchmark, may be repeated (default: all).",
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000,
+            help="Number of rows per run, existing rows are repeated (default: 1000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of runs, the fastest counts (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get("/")
+        for name in options["serializers"] or SERIALIZERS:
+            serializer_class, queryset = SERIALIZERS[name]
+            rows = list(queryset()[: options["rows"]])
+            if not rows:
+                self.stdout.write(f"{name}: no rows to serialize")
+                continue
+            rows = list(islice(cycle(rows), options["rows"]))
+            serializer = serializer_class(context={"request": request})
+
+            generic = partial(serializers.Serializer.to_representation, serializer)
+            compiled = serializer.to_representation
+            if [compiled(row) for row in rows] != [generic(row) for row in rows]:
+                msg = f"{name}: compiled representation differs from DRF"
+                raise CommandError(msg)
+
+            generic_rate = self.measure(generic, rows, options["repeat"])
+            compiled_rate = self.measure(compiled, rows, options["repeat"])
+            self.stdout.write(
+                f"{name}: DRF {generic_rate:,.0f} rows/s, "
+                f"compiled {compiled_rate:,.0f} rows/s "
+                f"({compiled_rate / generic_rate:.2f}x)"
+            )
+
+    def measure(self, represent, rows: list, repeat: int) -> float:
+        """Return the rows per second of the fastest serialize and render run."""
+        renderer = ORJSONRenderer()
+        fastest = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            renderer.render([represent(row) for row in rows])
+            fastest = min(fastest, time.perf_counter() - start)
+        return len(rows) / fastest
@@ -0,0 +1,74 @@
+"""Report or delete media files that no database row references."""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bubble.core.storage_gc import REFERENCES, collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        "Find media files no longer referenced by images, rooms or users. "
+        "Only reports them unless --delete is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Delete orphaned files instead of only reporting them.",
+        )
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            choices=list(REFERENCES),
+            dest="prefixes",
+            help="Storage prefix to scan, may be repeated (default: all).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.MEDIA_GC_BATCH_SIZE,
+            help="Number of files checked per database query.",
+        )
+        parser.add_argument(
+            "--min-age-hours",
+            type=float,
+            default=settings.MEDIA_GC_MIN_AGE_HOURS,
+            help="Never collect files modified more recently than this.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.MEDIA_GC_BATCH_SLEEP,
+            help="Seconds to pause between batches.",
+        )
+
+    def handle(self, *args, **options):
+        delete = options["delete"]
+        verb = "Deleting" if delete else "Orphaned"
+
+        def on_orphan(name):
+            if options["verbosity"] >= 2:  # noqa: PLR2004
+                self.stdout.write(f"{verb} {name}")
+
+        report = collect_garbage(
+            delete=delete,
+            prefixes=options["prefixes"],
+            batch_size=options["batch_size"],
+            min_age=timedelta(hours=options["min_age_hours"]),
+            sleep=options["sleep"],
+            on_orphan=on_orphan,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {report.scanned} files: {report.orphaned} orphaned, "
+                f"{report.deleted} deleted, {report.kept} referenced again, "
+                f"{report.skipped} too recent, {report.errors} errors."
+            )
+        )
+        if report.orphaned and not delete:
+            self.stdout.write("Run again with --delete to remove orphaned files.")
@@ -0,0 +1,36 @@
+"""Report how many API requests were answered with 304 Not Modified."""
+
+from django.core.management.base import BaseCommand
+
+from bubble.core import metrics
+from bubble.core.api.conditional import (
+    BYTES_SAVED_METRIC,
+    METRICS,
+    NOT_MODIFIED_METRIC,
+    REQUESTS_METRIC,
+)
+
+
+class Command(BaseCommand):
+    help = "Show hit rate and bytes saved by conditional GET requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after reporting them.",
+        )
+
+    def handle(self, *args, **options):
+        counters = metrics.get_counters(*METRICS)
+        requests = counters[REQUESTS_METRIC]
+        not_modified = counters[NOT_MODIFIED_METRIC]
+        hit_rate = not_modified / requests if requests else 0.0
+
+        self.stdout.write(f"Conditional requests: {requests}")
+        self.stdout.write(f"Not modified: {not_modified} ({hit_rate:.1%})")
+        self.stdout.write(f"Bytes saved: {counters[BYTES_SAVED_METRIC]}")
+
+        if options["reset"]:
+            metrics.reset(*METRICS)
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,193 @@
+"""Run load test scenarios against the ASGI application."""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bubble.core.loadtest import runner
+from bubble.core.loadtest.scenarios import SCENARIOS, prepare_fixture
+
+# Seconds to wait for a started server to answer
+STARTUP_TIMEOUT = 30
+
+
+def git_commit() -> str:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(workers: int):
+    """Start `config.asgi` with uvicorn and the current settings, yield its URL."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "config.asgi:application",
+            "--host=127.0.0.1",
+            f"--port={port}",
+            f"--workers={workers}",
+            "--log-level=warning",
+        ],
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE},
+    )
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                msg = f"The server exited with code {process.returncode}."
+                raise CommandError(msg)
+            try:
+                httpx.get(f"{url}/api/config/", timeout=1)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    msg = f"The server did not answer within {STARTUP_TIMEOUT}s."
+                    raise CommandError(msg) from None
+                time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run load test scenarios with concurrent virtual users and report "
+        "throughput and latency percentiles per operation. Starts config.asgi "
+        "with uvicorn unless --url is given. Scenarios: "
+        + " ".join(f"{name}: {cls.description}" for name, cls in SCENARIOS.items())
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=list(SCENARIOS),
+            dest="scenarios",
+            help="Scenario to run, may be repeated (default: all).",
+        )
+        parser.add_argument(
+            "--url",
+            help="URL of a running server instead of starting one.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Number of uvicorn workers of the started server (default: 2).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Number of virtual users per scenario (default: 20).",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30,
+            help="Seconds to run every scenario (default: 30).",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=50,
+            help="Number of users the virtual users act as (default: 50).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the choices of the virtual users (default: 0).",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="Write the results as JSON to this file.",
+        )
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            help="Compare the results with a JSON file written by --output.",
+        )
+
+    def handle(self, *args, **options):
+        fixture = prepare_fixture(options["users"])
+        if not fixture.users:
+            msg = "There are no published items, run seed_perf_data first."
+            raise CommandError(msg)
+
+        if options["url"]:
+            results = self.run(options["url"].rstrip("/"), fixture, options)
+        else:
+            with serve(options["workers"]) as url:
+                results = self.run(url, fixture, options)
+
+        report = {
+            "commit": git_commit(),
+            "concurrency": options["concurrency"],
+            "duration": options["duration"],
+            "seed": options["seed"],
+            "scenarios": results,
+        }
+        if options["output"]:
+            options["output"].write_text(json.dumps(report, indent=2) + "\n")
+        if options["compare"]:
+            baseline = json.loads(options["compare"].read_text())
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(f"Compared with {baseline.get('commit')}:")
+            )
+            for line in runner.compare(results, baseline["scenarios"]):
+                self.stdout.write(line)
+
+    def run(self, url: str, fixture, options) -> dict:
+        results = {}
+        for name in options["scenarios"] or SCENARIOS:
+            scenario = SCENARIOS[name](url, fixture)
+            if not getattr(fixture, scenario.requires):
+                self.stdout.write(
+                    self.style.WARNING(f"{name}: skipped, no {scenario.requires}")
+                )
+                continue
+            results[name] = summary = asyncio.run(
+                runner.run(
+                    scenario,
+                    concurrency=options["concurrency"],
+                    duration=options["duration"],
+                    seed=options["seed"],
+                )
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for operation, stats in summary.items():
+                self.stdout.write(
+                    f"  {operation:<10} {stats['count']:>7} requests "
+                    f"{stats['errors']:>5} errors {stats['throughput']:>8.1f}/s "
+                    f"p50 {stats['p50']:>7.1f} ms p90 {stats['p90']:>7.1f} ms "
+                    f"p99 {stats['p99']:>7.1f} ms max {stats['max']:>7.1f} ms"
+                )
+        return results
@@ -0,0 +1,22 @@
+"""Print a signed token to profile requests of non-staff users."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bubble.core.profiling import PROFILE_HEADER, PROFILE_PARAM, make_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a token for the X-Profile header or the profile query parameter, "
+        "which profiles requests of any user, e.g. API clients using tokens."
+    )
+
+    def handle(self, *args, **options):
+        token = make_token()
+        hours = settings.REQUEST_PROFILING_TOKEN_MAX_AGE / 3600
+        self.stdout.write(token)
+        self.stderr.write(
+            f"Send it as {PROFILE_HEADER} header or {PROFILE_PARAM} parameter, "
+            f"valid for {hours:g} hours."
+        )
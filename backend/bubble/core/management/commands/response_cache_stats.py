@@ -0,0 +1,49 @@
+"""Report how many anonymous API requests were answered from the cache."""
+
+from django.core.management.base import BaseCommand
+
+from bubble.core import metrics
+from bubble.core.api import response_cache
+from bubble.core.api.response_cache import (
+    HIT_MICROSECONDS_METRIC,
+    HITS_METRIC,
+    METRICS,
+    MISS_MICROSECONDS_METRIC,
+    MISSES_METRIC,
+)
+
+
+class Command(BaseCommand):
+    help = "Show hit ratio and latency of the anonymous response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after reporting them.",
+        )
+        parser.add_argument(
+            "--invalidate",
+            action="store_true",
+            help="Retire all cached responses, e.g. after a deploy.",
+        )
+
+    def handle(self, *args, **options):
+        counters = metrics.get_counters(*METRICS)
+        hits = counters[HITS_METRIC]
+        misses = counters[MISSES_METRIC]
+        requests = hits + misses
+        hit_ratio = hits / requests if requests else 0.0
+        hit_ms = counters[HIT_MICROSECONDS_METRIC] / hits / 1000 if hits else 0.0
+        miss_ms = counters[MISS_MICROSECONDS_METRIC] / misses / 1000 if misses else 0.0
+
+        self.stdout.write(f"Cacheable requests: {requests}")
+        self.stdout.write(f"Hits: {hits} ({hit_ratio:.1%}), {hit_ms:.2f} ms average")
+        self.stdout.write(f"Misses: {misses}, {miss_ms:.2f} ms average")
+
+        if options["reset"]:
+            metrics.reset(*METRICS)
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
+        if options["invalidate"]:
+            response_cache.invalidate(response_cache.ALL_TAG)
+            self.stdout.write(self.style.SUCCESS("Cached responses retired."))
@@ -0,0 +1,478 @@
+"""Generate a large synthetic dataset for benchmarks and load tests."""
+
+import hashlib
+import itertools
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from enum import Enum
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.fields import AutoFieldMixin
+from django.utils import timezone
+from PIL import Image as PILImage
+
+from bubble.bookings.models import Booking, BookingStatus, Message
+from bubble.books.models import Author, Book, Genre, Publisher
+from bubble.core.api import response_cache
+from bubble.core.permissions_config import DefaultGroup
+from bubble.core.signals import create_default_groups_and_permissions
+from bubble.items import permissions, storage
+from bubble.items.hashing import dhash
+from bubble.items.models import (
+    CatalogueEntry,
+    CategoryType,
+    ConditionType,
+    Image,
+    Item,
+    ItemStatus,
+    ItemUserObjectPermission,
+    RentalPeriodType,
+)
+from bubble.items.placeholders import placeholder_data_uri
+from bubble.users.models import Profile
+
+USERNAME_PREFIX = "perf"
+
+WORDS = (
+    "vintage", "compact", "electric", "wooden", "folding", "large", "small",
+    "classic", "portable", "handmade", "sturdy", "light", "family", "garden",
+    "camping", "kitchen", "reading", "winter", "summer", "travel",
+)  # fmt: skip
+NOUNS = (
+    "drill", "ladder", "tent", "bicycle", "lamp", "chair", "table", "mixer",
+    "kayak", "projector", "saw", "jacket", "stroller", "grill", "guitar",
+    "speaker", "camera", "sewing machine", "board game", "novel",
+)  # fmt: skip
+
+# Item statuses and their weights, most items are published
+STATUS_WEIGHTS = {
+    ItemStatus.DRAFT: 10,
+    ItemStatus.PROCESSING: 2,
+    ItemStatus.AVAILABLE: 70,
+    ItemStatus.RESERVED: 5,
+    ItemStatus.RENTED: 8,
+    ItemStatus.SOLD: 5,
+}
+
+# Data spans this period before the start of the command
+HISTORY = timedelta(days=730)
+
+
+def prep_value(field, obj):
+    value = field.get_db_prep_save(getattr(obj, field.attname), connection)
+    # COPY writes enums by name, choices are stored by value
+    return value.value if isinstance(value, Enum) else value
+
+
+def copy_rows(model, objects, batch_size: int) -> int:
+    """
+    Insert `objects` with COPY, bypassing save(), signals and history.
+
+    Instances of inherited models are written to the tables of their parents
+    too. Auto incremented primary keys are left to the database.
+    """
+    tables = [*reversed(model._meta.get_parent_list()), model]  # noqa: SLF001
+    copied = 0
+    with connection.cursor() as cursor:
+        for batch in itertools.batched(objects, batch_size):
+            for table in tables:
+                opts = table._meta  # noqa: SLF001
+                fields = [
+                    field
+                    for field in opts.local_concrete_fields
+                    if not isinstance(field, AutoFieldMixin)
+                ]
+                columns = ", ".join(
+                    connection.ops.quote_name(field.column) for field in fields
+                )
+                sql = (
+                    f"COPY {connection.ops.quote_name(opts.db_table)} "
+                    f"({columns}) FROM STDIN"
+                )
+                with cursor.copy(sql) as copy:
+                    for obj in batch:
+                        copy.write_row([prep_value(field, obj) for field in fields])
+            copied += len(batch)
+    return copied
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, items, books, images, bookings, message threads and "
+        "shared item permissions for benchmarks and load tests. Rows are "
+        "written with COPY, without signals or history, and the catalogue is "
+        "rebuilt at the end. The same seed generates the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=100_000,
+            help="Number of items including books (default: 100000).",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Number of users (default: one per 20 items).",
+        )
+        parser.add_argument(
+            "--books",
+            type=float,
+            default=0.2,
+            help="Share of items that are books (default: 0.2).",
+        )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=2,
+            help="Images per item, all share one file (default: 2).",
+        )
+        parser.add_argument(
+            "--bookings",
+            type=float,
+            default=1.0,
+            help="Bookings per item on average (default: 1.0).",
+        )
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=4,
+            help="Messages per booking (default: 4).",
+        )
+        parser.add_argument(
+            "--shared",
+            type=float,
+            default=0.02,
+            help="Share of items shared with another user (default: 0.02).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed, also part of the usernames (default: 0).",
+        )
+        parser.add_argument(
+            "--password",
+            default="perf",
+            help="Password of all generated users (default: perf).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Rows per COPY batch (default: 10000).",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])  # noqa: S311
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.prefix = f"{USERNAME_PREFIX}{options['seed']}-"
+        if get_user_model().objects.filter(username__startswith=self.prefix).exists():
+            msg = f"Users named {self.prefix}* exist already, use another --seed."
+            raise CommandError(msg)
+
+        item_count = options["items"]
+        user_count = options["users"] or max(item_count // 20, 2)
+        book_count = round(item_count * options["books"])
+
+        create_default_groups_and_permissions()
+        with transaction.atomic():
+            users = self.step("users", self.create_users, user_count, options)
+            items = self.step(
+                "items", self.create_items, item_count - book_count, book_count, users
+            )
+            self.step("images", self.create_images, items, options["images"])
+            self.step("shares", self.create_shares, items, users, options["shared"])
+            bookings = self.step(
+                "bookings", self.create_bookings, items, users, options["bookings"]
+            )
+            self.step("messages", self.create_messages, bookings, options["messages"])
+            self.step("catalogue entries", CatalogueEntry.objects.rebuild, 2000)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        permissions.invalidate_all_shared_object_ids()
+        response_cache.invalidate(response_cache.ALL_TAG)
+        self.stdout.write(
+            self.style.SUCCESS(f"Log in as {self.prefix}0 with the given password.")
+        )
+
+    def step(self, name: str, create, *args):
+        """Run `create` and report how long it took."""
+        start = time.perf_counter()
+        result = create(*args)
+        count = result if isinstance(result, int) else len(result)
+        self.stdout.write(f"{count:,} {name} in {time.perf_counter() - start:.1f}s")
+        return result
+
+    def new_uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def past(self, within: timedelta = HISTORY):
+        return self.now - within * self.rng.random()
+
+    def create_users(self, count: int, options) -> list:
+        """Create users with profiles in the default group, return (id, joined)."""
+        User = get_user_model()  # noqa: N806
+        password = make_password(options["password"])
+        users = [(self.new_uuid(), self.past()) for _ in range(count)]
+        copy_rows(
+            User,
+            (
+                User(
+                    id=pk,
+                    username=f"{self.prefix}{index}",
+                    email=f"{self.prefix}{index}@example.com",
+                    name=f"Perf User {index}",
+                    password=password,
+                    date_joined=joined,
+                )
+                for index, (pk, joined) in enumerate(users)
+            ),
+            self.batch_size,
+        )
+        copy_rows(Profile, (Profile(user_id=pk) for pk, _ in users), self.batch_size)
+        group = Group.objects.get(name=DefaultGroup.DEFAULT)
+        Membership = User.groups.through  # noqa: N806
+        copy_rows(
+            Membership,
+            (Membership(user_id=pk, group_id=group.pk) for pk, _ in users),
+            self.batch_size,
+        )
+        return users
+
+    def item_fields(self, index: int, users: list) -> dict:
+        owner, joined = self.rng.choice(users)
+        created_at = self.past(self.now - joined)
+        price = Decimal(self.rng.randrange(100, 20_000)) / 100
+        for_sale = self.rng.random() < 0.3  # noqa: PLR2004
+        name = f"{self.rng.choice(WORDS).title()} {self.rng.choice(NOUNS)}"
+        return {
+            "id": self.new_uuid(),
+            "user_id": owner,
+            "name": name,
+            "slug": f"{self.prefix}{index}",
+            "description": " ".join(self.rng.choices(WORDS + NOUNS, k=30)),
+            "condition": self.rng.choice(ConditionType.values),
+            "status": self.rng.choices(
+                list(STATUS_WEIGHTS), weights=STATUS_WEIGHTS.values()
+            )[0],
+            "sale_price": price if for_sale else None,
+            "rental_price": None if for_sale else price / 10,
+            "rental_period": self.rng.choice(RentalPeriodType.values),
+            "created_at": created_at,
+            "updated_at": self.past(self.now - created_at),
+        }
+
+    def create_items(self, item_count: int, book_count: int, users: list) -> list:
+        """Create items and books, return (id, owner, created_at) of all."""
+        items = []
+
+        def generate(model, count, extra):
+            for _ in range(count):
+                fields = self.item_fields(len(items), users)
+                items.append((fields["id"], fields["user_id"], fields["created_at"]))
+                yield model(**fields, **extra(fields))
+
+        categories = [
+            value for value in CategoryType.values if value != CategoryType.BOOKS
+        ]
+        copy_rows(
+            Item,
+            generate(
+                Item, item_count, lambda _: {"category": self.rng.choice(categories)}
+            ),
+            self.batch_size,
+        )
+        if book_count:
+            self.create_books(generate, book_count)
+        return items
+
+    def create_books(self, generate, count: int) -> None:
+        authors = [
+            Author(id=self.new_uuid(), name=f"{self.prefix}Author {index}")
+            for index in range(max(count // 5, 1))
+        ]
+        genres = [
+            Genre(id=self.new_uuid(), name=f"{self.prefix}Genre {index}")
+            for index in range(50)
+        ]
+        publishers = [
+            Publisher(id=self.new_uuid(), name=f"{self.prefix}Publisher {index}")
+            for index in range(max(count // 100, 1))
+        ]
+        for model, rows in (
+            (Author, authors),
+            (Genre, genres),
+            (Publisher, publishers),
+        ):
+            copy_rows(model, rows, self.batch_size)
+
+        book_ids = []
+
+        def book_fields(fields):
+            book_ids.append(fields["id"])
+            return {
+                "item_ptr_id": fields["id"],
+                "category": CategoryType.BOOKS,
+                "isbn": f"978{self.rng.randrange(10**10):010d}",
+                "language": self.rng.choice(("de", "en", "fr")),
+                "year": self.rng.randrange(1900, self.now.year + 1),
+                "verlag_id": self.rng.choice(publishers).pk,
+            }
+
+        copy_rows(Book, generate(Book, count, book_fields), self.batch_size)
+
+        for relation, targets, field in (
+            (Book.authors.through, authors, "author_id"),
+            (Book.genres.through, genres, "genre_id"),
+        ):
+            copy_rows(
+                relation,
+                (
+                    relation(book_id=book_id, **{field: target.pk})
+                    for book_id in book_ids
+                    for target in self.rng.sample(targets, min(2, len(targets)))
+                ),
+                self.batch_size,
+            )
+
+    def placeholder_image(self) -> dict:
+        """Store one small image all generated images point to."""
+        image = PILImage.new("RGB", (640, 480), (120, 160, 200))
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG")
+        content = buffer.getvalue()
+        sha256 = hashlib.sha256(content).hexdigest()
+        name = storage.content_addressed_name(sha256, "placeholder.jpg")
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(content))
+        return {
+            "original": name,
+            "sha256": sha256,
+            "phash": dhash(image),
+            "width": image.width,
+            "height": image.height,
+            "placeholder": placeholder_data_uri(image),
+        }
+
+    def create_images(self, items: list, per_item: int) -> int:
+        if not per_item:
+            return 0
+        fields = self.placeholder_image()
+        return copy_rows(
+            Image,
+            (
+                Image(id=self.new_uuid(), item_id=item_id, ordering=ordering, **fields)
+                for item_id, _, _ in items
+                for ordering in range(per_item)
+            ),
+            self.batch_size,
+        )
+
+    def create_shares(self, items: list, users: list, share: float) -> int:
+        """Share items for changes with another user than the owner."""
+        permission = Permission.objects.get(
+            content_type__app_label="items", codename="change_item"
+        )
+
+        def generate():
+            for item_id, owner, _ in items:
+                if self.rng.random() >= share:
+                    continue
+                user_id = self.rng.choice(users)[0]
+                if user_id != owner:
+                    yield ItemUserObjectPermission(
+                        permission=permission,
+                        user_id=user_id,
+                        content_object_id=item_id,
+                    )
+
+        return copy_rows(ItemUserObjectPermission, generate(), self.batch_size)
+
+    def create_bookings(self, items: list, users: list, per_item: float) -> list:
+        """
+        Create bookings by other users, return (id, renter, owner, created_at).
+
+        The bookings of an item follow each other, so confirmed ones never
+        overlap. Past bookings are completed, current and future ones are
+        confirmed, pending or rejected.
+        """
+        bookings = []
+
+        def generate():
+            for item_id, owner, item_created in items:
+                count = int(per_item) + (self.rng.random() < per_item % 1)
+                start = item_created
+                for _ in range(count):
+                    renter = self.rng.choice(users)[0]
+                    if renter == owner:
+                        continue
+                    start += timedelta(hours=self.rng.randrange(1, 24 * 60))
+                    end = start + timedelta(hours=self.rng.randrange(2, 24 * 14))
+                    created_at = min(
+                        max(start - timedelta(days=1), item_created), self.now
+                    )
+                    if end < self.now:
+                        status = self.rng.choice(
+                            (BookingStatus.COMPLETED, BookingStatus.CANCELLED)
+                        )
+                    else:
+                        status = self.rng.choice(
+                            (
+                                BookingStatus.CONFIRMED,
+                                BookingStatus.PENDING,
+                                BookingStatus.REJECTED,
+                            )
+                        )
+                    booking_id = self.new_uuid()
+                    bookings.append((booking_id, renter, owner, created_at))
+                    yield Booking(
+                        id=booking_id,
+                        item_id=item_id,
+                        user_id=renter,
+                        status=status,
+                        time_from=start,
+                        time_to=end,
+                        accepted_by_id=(
+                            owner if status == BookingStatus.CONFIRMED else None
+                        ),
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                    start = end
+
+        copy_rows(Booking, generate(), self.batch_size)
+        return bookings
+
+    def create_messages(self, bookings: list, per_booking: int) -> int:
+        """Create threads alternating between renter and owner, oldest read."""
+
+        def generate():
+            for booking_id, renter, owner, created_at in bookings:
+                sent_at = created_at
+                for index in range(per_booking):
+                    sent_at += timedelta(minutes=self.rng.randrange(1, 600))
+                    yield Message(
+                        id=self.new_uuid(),
+                        booking_id=booking_id,
+                        sender_id=owner if index % 2 else renter,
+                        message=" ".join(self.rng.choices(WORDS, k=12)),
+                        is_read=index < per_booking - 1,
+                        created_at=sent_at,
+                        updated_at=sent_at,
+                    )
+
+        return copy_rows(Message, generate(), self.batch_size)
@@ -0,0 +1,36 @@
+"""Application counters shared by all processes.
+
+Counters live in the default cache, which is Redis in production, so every
+worker adds to the same totals. They are meant for operational insight, not
+exact accounting: counters may be lost when the cache is cleared or evicts
+them.
+"""
+
+from django.core.cache import cache
+
+METRICS_PREFIX = "metrics"
+
+
+def metric_key(name: str) -> str:
+    return f"{METRICS_PREFIX}:{name}"
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """Add `amount` to the counter `name`."""
+    key = metric_key(name)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # The counter does not exist yet, add() loses no concurrent increment
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def get_counters(*names: str) -> dict[str, int]:
+    """Return the current value of the given counters."""
+    values = cache.get_many([metric_key(name) for name in names])
+    return {name: values.get(metric_key(name), 0) for name in names}
+
+
+def reset(*names: str) -> None:
+    cache.delete_many([metric_key(name) for name in names])
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_tombstone"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("protocol", models.CharField(max_length=10)),
+                ("method", models.CharField(blank=True, max_length=10)),
+                ("path", models.CharField(max_length=2000)),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                ("duration_ms", models.FloatField()),
+                ("sample_count", models.PositiveIntegerField()),
+                ("query_count", models.PositiveIntegerField()),
+                ("query_time_ms", models.FloatField()),
+                ("stacks", models.JSONField(default=dict)),
+                ("queries", models.JSONField(default=list)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
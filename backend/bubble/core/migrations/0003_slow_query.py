@@ -0,0 +1,43 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_request_profile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=40, unique=True)),
+                ("sql", models.TextField()),
+                ("origin", models.CharField(blank=True, max_length=500)),
+                ("stack", models.TextField(blank=True)),
+                ("source", models.CharField(blank=True, max_length=200)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total_ms", models.FloatField(default=0)),
+                ("max_ms", models.FloatField(default=0)),
+                ("first_seen", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_seen", models.DateTimeField(default=django.utils.timezone.now)),
+                ("plan", models.TextField(blank=True)),
+                ("explained_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "slow queries",
+                "ordering": ["-total_ms"],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:25
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("core", "0003_slow_query"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tombstone",
+            name="public",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="users",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.UUIDField(), default=list, size=None
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["users"], name="tombstone_users_idx"
+            ),
+        ),
+    ]
@@ -1 +1,135 @@
-# Create your models here.
+"""Models shared by all apps."""
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+from django.utils import timezone
+
+
+class TombstoneQuerySet(models.QuerySet):
+    def record(self, model: type[models.Model], instances) -> list["Tombstone"]:
+        """Remember that `instances` of `model` were deleted, and who could see them."""
+        content_type = ContentType.objects.get_for_model(model)
+        return self.bulk_create(
+            self.model(
+                content_type=content_type,
+                object_id=str(pk),
+                users=list(dict.fromkeys(users)),
+                public=public,
+            )
+            for pk, (users, public) in model.sync_audiences(instances).items()
+        )
+
+    def for_model(self, model: type[models.Model]) -> "TombstoneQuerySet":
+        return self.filter(content_type=ContentType.objects.get_for_model(model))
+
+
+class Tombstone(models.Model):
+    """
+    Deleted row of one of the `SYNC_MODELS`.
+
+    Delta sync clients learn about deletions from tombstones, see
+    `bubble.core.api.pagination.DeltaPagination`. Tombstones are pruned after
+    `SYNC_TOMBSTONE_RETENTION_DAYS`.
+
+    Only the `users` who could see the row when it was deleted receive its
+    tombstone, and clients of public feeds if it was `public`. The models
+    return both from `sync_audiences()`.
+    """
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name="+"
+    )
+    object_id = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    users = ArrayField(models.UUIDField(), default=list)
+    public = models.BooleanField(default=False)
+
+    objects = TombstoneQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["content_type", "deleted_at", "id"],
+                name="tombstone_type_deleted_idx",
+            ),
+            GinIndex(fields=["users"], name="tombstone_users_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_id}"
+
+
+class RequestProfile(models.Model):
+    """
+    Profile of a single request or WebSocket connection.
+
+    Recorded on demand, see `bubble.core.profiling`. `stacks` maps folded
+    stacks to their number of samples, `queries` lists every SQL statement
+    with its duration and origin in the project code.
+    """
+
+    created_at = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    protocol = models.CharField(max_length=10)
+    method = models.CharField(max_length=10, blank=True)
+    path = models.CharField(max_length=2000)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    query_count = models.PositiveIntegerField()
+    query_time_ms = models.FloatField()
+    stacks = models.JSONField(default=dict)
+    queries = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method or self.protocol} {self.path}"
+
+    def folded_stacks(self) -> str:
+        """Return the stacks in the input format of flamegraph tools."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class SlowQuery(models.Model):
+    """
+    Slow SQL statements, aggregated by fingerprint.
+
+    Recorded by `bubble.core.slow_queries`. The fingerprint covers the
+    normalized statement and the stack of project code running it, `plan`
+    is the last sampled `EXPLAIN (ANALYZE, BUFFERS)` output.
+    """
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField()
+    origin = models.CharField(max_length=500, blank=True)
+    stack = models.TextField(blank=True)
+    source = models.CharField(max_length=200, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+    plan = models.TextField(blank=True)
+    explained_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-total_ms"]
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return self.sql[:100]
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
@@ -0,0 +1,317 @@
+"""Prometheus metrics of the web processes and the Celery workers.
+
+The web processes expose them at `/metrics`, see `metrics_view`, Celery
+workers on `METRICS_WORKER_PORT`. With `PROMETHEUS_MULTIPROC_DIR` set, as
+for prefork Celery workers, the values of all processes of a container are
+collected from that directory; the database connection gauges only cover
+the process answering the scrape then.
+
+Counters of `bubble.core.metrics` are exposed as well, they are shared by
+all processes through the cache.
+"""
+
+import logging
+import os
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+import prometheus_client
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+    worker_ready,
+)
+from django.conf import settings
+from django.db import connections
+from django.utils.connection import ConnectionProxy
+from kombu.exceptions import ChannelError, OperationalError
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from bubble.core import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Buckets of calls to external services, which take up to minutes
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "bubble_http_request_duration_seconds",
+    "Duration of HTTP requests by view.",
+    ["view", "method", "status"],
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "bubble_http_request_db_queries",
+    "Database queries per HTTP request by view.",
+    ["view"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_REQUEST_QUERY_DURATION = Histogram(
+    "bubble_http_request_db_duration_seconds",
+    "Time per HTTP request spent in database queries by view.",
+    ["view"],
+)
+CELERY_TASK_DURATION = Histogram(
+    "bubble_celery_task_duration_seconds",
+    "Runtime of Celery tasks by task and final state.",
+    ["task", "state"],
+    buckets=SLOW_BUCKETS,
+)
+CELERY_TASK_LAST_SUCCESS = Gauge(
+    "bubble_celery_task_last_success_timestamp_seconds",
+    "Time of the last successful run of Celery tasks, e.g. periodic ones.",
+    ["task"],
+    multiprocess_mode="max",
+)
+GROUP_SEND_DURATION = Histogram(
+    "bubble_channels_group_send_duration_seconds",
+    "Duration of channel layer group sends by message type.",
+    ["type"],
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "bubble_websocket_connections",
+    "Connected WebSocket clients.",
+    multiprocess_mode="livesum",
+)
+AI_CALL_DURATION = Histogram(
+    "bubble_ai_call_duration_seconds",
+    "Duration of calls to AI providers, failed ones included.",
+    ["provider", "operation"],
+    buckets=SLOW_BUCKETS,
+)
+AI_CALL_ERRORS = prometheus_client.Counter(
+    "bubble_ai_call_errors",
+    "Calls to AI providers that raised an error.",
+    ["provider", "operation"],
+)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+request_queries: ContextVar[QueryStats | None] = ContextVar(
+    "request_queries", default=None
+)
+# Connections of this process, see `DatabaseConnectionCollector`
+database_connections = weakref.WeakSet()
+
+
+def count_queries(execute, sql, params, many, context):
+    """Database execute wrapper adding to the stats of the current request."""
+    stats = request_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - start
+
+
+def install_query_counter(sender=None, connection=None, **kwargs) -> None:
+    """Count queries of new connections, see the `connection_created` signal."""
+    # E.g. `django.db.connection`, which is not hashable
+    if isinstance(connection, ConnectionProxy):
+        connection = connections[connection.alias]
+    database_connections.add(connection)
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def view_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Record the duration and database queries of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        token = request_queries.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_queries.reset(token)
+        duration = time.perf_counter() - start
+
+        view = view_label(request)
+        HTTP_REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(duration)
+        HTTP_REQUEST_QUERIES.labels(view).observe(stats.count)
+        HTTP_REQUEST_QUERY_DURATION.labels(view).observe(stats.seconds)
+        return response
+
+
+@contextmanager
+def observe_ai_call(provider: str, operation: str):
+    """Record the duration and errors of a call to an AI provider, and trace it."""
+    start = time.perf_counter()
+    try:
+        with tracing.span(
+            f"{provider} {operation}",
+            kind="client",
+            **{"gen_ai.system": provider, "gen_ai.operation.name": operation},
+        ):
+            yield
+    except Exception:
+        AI_CALL_ERRORS.labels(provider, operation).inc()
+        raise
+    finally:
+        AI_CALL_DURATION.labels(provider, operation).observe(
+            time.perf_counter() - start
+        )
+
+
+class ScrapeCollector:
+    """Base of collectors, which only read their values when scraped."""
+
+    def describe(self):
+        return []
+
+
+class DatabaseConnectionCollector(ScrapeCollector):
+    """Open database connections of this process and those in a transaction."""
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "bubble_db_connections",
+            "Database connections of this process by state.",
+            labels=["alias", "state"],
+        )
+        counts = Counter()
+        for connection in list(database_connections):
+            if connection.connection is None:
+                continue
+            counts[connection.alias, "open"] += 1
+            if connection.in_atomic_block:
+                counts[connection.alias, "in_transaction"] += 1
+        for (alias, state), count in sorted(counts.items()):
+            family.add_metric([alias, state], count)
+        yield family
+
+
+class CacheCounterCollector(ScrapeCollector):
+    """Counters of `bubble.core.metrics`, e.g. hits of the response cache."""
+
+    def collect(self):
+        from bubble.core.api import conditional, response_cache  # noqa: PLC0415
+
+        names = (*response_cache.METRICS, *conditional.METRICS)
+        for name, value in metrics.get_counters(*names).items():
+            family = CounterMetricFamily(
+                "bubble_" + name.replace(".", "_"),
+                f"Application counter {name}.",
+            )
+            family.add_metric([], value)
+            yield family
+
+
+class QueueLengthCollector(ScrapeCollector):
+    """Messages waiting in the queues of a Celery app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "bubble_celery_queue_length",
+            "Messages waiting in the Celery queues.",
+            labels=["queue"],
+        )
+        try:
+            with self.app.connection_for_read() as connection:
+                connection.ensure_connection(max_retries=1)
+                channel = connection.default_channel
+                for queue in sorted(self.app.amqp.queues):
+                    try:
+                        _, count, _ = channel.queue_declare(queue=queue, passive=True)
+                    except ChannelError:
+                        # Queues without messages do not exist in Redis
+                        count = 0
+                    family.add_metric([queue], count)
+        except OperationalError:
+            logger.warning("Could not read the Celery queue lengths", exc_info=True)
+        yield family
+
+
+def get_registry(*collectors: ScrapeCollector) -> CollectorRegistry:
+    """Return the registry to expose, with the values of all processes."""
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in collectors:
+        registry.register(collector)
+    return registry
+
+
+WEB_COLLECTORS = (DatabaseConnectionCollector(), CacheCounterCollector())
+if not MULTIPROCESS:
+    for collector in WEB_COLLECTORS:
+        REGISTRY.register(collector)
+
+
+# Celery
+
+
+@task_prerun.connect
+def start_task_timer(sender=None, task_id=None, task=None, **kwargs):
+    task.request.metrics_start = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task(sender=None, task_id=None, task=None, state=None, **kwargs):
+    start = getattr(task.request, "metrics_start", None)
+    if start is None:
+        return
+    CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+        time.perf_counter() - start
+    )
+    if state == "SUCCESS":
+        CELERY_TASK_LAST_SUCCESS.labels(task.name).set_to_current_time()
+
+
+@worker_ready.connect
+def start_worker_exporter(sender=None, **kwargs):
+    """Serve the metrics of the worker and its pool processes."""
+    port = settings.METRICS_WORKER_PORT
+    if not port:
+        return
+    queue_lengths = QueueLengthCollector(sender.app)
+    if not MULTIPROCESS:
+        REGISTRY.register(queue_lengths)
+    start_http_server(port, registry=get_registry(queue_lengths))
+    logger.info("Serving Celery metrics on port %s", port)
+
+
+@worker_process_shutdown.connect
+def remove_process_metrics(pid=None, **kwargs):
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
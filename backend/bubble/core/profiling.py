@@ -0,0 +1,243 @@
+"""On-demand profiling of single requests and WebSocket connections.
+
+With `REQUEST_PROFILING` enabled, requests and WebSocket connections asking
+for it with the `X-Profile` header or the `profile` query parameter are
+profiled. Staff users may pass any value, everyone else, e.g. API clients
+authenticated by token, needs a signed token from `manage.py profile_token`.
+
+A sampling thread records the stacks of the profiled thread, of all threads
+for WebSocket connections as their database work runs in a thread pool.
+Every SQL statement is recorded with its duration and the line of project
+code it came from. Reports are stored as `RequestProfile` rows, shown and
+downloadable in the admin; responses carry their id in `X-Profile-Id`.
+
+With the setting disabled the middleware removes itself, no query wrapper
+is installed and consumers are not wrapped, so nothing runs per request.
+"""
+
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+signer = signing.TimestampSigner(salt="bubble.core.profiling")
+
+active_profile: ContextVar["Profile | None"] = ContextVar(
+    "active_profile", default=None
+)
+
+
+def make_token() -> str:
+    """Return a token allowing to profile requests of any user."""
+    return signer.sign(PROFILE_PARAM)
+
+
+def is_requested(value: str | None, user) -> bool:
+    """Return whether `value` of the header or parameter asks for a profile."""
+    if not value:
+        return False
+    if user is not None and user.is_staff:
+        return True
+    try:
+        signer.unsign(value, max_age=settings.REQUEST_PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    if path.is_relative_to(settings.BASE_DIR):
+        path = path.relative_to(settings.BASE_DIR)
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+
+
+def fold(frame) -> str:
+    """Return the stack of `frame` as `outer;...;inner`, see flamegraph tools."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def query_origin() -> str:
+    """Return the innermost line of project code executing a query."""
+    this_file = str(Path(__file__))
+    for entry in reversed(traceback.extract_stack()):
+        if entry.filename.startswith(str(settings.APPS_DIR)) and (
+            entry.filename != this_file
+        ):
+            path = Path(entry.filename).relative_to(settings.BASE_DIR)
+            return f"{path}:{entry.lineno} in {entry.name}"
+    return ""
+
+
+class Sampler(threading.Thread):
+    """Count the stacks of `thread_ids`, or all other threads if None."""
+
+    def __init__(self, thread_ids: set[int] | None, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():  # noqa: SLF001
+                if thread_id == own:
+                    continue
+                if self.thread_ids is None or thread_id in self.thread_ids:
+                    self.stacks[fold(frame)] += 1
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+class Profile:
+    """Collect samples and queries while the context is active."""
+
+    def __init__(self, *, all_threads: bool = False):
+        thread_ids = None if all_threads else {threading.get_ident()}
+        self.sampler = Sampler(thread_ids, settings.REQUEST_PROFILING_INTERVAL)
+        self.queries: list[dict] = []
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.token = active_profile.set(self)
+        self.start = time.perf_counter()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self.start
+        active_profile.reset(self.token)
+
+    def record_query(self, sql: str, start: float) -> None:
+        self.queries.append(
+            {
+                "sql": sql,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "origin": query_origin(),
+            }
+        )
+
+    def save(self, user, **fields):
+        """Store the report, `fields` describe the request."""
+        from bubble.core.models import RequestProfile  # noqa: PLC0415
+
+        return RequestProfile.objects.create(
+            user_id=user.pk if user is not None and user.is_authenticated else None,
+            duration_ms=round(self.duration * 1000, 3),
+            sample_count=self.sampler.stacks.total(),
+            stacks=dict(self.sampler.stacks.most_common()),
+            query_count=len(self.queries),
+            query_time_ms=round(sum(q["duration_ms"] for q in self.queries), 3),
+            queries=self.queries,
+            **fields,
+        )
+
+
+def record_queries(execute, sql, params, many, context):
+    """Database execute wrapper recording queries of the active profile."""
+    profile = active_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, start)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs) -> None:
+    """Wrap queries of new connections, see the `connection_created` signal."""
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def install_query_recorders() -> None:
+    """Wrap queries of connections created before profiling was set up."""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection=connection)
+
+
+class ProfilingMiddleware:
+    """Profile requests asking for it, removed unless `REQUEST_PROFILING`."""
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+        if not is_requested(value, getattr(request, "user", None)):
+            return self.get_response(request)
+
+        with Profile() as profile:
+            response = self.get_response(request)
+        report = profile.save(
+            getattr(request, "user", None),
+            protocol="http",
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status_code=response.status_code,
+        )
+        response[PROFILE_ID_HEADER] = str(report.pk)
+        return response
+
+
+class ProfilingConsumerMiddleware:
+    """Profile WebSocket connections asking for it, from connect to close."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers", ()))
+        query = parse_qs(scope.get("query_string", b"").decode())
+        value = (
+            headers.get(PROFILE_HEADER.lower().encode(), b"").decode()
+            or (query.get(PROFILE_PARAM, [""])[0])
+        )
+        user = scope.get("user")
+        if scope["type"] != "websocket" or not is_requested(value, user):
+            return await self.app(scope, receive, send)
+
+        with Profile(all_threads=True) as profile:
+            result = await self.app(scope, receive, send)
+        await database_sync_to_async(profile.save)(
+            user,
+            protocol="websocket",
+            method="",
+            path=scope["path"][:2000],
+            status_code=None,
+        )
+        return result
+
+
+def profile_consumers(app):
+    """Wrap `app` for profiling, inside the auth middleware providing users."""
+    if not settings.REQUEST_PROFILING:
+        return app
+    return ProfilingConsumerMiddleware(app)
@@ -1,12 +1,23 @@
-"""Signal handlers for setting up default permissions and groups."""
+"""Signal handlers for default permissions and groups, tombstones, the config,
+query recording of metrics, profiles and slow queries, and tracing of tasks."""
 
 import logging
+from weakref import WeakKeyDictionary
 
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from constance.signals import config_updated
+from django.conf import settings
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import post_migrate
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.deletion import Collector
+from django.db.models.signals import post_migrate, pre_delete
 from django.dispatch import receiver
 
+from . import monitoring, profiling, slow_queries, tracing
+from .api import response_cache
+from .models import Tombstone
 from .permissions_config import DEFAULT_GROUPS_CONFIG
 
 logger = logging.getLogger(__name__)
@@ -59,3 +70,64 @@ def setup_default_permissions(sender, **kwargs):
     # Only run for specific apps to avoid running multiple times
     if sender.name in ["bubble.core"]:
         create_default_groups_and_permissions()
+
+
+@receiver(config_updated)
+def invalidate_config_cached_responses(sender, key, **kwargs):
+    if key in settings.CONSTANCE_CONFIG_PUBLIC:
+        response_cache.invalidate("config")
+
+
+# Rows of every deletion with recorded tombstones, by the origin of the deletion
+recorded_deletions = WeakKeyDictionary()
+
+
+def record_tombstones(sender, instance, using, origin=None, **kwargs):
+    """Keep the primary keys of deleted rows for delta sync clients.
+
+    Recorded before the deletion, while the shares of the rows still exist.
+    The first signal of a deletion collects all rows of the `SYNC_MODELS` it
+    deletes and records them with a few queries per model, the signals of
+    the other rows find them recorded.
+    """
+    recorded = recorded_deletions.get(origin, set()) if origin is not None else set()
+    if (sender, instance.pk) in recorded:
+        return
+    if origin is None:
+        Tombstone.objects.record(sender, [instance])
+        return
+
+    collector = Collector(using=using, origin=origin)
+    collector.collect(origin if isinstance(origin, QuerySet) else [origin])
+    collected = {
+        model: [obj for obj in objs if (model, obj.pk) not in recorded]
+        for model, objs in collector.data.items()
+        if model._meta.label in settings.SYNC_MODELS  # noqa: SLF001
+    }
+    if not any(obj.pk == instance.pk for obj in collected.get(sender, [])):
+        collected.setdefault(sender, []).append(instance)
+    for model, objs in collected.items():
+        if objs:
+            Tombstone.objects.record(model, objs)
+            recorded.update((model, obj.pk) for obj in objs)
+    recorded_deletions[origin] = recorded
+
+
+for model in settings.SYNC_MODELS:
+    pre_delete.connect(record_tombstones, sender=model, dispatch_uid=model)
+
+connection_created.connect(monitoring.install_query_counter)
+
+if settings.SLOW_QUERY_THRESHOLD_MS:
+    connection_created.connect(slow_queries.install_slow_query_recorder)
+    task_prerun.connect(slow_queries.set_task_source)
+    task_postrun.connect(slow_queries.reset_task_source)
+
+if settings.TRACING_EXPORTER:
+    before_task_publish.connect(tracing.inject_task_headers)
+    task_prerun.connect(tracing.start_task_trace)
+    task_postrun.connect(tracing.end_task_trace)
+
+if settings.REQUEST_PROFILING:
+    connection_created.connect(profiling.install_query_recorder)
+    profiling.install_query_recorders()
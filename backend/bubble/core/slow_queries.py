@@ -0,0 +1,283 @@
+"""Recording of slow SQL statements with sampled query plans.
+
+Statements taking `SLOW_QUERY_THRESHOLD_MS` or longer are normalized, e.g.
+literals and `IN` lists replaced by placeholders, and aggregated as
+`SlowQuery` rows per fingerprint of the statement and the project code
+running it, together with the last view or Celery task they ran in.
+
+For `SLOW_QUERY_EXPLAIN_RATE` of the recorded statements, at most once per
+`SLOW_QUERY_EXPLAIN_INTERVAL` and fingerprint, the plan is captured with
+`EXPLAIN (ANALYZE, BUFFERS)` in a transaction that is rolled back. A
+background thread records and explains on its own database connection,
+so requests only wait for the timing of their statements.
+"""
+
+import hashlib
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Statements waiting to be recorded, further ones are dropped
+QUEUE_SIZE = 1000
+# Files of the recording code itself, left out of the stacks
+INSTRUMENTATION = {
+    str(Path(__file__).with_name(name))
+    for name in ("slow_queries.py", "monitoring.py", "profiling.py", "tracing.py")
+}
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s")
+LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+SPACE_RE = re.compile(r"\s+")
+
+# The request or the name of the task statements run for
+source: ContextVar[object] = ContextVar("slow_query_source", default=None)
+rng = random.Random()  # noqa: S311
+recording = threading.local()
+
+
+def normalize(sql: str) -> str:
+    """Replace literals, parameters and lists of them by placeholders."""
+    sql = STRING_RE.sub("?", sql)
+    sql = PLACEHOLDER_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = LIST_RE.sub("(?, ...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def project_stack() -> list[tuple[str, int, str]]:
+    """Return path, line and function of the frames of project code, innermost last."""
+    apps_dir = str(settings.APPS_DIR)
+    return [
+        (
+            str(Path(entry.filename).relative_to(settings.BASE_DIR)),
+            entry.lineno,
+            entry.name,
+        )
+        for entry in traceback.extract_stack()
+        if entry.filename.startswith(apps_dir) and entry.filename not in INSTRUMENTATION
+    ]
+
+
+def format_frame(frame: tuple[str, int, str]) -> str:
+    path, line, name = frame
+    return f"{path}:{line} in {name}"
+
+
+def describe_source() -> str:
+    from bubble.core.monitoring import view_label  # noqa: PLC0415
+
+    current = source.get()
+    if current is None or isinstance(current, str):
+        return current or ""
+    return view_label(current)
+
+
+@dataclass
+class Statement:
+    """A slow statement as it ran, before it is aggregated."""
+
+    alias: str
+    sql: str
+    params: object
+    many: bool
+    duration_ms: float
+    normalized: str
+    stack: list[tuple[str, int, str]]
+    source: str
+
+    @property
+    def fingerprint(self) -> str:
+        # Without line numbers, which change with unrelated edits
+        frames = "\n".join(f"{path} in {name}" for path, _, name in self.stack)
+        return hashlib.sha1(  # noqa: S324
+            f"{self.normalized}\n{frames}".encode()
+        ).hexdigest()
+
+    @property
+    def explainable(self) -> bool:
+        return not self.many and self.sql.lstrip().upper().startswith("SELECT")
+
+
+def capture(
+    alias: str, sql: str, params, duration_ms: float, *, many: bool = False
+) -> Statement:
+    return Statement(
+        alias=alias,
+        sql=sql,
+        params=params,
+        many=many,
+        duration_ms=duration_ms,
+        normalized=normalize(sql),
+        stack=project_stack(),
+        source=describe_source(),
+    )
+
+
+def store(statement: Statement) -> None:
+    """Add `statement` to its `SlowQuery` and explain it if sampled."""
+    from bubble.core.models import SlowQuery  # noqa: PLC0415
+
+    fingerprint = statement.fingerprint
+    now = timezone.now()
+    update = {
+        "count": F("count") + 1,
+        "total_ms": F("total_ms") + statement.duration_ms,
+        "max_ms": Greatest(F("max_ms"), statement.duration_ms),
+        "last_seen": now,
+        "source": statement.source[:200],
+    }
+    rows = SlowQuery.objects.filter(fingerprint=fingerprint)
+    if not rows.update(**update):
+        try:
+            with transaction.atomic():
+                SlowQuery.objects.create(
+                    fingerprint=fingerprint,
+                    sql=statement.normalized,
+                    origin=format_frame(statement.stack[-1]) if statement.stack else "",
+                    stack="\n".join(map(format_frame, statement.stack)),
+                    source=statement.source[:200],
+                    count=1,
+                    total_ms=statement.duration_ms,
+                    max_ms=statement.duration_ms,
+                    first_seen=now,
+                    last_seen=now,
+                )
+        except IntegrityError:
+            # Recorded by another process in the meantime
+            rows.update(**update)
+
+    if not statement.explainable or rng.random() >= settings.SLOW_QUERY_EXPLAIN_RATE:
+        return
+    stale = now - timedelta(seconds=settings.SLOW_QUERY_EXPLAIN_INTERVAL)
+    # Claim the plan, so concurrent processes do not explain it as well
+    claimed = rows.filter(
+        Q(explained_at__isnull=True) | Q(explained_at__lt=stale)
+    ).update(explained_at=now)
+    if claimed:
+        rows.update(plan=explain(statement))
+
+
+def explain(statement: Statement) -> str:
+    """Return the plan of `statement`, which runs in a rolled back transaction."""
+    connection = connections[statement.alias]
+    try:
+        with transaction.atomic(using=statement.alias), connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    "SET LOCAL statement_timeout = %s",
+                    [settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS],
+                )
+                cursor.execute(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement.sql}", statement.params
+                )
+                return "\n".join(row[0] for row in cursor.fetchall())
+            finally:
+                # Only once done, statements of a rollback-only block fail
+                transaction.set_rollback(True, using=statement.alias)
+    except DatabaseError as error:
+        return f"EXPLAIN failed: {error}"
+
+
+class Recorder(threading.Thread):
+    """Store slow statements on a connection of its own, one per process."""
+
+    instance: "Recorder | None" = None
+    starting = threading.Lock()
+
+    def __init__(self):
+        super().__init__(name="slow-query-recorder", daemon=True)
+        self.statements: queue.Queue[Statement] = queue.Queue(QUEUE_SIZE)
+
+    @classmethod
+    def get(cls) -> "Recorder":
+        with cls.starting:
+            if cls.instance is None or not cls.instance.is_alive():
+                cls.instance = cls()
+                cls.instance.start()
+        return cls.instance
+
+    def submit(self, statement: Statement) -> None:
+        try:
+            self.statements.put_nowait(statement)
+        except queue.Full:
+            logger.warning("Dropped a slow query, the recorder is behind")
+
+    def run(self):
+        # Statements of the recorder itself are not recorded
+        recording.active = True
+        while True:
+            statement = self.statements.get()
+            try:
+                store(statement)
+            except DatabaseError:
+                logger.exception("Could not record a slow query")
+            finally:
+                connections.close_all()
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    """Database execute wrapper submitting statements above the threshold."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS and not getattr(
+            recording, "active", False
+        ):
+            alias = context["connection"].alias
+            Recorder.get().submit(capture(alias, sql, params, duration_ms, many=many))
+
+
+def install_slow_query_recorder(sender=None, connection=None, **kwargs) -> None:
+    """Time statements of new connections, see the `connection_created` signal."""
+    if record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_queries)
+
+
+class SlowQueryMiddleware:
+    """Remember the request, whose view statements are recorded with."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = source.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            source.reset(token)
+
+
+# Celery, connected in `bubble.core.signals` if recording is enabled
+
+
+def set_task_source(sender=None, task_id=None, task=None, **kwargs):
+    task.request.slow_query_token = source.set(task.name)
+
+
+def reset_task_source(sender=None, task_id=None, task=None, **kwargs):
+    token = getattr(task.request, "slow_query_token", None)
+    if token is not None:
+        source.reset(token)
@@ -0,0 +1,244 @@
+"""Garbage collection of media files no database row references anymore.
+
+Deleting images, items, rooms or users leaves their files in storage, and
+imagekit never removes the cache files it renders from an original. The
+collector walks the media storage in sorted order and checks every batch of
+file names against the database with one query per batch, so memory stays
+bounded by the batch size and the size of a single directory listing.
+"""
+
+import logging
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import batched
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.storage import Storage, default_storage
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "CACHE/images"
+
+
+@dataclass
+class CollectionReport:
+    scanned: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    # Too recent to collect
+    skipped: int = 0
+    # Orphans referenced again when deleting, e.g. by a new identical upload
+    kept: int = 0
+    errors: int = 0
+
+
+def walk(storage: Storage, path: str) -> Iterator[str]:
+    """Yield all file names below `path` in sorted order."""
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+
+    for name in sorted(files):
+        yield f"{path}/{name}"
+    for directory in sorted(directories):
+        yield from walk(storage, f"{path}/{directory}")
+
+
+def referenced_item_images(names: list[str]) -> set[str]:
+    from bubble.items.models import Image  # noqa: PLC0415
+
+    return set(
+        Image.objects.filter(original__in=names).values_list("original", flat=True)
+    )
+
+
+def referenced_temp_images(names: list[str]) -> set[str]:
+    """Resolve `temp/<kind>/<item prefix>/<image id>/<kind>.jpg` paths."""
+    from bubble.items.models import Image  # noqa: PLC0415
+
+    image_ids = {}
+    for name in names:
+        parts = PurePosixPath(name).parts
+        if len(parts) != 5:  # noqa: PLR2004
+            continue
+        try:
+            image_ids[name] = uuid.UUID(parts[3])
+        except ValueError:
+            continue
+
+    existing = set(
+        Image.objects.filter(pk__in=set(image_ids.values())).values_list(
+            "pk", flat=True
+        )
+    )
+    return {name for name, image_id in image_ids.items() if image_id in existing}
+
+
+def referenced_cached_images(names: list[str]) -> set[str]:
+    """
+    Resolve imagekit cache files to the originals they were rendered from.
+
+    Derivatives of an original are stored below `CACHE/images/<original>/`,
+    see `bubble.items.storage.cachefile_name`.
+    """
+    from bubble.items.models import Image  # noqa: PLC0415
+
+    sources = {
+        name: str(PurePosixPath(name).parent.relative_to(CACHE_PREFIX))
+        for name in names
+    }
+    existing = set(
+        Image.objects.filter(original__in=set(sources.values())).values_list(
+            "original", flat=True
+        )
+    )
+    return {name for name, source in sources.items() if source in existing}
+
+
+def referenced_room_photos(names: list[str]) -> set[str]:
+    from bubble.rooms.models import Room  # noqa: PLC0415
+
+    return set(Room.objects.filter(photo__in=names).values_list("photo", flat=True))
+
+
+def referenced_profile_images(names: list[str]) -> set[str]:
+    from bubble.users.models import Profile  # noqa: PLC0415
+
+    return set(
+        Profile.objects.filter(profile_image__in=names).values_list(
+            "profile_image", flat=True
+        )
+    )
+
+
+# Storage prefixes the collector owns, with the lookup telling which names of
+# a batch are still referenced. Files outside these prefixes are never touched.
+REFERENCES: dict[str, Callable[[list[str]], set[str]]] = {
+    "items": referenced_item_images,
+    "temp": referenced_temp_images,
+    CACHE_PREFIX: referenced_cached_images,
+    "rooms": referenced_room_photos,
+    "users": referenced_profile_images,
+}
+
+
+def is_old_enough(storage: Storage, name: str, cutoff: datetime) -> bool:
+    """Protect files of uploads whose transaction has not committed yet."""
+    try:
+        return storage.get_modified_time(name) < cutoff
+    except (NotImplementedError, OSError):
+        return False
+
+
+def delete_orphan(storage: Storage, name: str) -> bool:
+    """Delete an orphaned file, returns whether it was deleted."""
+    from bubble.items import storage as item_storage  # noqa: PLC0415
+
+    if item_storage.is_content_addressed(name):
+        # Re-checks references under the digest lock, so a concurrent upload
+        # linking to the same content keeps its file
+        return item_storage.release_original(name, PurePosixPath(name).parent.name)
+    storage.delete(name)
+    return True
+
+
+@dataclass
+class GarbageCollector:
+    storage: Storage
+    cutoff: datetime
+    delete: bool
+    on_orphan: Callable[[str], None] | None = None
+    report: CollectionReport = field(default_factory=CollectionReport)
+
+    def collect(self, names: list[str], referenced: set[str]) -> None:
+        """Report, and delete, the names of a batch that are not referenced."""
+        self.report.scanned += len(names)
+        for name in names:
+            if name in referenced:
+                continue
+            if not is_old_enough(self.storage, name, self.cutoff):
+                self.report.skipped += 1
+                continue
+
+            self.report.orphaned += 1
+            if self.on_orphan is not None:
+                self.on_orphan(name)
+            if self.delete:
+                self.delete_orphan(name)
+
+    def delete_orphan(self, name: str) -> None:
+        try:
+            deleted = delete_orphan(self.storage, name)
+        except OSError:
+            logger.exception("Could not delete orphaned file %s", name)
+            self.report.errors += 1
+        else:
+            if deleted:
+                self.report.deleted += 1
+            else:
+                self.report.kept += 1
+
+
+def collect_garbage(  # noqa: PLR0913
+    *,
+    delete: bool = False,
+    prefixes: Iterable[str] | None = None,
+    batch_size: int | None = None,
+    min_age: timedelta | None = None,
+    sleep: float | None = None,
+    storage: Storage = default_storage,
+    on_orphan: Callable[[str], None] | None = None,
+) -> CollectionReport:
+    """
+    Find, and with `delete` remove, media files no database row references.
+
+    Args:
+        delete: Delete orphaned files instead of only reporting them.
+        prefixes: Storage prefixes to scan, defaults to all of `REFERENCES`.
+        batch_size: Number of file names checked per query.
+        min_age: Files modified more recently are never collected.
+        sleep: Seconds to pause between batches to limit storage and
+            database load.
+        on_orphan: Called with the name of every orphaned file.
+
+    Returns:
+        CollectionReport: Counts of scanned, orphaned, deleted and kept files.
+    """
+    if batch_size is None:
+        batch_size = settings.MEDIA_GC_BATCH_SIZE
+    if min_age is None:
+        min_age = timedelta(hours=settings.MEDIA_GC_MIN_AGE_HOURS)
+    if sleep is None:
+        sleep = settings.MEDIA_GC_BATCH_SLEEP
+
+    collector = GarbageCollector(
+        storage=storage,
+        cutoff=timezone.now() - min_age,
+        delete=delete,
+        on_orphan=on_orphan,
+    )
+    for prefix in prefixes or REFERENCES:
+        resolve = REFERENCES[prefix]
+        for batch in batched(walk(storage, prefix), batch_size):
+            names = list(batch)
+            referenced = resolve(names)
+            collector.collect(names, referenced)
+            if sleep:
+                time.sleep(sleep)
+
+    report = collector.report
+    logger.info(
+        "Media garbage collection scanned %d files, found %d orphans, deleted %d, "
+        "kept %d referenced again",
+        report.scanned,
+        report.orphaned,
+        report.deleted,
+        report.kept,
+    )
+    return report
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from bubble.core.models import Tombstone
+from bubble.core.storage_gc import collect_garbage
+
+
+@shared_task(bind=True)
+def collect_media_garbage(self, *, delete: bool | None = None) -> dict:
+    """Periodic task: report or delete media files no row references.
+
+    Runs weekly. Files are only deleted when `MEDIA_GC_DELETE` is enabled
+    or `delete` is passed explicitly.
+    """
+    if delete is None:
+        delete = settings.MEDIA_GC_DELETE
+    report = collect_garbage(delete=delete)
+    return asdict(report)
+
+
+@shared_task(bind=True)
+def prune_tombstones(self) -> int:
+    """Periodic task: delete tombstones older than the retention period."""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
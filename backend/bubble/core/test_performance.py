@@ -0,0 +1,296 @@
+"""Query budgets and latency baselines of the API endpoints.
+
+Every endpoint is requested against a seeded data set. Lists are requested
+with a small and a large page, which must cost the same number of queries,
+so a query per row fails the suite. The query counts are compared with the
+budgets in `performance_baseline.json`, more queries always fail.
+
+To record the budgets again, e.g. after an intended change, run with
+`PERF_RECORD_QUERIES=<path>`, which writes the counts to that file instead,
+and copy it over `performance_baseline.json`.
+
+Latencies depend on the machine and are only checked when
+`PERF_LATENCY_BASELINE=<path>` names a baseline of median times on it.
+Endpoints missing from the file are recorded there on their first run, times
+fail when slower by more than `PERF_LATENCY_TOLERANCE` (default 0.5, i.e.
+50%).
+"""
+
+# mypy: ignore-errors
+
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import unittest
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image as PILImage
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from bubble.bookings.models import BookingStatus, Message
+from bubble.bookings.tests.factories import BookingFactory
+from bubble.books.models import Author, Book, Genre, Publisher
+from bubble.core.signals import create_default_groups_and_permissions
+from bubble.items.models import (
+    CatalogueEntry,
+    CategoryType,
+    Image,
+    Item,
+    ItemStatus,
+)
+from bubble.items.tests.factories import ItemOwnerUserFactory
+
+QUERY_BUDGETS_PATH = Path(__file__).with_name("performance_baseline.json")
+
+# Rows of every kind, more than the large page so both pages are full
+SEED_ROWS = 30
+SMALL_PAGE = 5
+LARGE_PAGE = 25
+
+# Requests per endpoint, the median counts
+TIMED_RUNS = 5
+# Slowdowns below this many seconds are noise
+LATENCY_SLACK = 0.005
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """An API endpoint and how the suite requests it."""
+
+    name: str
+    path: str
+    params: dict[str, str] = field(default_factory=dict)
+    anonymous: bool = False
+    # Paginated lists are requested with pages of different sizes
+    paginated: bool = False
+
+
+ENDPOINTS = (
+    Endpoint("public-item-list", "/api/public-items/", anonymous=True, paginated=True),
+    Endpoint("public-item-detail", "/api/public-items/{item}/", anonymous=True),
+    Endpoint("item-list", "/api/items/", paginated=True),
+    Endpoint("item-detail", "/api/items/{item}/"),
+    Endpoint("catalogue-list", "/api/catalogue/", anonymous=True, paginated=True),
+    Endpoint("catalogue-detail", "/api/catalogue/{item}/", anonymous=True),
+    Endpoint("book-list", "/api/books/", paginated=True),
+    Endpoint("book-detail", "/api/books/{book}/"),
+    Endpoint("booking-list", "/api/bookings/", paginated=True),
+    Endpoint("booking-detail", "/api/bookings/{booking}/"),
+    Endpoint(
+        "public-booking-list", "/api/public-bookings/", anonymous=True, paginated=True
+    ),
+    Endpoint(
+        "public-booking-detail", "/api/public-bookings/{booking}/", anonymous=True
+    ),
+    Endpoint(
+        "message-list",
+        "/api/messages/",
+        params={"booking": "{booking}"},
+        paginated=True,
+    ),
+    Endpoint("author-list", "/api/authors/", anonymous=True, paginated=True),
+    Endpoint("genre-list", "/api/genres/", anonymous=True, paginated=True),
+    Endpoint("publisher-list", "/api/publishers/", anonymous=True, paginated=True),
+)
+
+
+def load_baseline(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: Path, baseline: dict) -> None:
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def image_file(name: str) -> SimpleUploadedFile:
+    img_io = BytesIO()
+    PILImage.new("RGB", (20, 20)).save(img_io, format="JPEG")
+    return SimpleUploadedFile(name, img_io.getvalue(), content_type="image/jpeg")
+
+
+class EndpointPerformanceTestCase(TestCase):
+    """Guard the query counts and latencies of the list and detail endpoints."""
+
+    @classmethod
+    def setUpClass(cls):
+        # The images of the test data are shared by all tests
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        create_default_groups_and_permissions()
+        cls.owner = ItemOwnerUserFactory()
+        renter = ItemOwnerUserFactory()
+
+        items = [
+            Item.objects.create(
+                user=cls.owner,
+                name=f"Item {index}",
+                description="A well kept item to share with the neighbourhood.",
+                category=CategoryType.GARDEN,
+                status=ItemStatus.AVAILABLE,
+                rental_price="5.00",
+            )
+            for index in range(SEED_ROWS)
+        ]
+        for item in items:
+            Image.objects.create(item=item, original=image_file(f"{item.slug}.jpg"))
+
+        authors = [Author.objects.create(name=f"Author {i}") for i in range(SEED_ROWS)]
+        root_genre = Genre.objects.create(name="Genre 0")
+        genres = [root_genre] + [
+            Genre.objects.create(name=f"Genre {i}", parent_genre=root_genre)
+            for i in range(1, SEED_ROWS)
+        ]
+        publishers = [
+            Publisher.objects.create(name=f"Publisher {i}") for i in range(SEED_ROWS)
+        ]
+        for index in range(SEED_ROWS):
+            book = Book.objects.create(
+                user=cls.owner,
+                name=f"Book {index}",
+                status=ItemStatus.AVAILABLE,
+                verlag=publishers[index],
+            )
+            book.authors.set(authors[index : index + 2])
+            book.genres.set(genres[index : index + 2])
+            Image.objects.create(item=book, original=image_file(f"{book.slug}.jpg"))
+
+        bookings = [
+            BookingFactory(item=item, user=renter, status=BookingStatus.CONFIRMED)
+            for item in items
+        ]
+        for index in range(SEED_ROWS):
+            Message.objects.create(
+                booking=bookings[0],
+                sender=renter if index % 2 else cls.owner,
+                message=f"Message {index}",
+            )
+
+        # Entries are refreshed after the commit, which the test data never sees
+        CatalogueEntry.objects.rebuild()
+
+        cls.ids = {
+            "item": str(items[0].pk),
+            "book": str(book.pk),
+            "booking": str(bookings[0].pk),
+        }
+
+    def setUp(self):
+        # Set again over the per-test MEDIA_ROOT of the conftest fixture
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # A client per user, logging out would count the queries of the session
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        self.anonymous_client = APIClient()
+
+    def request(self, endpoint: Endpoint, **params):
+        params = {
+            **{
+                name: value.format(**self.ids)
+                for name, value in endpoint.params.items()
+            },
+            **params,
+        }
+        client = self.anonymous_client if endpoint.anonymous else self.client
+        response = client.get(endpoint.path.format(**self.ids), params)
+        assert response.status_code == status.HTTP_200_OK, (
+            endpoint.name,
+            response.content,
+        )
+        return response
+
+    def count_queries(self, endpoint: Endpoint, **params) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            self.request(endpoint, **params)
+        return len(queries)
+
+    def measure(self, endpoint: Endpoint) -> float:
+        """Return the median seconds of a request, after a warm up request."""
+        params = (
+            {"pagination": "cursor", "page_size": LARGE_PAGE}
+            if endpoint.paginated
+            else {}
+        )
+        self.request(endpoint, **params)
+        timings = []
+        for _ in range(TIMED_RUNS):
+            start = time.perf_counter()
+            self.request(endpoint, **params)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def test_query_budgets(self):
+        budgets = load_baseline(QUERY_BUDGETS_PATH)
+        record_path = os.environ.get("PERF_RECORD_QUERIES")
+        recorded = {}
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.name):
+                # Warm up the caches of the user, e.g. of the items shared with them
+                self.request(endpoint)
+                if endpoint.paginated:
+                    small = self.count_queries(
+                        endpoint, pagination="cursor", page_size=SMALL_PAGE
+                    )
+                    queries = self.count_queries(
+                        endpoint, pagination="cursor", page_size=LARGE_PAGE
+                    )
+                    assert small == queries, (
+                        f"{endpoint.name}: {small} queries for {SMALL_PAGE} rows, "
+                        f"{queries} for {LARGE_PAGE}"
+                    )
+                else:
+                    queries = self.count_queries(endpoint)
+
+                recorded[endpoint.name] = queries
+                if record_path:
+                    continue
+                assert endpoint.name in budgets, (
+                    f"{endpoint.name}: no query budget, record it with "
+                    "PERF_RECORD_QUERIES"
+                )
+                assert queries <= budgets[endpoint.name], (
+                    f"{endpoint.name}: {queries} queries, budget is "
+                    f"{budgets[endpoint.name]}"
+                )
+        if record_path:
+            save_baseline(Path(record_path), recorded)
+
+    @unittest.skipUnless(
+        os.environ.get("PERF_LATENCY_BASELINE"), "PERF_LATENCY_BASELINE is not set"
+    )
+    def test_latency(self):
+        path = Path(os.environ["PERF_LATENCY_BASELINE"])
+        baseline = load_baseline(path)
+        tolerance = float(os.environ.get("PERF_LATENCY_TOLERANCE", "0.5"))
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.name):
+                seconds = self.measure(endpoint)
+                if endpoint.name not in baseline:
+                    baseline[endpoint.name] = round(seconds, 4)
+                    continue
+                limit = baseline[endpoint.name] * (1 + tolerance) + LATENCY_SLACK
+                assert seconds <= limit, (
+                    f"{endpoint.name}: {seconds * 1000:.1f} ms, baseline is "
+                    f"{baseline[endpoint.name] * 1000:.1f} ms"
+                )
+        save_baseline(path, baseline)
@@ -1,9 +1,40 @@
 """Test the default permissions setup."""
 
+import itertools
+import json
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
+from operator import attrgetter
+from pathlib import Path
+
+import pytest
 from django.contrib.auth.models import Group
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from PIL import Image as PILImage
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
 
+from bubble.bookings.models import Booking, BookingStatus, Message
+from bubble.bookings.tasks import check_bookings_active
+from bubble.books.models import Book
+from bubble.core import monitoring, profiling, slow_queries, tracing
+from bubble.core.loadtest import runner
+from bubble.core.models import RequestProfile, SlowQuery
 from bubble.core.signals import create_default_groups_and_permissions
+from bubble.core.storage_gc import collect_garbage
+from bubble.items import storage as item_storage
+from bubble.items.models import CatalogueEntry, CategoryType, Image, Item
+from bubble.items.tests.factories import ItemOwnerUserFactory
+from bubble.users.tests.factories import UserFactory
 
 
 class TestDefaultPermissions(TestCase):
@@ -46,3 +77,453 @@ class TestDefaultPermissions(TestCase):
 
         # Should have same permissions count (not duplicated)
         assert initial_count == final_count
+
+
+class MediaGarbageCollectionTestCase(TestCase):
+    """Test collection of media files without a database reference."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        item = Item.objects.create(name="Lamp", user=ItemOwnerUserFactory())
+        img_io = BytesIO()
+        PILImage.new("RGB", (40, 40), color="red").save(img_io, format="JPEG")
+        self.image = Image.objects.create(
+            item=item,
+            original=SimpleUploadedFile("lamp.jpg", img_io.getvalue()),
+        )
+        self.image.thumbnail.generate()
+        self.thumbnail = self.image.thumbnail.name
+        self.profile = UserFactory().profile
+        self.profile.profile_image = default_storage.save(
+            "users/portrait.jpg", ContentFile(b"x")
+        )
+        self.profile.save()
+
+        self.orphans = [
+            default_storage.save(
+                "items/2020/01/01/gone/original.jpg", ContentFile(b"x")
+            ),
+            default_storage.save(
+                "CACHE/images/items/2020/gone/original/a.jpg", ContentFile(b"x")
+            ),
+            default_storage.save(
+                f"temp/preview/abcd/{uuid.uuid4()}/preview.jpg", ContentFile(b"x")
+            ),
+            default_storage.save("rooms/1/photo.jpg", ContentFile(b"x")),
+            default_storage.save("users/avatar.jpg", ContentFile(b"x")),
+        ]
+
+    def test_dry_run_reports_orphans(self):
+        found = []
+
+        report = collect_garbage(min_age=timedelta(0), on_orphan=found.append)
+
+        assert sorted(found) == sorted(self.orphans)
+        assert report.deleted == 0
+        assert all(default_storage.exists(name) for name in self.orphans)
+
+    def test_delete_keeps_referenced_files(self):
+        report = collect_garbage(delete=True, min_age=timedelta(0), batch_size=2)
+
+        assert report.deleted == len(self.orphans)
+        assert not any(default_storage.exists(name) for name in self.orphans)
+        assert default_storage.exists(self.image.original.name)
+        assert default_storage.exists(self.thumbnail)
+        assert default_storage.exists(self.profile.profile_image.name)
+
+    def test_cache_files_are_named_after_the_original(self):
+        assert self.thumbnail.startswith(f"CACHE/images/{self.image.original.name}/")
+
+    def test_relinked_orphans_are_reported_as_kept(self):
+        name = default_storage.save(
+            f"{item_storage.CONTENT_ADDRESSED_PREFIX}/ab/cd/{'a' * 64}/original.jpg",
+            ContentFile(b"x"),
+        )
+
+        def relink(orphan):
+            # An identical upload links the file before it is deleted
+            if orphan == name:
+                Image.objects.bulk_create([Image(item=self.image.item, original=name)])
+
+        report = collect_garbage(
+            delete=True, prefixes=["items"], min_age=timedelta(0), on_orphan=relink
+        )
+
+        assert report.orphaned == 2  # noqa: PLR2004
+        assert report.deleted == 1
+        assert report.kept == 1
+        assert default_storage.exists(name)
+
+    def test_recent_files_are_kept(self):
+        report = collect_garbage(delete=True, min_age=timedelta(hours=1))
+
+        assert report.orphaned == 0
+        assert report.skipped == len(self.orphans)
+        assert all(default_storage.exists(name) for name in self.orphans)
+
+
+class LoadTestRunnerTestCase(SimpleTestCase):
+    """Test the summaries of the load test runner."""
+
+    def test_summary_percentiles(self):
+        recorder = runner.Recorder()
+        for milliseconds in range(1, 101):
+            recorder.record("list", 0, milliseconds / 1000)
+        recorder.record("list", 0, 0.2, ok=False)
+
+        summary = recorder.summary(elapsed=10)["list"]
+
+        assert summary["count"] == 101  # noqa: PLR2004
+        assert summary["errors"] == 1
+        assert summary["throughput"] == 10.1  # noqa: PLR2004
+        assert summary["p50"] == 51  # noqa: PLR2004
+        assert summary["p99"] == 100  # noqa: PLR2004
+        assert summary["max"] == 200  # noqa: PLR2004
+
+    def test_compare(self):
+        before = {"search": {"full text": {"throughput": 100, "p50": 10, "p99": 40}}}
+        after = {"search": {"full text": {"throughput": 150, "p50": 5, "p99": 40}}}
+
+        assert runner.compare(after, before) == [
+            "search full text: throughput +50.0%, p50 -50.0%, p99 +0.0%"
+        ]
+
+
+@override_settings(REQUEST_PROFILING=True)
+class RequestProfilingTestCase(TestCase):
+    """Test on-demand profiling of requests."""
+
+    url = "/api/users/me/"
+
+    def setUp(self):
+        profiling.install_query_recorders()
+        self.addCleanup(connection.execute_wrappers.remove, profiling.record_queries)
+        self.client = APIClient()
+
+    def test_staff_request_is_profiled(self):
+        staff = UserFactory(is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(self.url, headers={"X-Profile": "1"})
+
+        assert response.status_code == 200  # noqa: PLR2004
+        report = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        assert report.user == staff
+        assert report.protocol == "http"
+        assert report.path == self.url
+        assert report.status_code == 200  # noqa: PLR2004
+        assert report.query_count == len(report.queries) > 0
+        assert all(query["sql"] for query in report.queries)
+
+    def test_requests_without_header_are_not_profiled(self):
+        self.client.force_login(UserFactory(is_staff=True))
+
+        response = self.client.get(self.url)
+
+        assert "X-Profile-Id" not in response
+        assert not RequestProfile.objects.exists()
+
+    def test_non_staff_needs_token(self):
+        self.client.force_login(UserFactory())
+
+        response = self.client.get(self.url, headers={"X-Profile": "1"})
+        assert "X-Profile-Id" not in response
+
+        response = self.client.get(self.url, {"profile": profiling.make_token()})
+        assert RequestProfile.objects.filter(pk=response["X-Profile-Id"]).exists()
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        self.client.force_login(UserFactory(is_staff=True))
+
+        response = self.client.get(self.url, headers={"X-Profile": "1"})
+
+        assert "X-Profile-Id" not in response
+        assert not RequestProfile.objects.exists()
+
+    def test_admin_download(self):
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+        response = self.client.get(self.url, headers={"X-Profile": "1"})
+        url = reverse(
+            "admin:core_requestprofile_download", args=[response["X-Profile-Id"]]
+        )
+
+        report = self.client.get(url).json()
+        folded = self.client.get(url, {"format": "folded"})
+
+        assert report["path"] == self.url
+        assert report["queries"]
+        assert folded["Content-Type"] == "text/plain"
+
+
+class MonitoringTestCase(TestCase):
+    """Test the Prometheus metrics."""
+
+    def setUp(self):
+        monitoring.install_query_counter(connection=connections["default"])
+        self.client = APIClient()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_install_query_counter_on_proxy(self):
+        monitoring.install_query_counter(connection=connection)
+
+        assert connections["default"] in monitoring.database_connections
+        assert (
+            connections["default"].execute_wrappers.count(monitoring.count_queries) == 1
+        )
+
+    def test_request_metrics(self):
+        view = resolve("/api/users/me/").view_name
+        labels = {"view": view, "method": "GET", "status": "200"}
+        self.client.force_login(UserFactory())
+        count = self.sample("bubble_http_request_duration_seconds_count", **labels)
+        queries = self.sample("bubble_http_request_db_queries_sum", view=view)
+
+        response = self.client.get("/api/users/me/")
+
+        assert response.status_code == 200  # noqa: PLR2004
+        assert (
+            self.sample("bubble_http_request_duration_seconds_count", **labels)
+            == count + 1
+        )
+        assert self.sample("bubble_http_request_db_queries_sum", view=view) > queries
+
+    def test_metrics_view(self):
+        self.client.get("/api/config/")
+
+        response = self.client.get("/metrics")
+
+        assert response.status_code == 200  # noqa: PLR2004
+        text = response.content.decode()
+        assert 'bubble_http_request_duration_seconds_count{method="GET"' in text
+        assert "bubble_response_cache_hits_total" in text
+        assert "bubble_db_connections" in text
+
+    @override_settings(METRICS_BEARER_TOKEN="secret")  # noqa: S106
+    def test_metrics_view_token(self):
+        assert self.client.get("/metrics").status_code == 401  # noqa: PLR2004
+
+        response = self.client.get(
+            "/metrics", headers={"Authorization": "Bearer secret"}
+        )
+
+        assert response.status_code == 200  # noqa: PLR2004
+
+    @override_settings(METRICS_REQUIRE_TOKEN=True)
+    def test_metrics_view_without_required_token(self):
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer "})
+
+        assert response.status_code == 403  # noqa: PLR2004
+
+    def test_ai_call_errors(self):
+        labels = {"provider": "test", "operation": "fail"}
+
+        with (
+            pytest.raises(TimeoutError),
+            monitoring.observe_ai_call(**labels),
+        ):
+            raise TimeoutError
+
+        assert self.sample("bubble_ai_call_errors_total", **labels) == 1
+        assert self.sample("bubble_ai_call_duration_seconds_count", **labels) == 1
+
+    def test_celery_task_metrics(self):
+        task = check_bookings_active.name
+
+        check_bookings_active.apply()
+
+        assert self.sample(
+            "bubble_celery_task_duration_seconds_count", task=task, state="SUCCESS"
+        )
+        assert self.sample(
+            "bubble_celery_task_last_success_timestamp_seconds", task=task
+        )
+
+
+class TracingTestCase(TestCase):
+    """Test the propagation and export of traces."""
+
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file = Path(directory) / "traces.jsonl"
+        settings_override = override_settings(
+            TRACING_EXPORTER="file", TRACING_FILE=self.file, TRACING_SAMPLE_RATE=1
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+
+    def exported_spans(self):
+        tracing.Exporter.get().flush()
+        return [json.loads(line) for line in self.file.read_text().splitlines()]
+
+    def test_request_continues_trace(self):
+        self.client.force_login(UserFactory())
+
+        response = self.client.get(
+            "/api/users/me/", headers={"traceparent": self.traceparent}
+        )
+
+        assert response["X-Trace-Id"] == "0af7651916cd43dd8448eb211c80319c"
+        (span,) = self.exported_spans()
+        assert span["traceId"] == "0af7651916cd43dd8448eb211c80319c"
+        assert span["parentSpanId"] == "b7ad6b7169203331"
+        assert span["kind"] == tracing.KINDS["server"]
+        assert span["name"] == f"GET {resolve('/api/users/me/').view_name}"
+
+    def test_unsampled_caller(self):
+        unsampled = self.traceparent[:-2] + "00"
+
+        response = self.client.get("/api/config/", headers={"traceparent": unsampled})
+
+        assert "X-Trace-Id" not in response
+        assert not self.file.exists()
+
+    def test_child_spans_and_task_propagation(self):
+        headers = {}
+        with tracing.trace("task", kind="consumer", traceparent=self.traceparent):
+            tracing.traced(name="receiver")(lambda: None)()
+            with (
+                pytest.raises(TimeoutError),
+                tracing.span("call", kind="client", isbn="123"),
+            ):
+                raise TimeoutError
+            tracing.inject(headers)
+
+        spans = {span["name"]: span for span in self.exported_spans()}
+        root = spans["task"]
+        assert spans["receiver"]["parentSpanId"] == root["spanId"]
+        assert spans["call"]["status"]["code"] == tracing.STATUS_ERROR
+        assert spans["call"]["attributes"] == [
+            {"key": "isbn", "value": {"stringValue": "123"}}
+        ]
+        assert tracing.SpanContext.parse(headers["traceparent"]) == (
+            tracing.SpanContext(root["traceId"], root["spanId"], sampled=True)
+        )
+
+    def test_no_spans_outside_traces(self):
+        with tracing.span("orphan") as span:
+            assert span is None
+
+        tracing.Exporter.get().flush()
+        assert not self.file.exists()
+
+
+@override_settings(SLOW_QUERY_EXPLAIN_RATE=1)
+class SlowQueryTestCase(TestCase):
+    """Test the aggregation and explanation of slow queries."""
+
+    def select_statement(self, duration_ms):
+        sql, params = Item.objects.filter(name__in=["a", "b"]).query.sql_with_params()
+        return slow_queries.capture("default", sql, params, duration_ms)
+
+    def test_normalize(self):
+        sql = (
+            'SELECT "id" FROM "items_item" WHERE ("id" IN (%s, %s, %s) '
+            "AND \"name\" = 'it''s' AND \"rental_price\" > 1.5)  LIMIT 21"
+        )
+
+        assert slow_queries.normalize(sql) == (
+            'SELECT "id" FROM "items_item" WHERE ("id" IN (?, ...) '
+            'AND "name" = ? AND "rental_price" > ?) LIMIT ?'
+        )
+
+    def test_store_aggregates_and_explains(self):
+        token = slow_queries.source.set("bubble.items.tasks.example")
+        self.addCleanup(slow_queries.source.reset, token)
+        first = self.select_statement(250)
+        second = self.select_statement(350)
+
+        slow_queries.store(first)
+        slow_queries.store(second)
+
+        slow_query = SlowQuery.objects.get()
+        assert first.fingerprint == second.fingerprint == slow_query.fingerprint
+        assert slow_query.count == 2  # noqa: PLR2004
+        assert slow_query.total_ms == 600  # noqa: PLR2004
+        assert slow_query.max_ms == 350  # noqa: PLR2004
+        assert slow_query.source == "bubble.items.tasks.example"
+        assert "IN (?, ...)" in slow_query.sql
+        assert slow_query.origin.startswith("bubble/core/tests.py:")
+        assert "Execution Time" in slow_query.plan
+        assert slow_query.explained_at is not None
+
+    def test_writes_are_not_explained(self):
+        sql, params = (
+            "UPDATE items_item SET name = %s WHERE name = %s",
+            ["a", "b"],
+        )
+
+        slow_queries.store(slow_queries.capture("default", sql, params, 500))
+
+        slow_query = SlowQuery.objects.get()
+        assert slow_query.plan == ""
+        assert slow_query.explained_at is None
+
+    def test_admin(self):
+        slow_queries.store(self.select_statement(250))
+        slow_query = SlowQuery.objects.get()
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+
+        changelist = self.client.get(reverse("admin:core_slowquery_changelist"))
+        change = self.client.get(
+            reverse("admin:core_slowquery_change", args=[slow_query.pk])
+        )
+
+        assert changelist.status_code == 200  # noqa: PLR2004
+        assert change.status_code == 200  # noqa: PLR2004
+        assert "Execution Time" in change.content.decode()
+
+
+class SeedPerfDataTestCase(TestCase):
+    """Test the synthetic dataset of `manage.py seed_perf_data`."""
+
+    def seed(self) -> dict:
+        """Seed a small dataset, return its ids and roll it back."""
+        with transaction.atomic():
+            call_command("seed_perf_data", items=50, users=4, seed=7, stdout=StringIO())
+            snapshot = {
+                "items": set(Item.objects.values_list("pk", flat=True)),
+                "books": set(Book.objects.values_list("pk", flat=True)),
+                "bookings": set(Booking.objects.values_list("pk", flat=True)),
+                "messages": set(Message.objects.values_list("pk", flat=True)),
+            }
+            self.check_dataset(snapshot)
+            transaction.set_rollback(True)
+        return snapshot
+
+    def check_dataset(self, snapshot: dict):
+        assert len(snapshot["items"]) == 50  # noqa: PLR2004
+        assert len(snapshot["books"]) == 10  # noqa: PLR2004
+        assert Image.objects.count() == 100  # noqa: PLR2004
+        assert len(snapshot["messages"]) == 4 * len(snapshot["bookings"])
+        assert CatalogueEntry.objects.count() == Item.objects.catalogued().count()
+
+        # Books are written to both tables and read through the join
+        books = Book.objects.filter(pk__in=snapshot["books"])
+        assert books.filter(category=CategoryType.BOOKS).count() == 10  # noqa: PLR2004
+        assert not books.filter(name="").exists()
+
+        confirmed = Booking.objects.filter(status=BookingStatus.CONFIRMED).order_by(
+            "item", "time_from"
+        )
+        assert confirmed.exists()
+        for _, bookings in itertools.groupby(confirmed, attrgetter("item_id")):
+            for previous, booking in itertools.pairwise(bookings):
+                assert previous.time_to <= booking.time_from, booking.item_id
+
+    def test_same_seed_same_data(self):
+        first = self.seed()
+        assert first["bookings"]
+
+        assert self.seed() == first
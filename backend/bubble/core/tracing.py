@@ -0,0 +1,356 @@
+"""Tracing of requests, signal receivers, Celery tasks and external calls.
+
+Spans follow OpenTelemetry: the W3C `traceparent` header carries the trace
+into requests and Celery tasks, and spans are exported in the OTLP JSON
+encoding, one per line to `TRACING_FILE` or in batches to a collector at
+`TRACING_OTLP_ENDPOINT`, as selected by `TRACING_EXPORTER`.
+
+Only requests and tasks start traces. They are sampled at
+`TRACING_SAMPLE_RATE` unless the `traceparent` of the caller decided. Outside
+of a sampled trace `span()` does nothing, so instrumented code costs one
+context variable lookup. A background thread exports the spans; when
+`TRACING_QUEUE_SIZE` spans are waiting, new ones are dropped rather than
+slowing down requests.
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import httpx
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+TRACE_ID_HEADER = "X-Trace-Id"
+TRACEPARENT_RE = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+# See SpanKind and StatusCode of the OTLP protocol
+KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_ERROR = 2
+
+# Spans per export, and seconds between exports of fewer spans
+BATCH_SIZE = 512
+EXPORT_INTERVAL = 5
+
+rng = random.Random()  # noqa: S311
+
+
+def new_trace_id() -> str:
+    return f"{rng.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{rng.getrandbits(64):016x}"
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @classmethod
+    def parse(cls, traceparent: str | None) -> "SpanContext | None":
+        match = TRACEPARENT_RE.fullmatch(traceparent or "")
+        if match is None:
+            return None
+        trace_id, span_id, flags = match.groups()
+        return cls(trace_id, span_id, sampled=bool(int(flags, 16) & 1))
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+@dataclass
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: str = ""
+    kind: str = "internal"
+    attributes: dict = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    error: str = ""
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        Exporter.get().submit(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": otlp_attributes(self.attributes),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_attributes(attributes: dict) -> list[dict]:
+    return [{"key": key, "value": otlp_value(v)} for key, v in attributes.items()]
+
+
+# The recording span, or the context of an unsampled trace for propagation
+current: ContextVar[Span | SpanContext | None] = ContextVar(
+    "current_span", default=None
+)
+
+
+def current_context() -> SpanContext | None:
+    active = current.get()
+    return active.context if isinstance(active, Span) else active
+
+
+def inject(headers: dict) -> None:
+    """Add the `traceparent` of the current trace to `headers`."""
+    context = current_context()
+    if context is not None:
+        headers[TRACEPARENT] = context.traceparent
+
+
+def open_trace(name: str, *, kind: str, traceparent: str | None = None, **attributes):
+    """
+    Start the span of a request or task and make it current.
+
+    The parent is the caller from `traceparent` or the current trace, e.g.
+    of eager Celery tasks. Returns the token for `close_trace()`.
+    """
+    parent = SpanContext.parse(traceparent) or current_context()
+    if parent is None:
+        sampled = rng.random() < settings.TRACING_SAMPLE_RATE
+        parent = SpanContext(new_trace_id(), "", sampled)
+    context = SpanContext(parent.trace_id, new_span_id(), parent.sampled)
+    if not context.sampled:
+        return current.set(context)
+    span = Span(name, context, parent.span_id, kind, attributes)
+    return current.set(span)
+
+
+def close_trace(token, error: str = "") -> None:
+    active = current.get()
+    current.reset(token)
+    if isinstance(active, Span):
+        active.error = active.error or error
+        active.end()
+
+
+@contextmanager
+def trace(name: str, *, kind: str, traceparent: str | None = None, **attributes):
+    """Context manager of `open_trace()`, yields the span if sampled."""
+    token = open_trace(name, kind=kind, traceparent=traceparent, **attributes)
+    active = current.get()
+    try:
+        yield active if isinstance(active, Span) else None
+    except Exception as error:
+        close_trace(token, repr(error))
+        raise
+    else:
+        close_trace(token)
+
+
+@contextmanager
+def span(name: str, *, kind: str = "internal", **attributes):
+    """Record a child span of the current sampled trace, yields it or None."""
+    parent = current.get()
+    if not isinstance(parent, Span):
+        yield None
+        return
+    child = Span(
+        name,
+        SpanContext(parent.context.trace_id, new_span_id(), sampled=True),
+        parent.context.span_id,
+        kind,
+        attributes,
+    )
+    token = current.set(child)
+    try:
+        yield child
+    except Exception as error:
+        child.error = repr(error)
+        raise
+    finally:
+        current.reset(token)
+        child.end()
+
+
+def traced(function=None, *, name: str = "", kind: str = "internal"):
+    """Decorate a function to run in a span named after it."""
+
+    def decorate(function):
+        span_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not isinstance(current.get(), Span):
+                return function(*args, **kwargs)
+            with span(span_name, kind=kind):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate(function) if function is not None else decorate
+
+
+class Exporter(threading.Thread):
+    """Export finished spans in batches, one instance per process."""
+
+    instance: "Exporter | None" = None
+    starting = threading.Lock()
+
+    def __init__(self):
+        super().__init__(name="trace-exporter", daemon=True)
+        self.pid = os.getpid()
+        self.spans: deque[Span] = deque()
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+    @classmethod
+    def get(cls) -> "Exporter":
+        # Forked processes, e.g. Celery pool workers, start their own
+        with cls.starting:
+            if cls.instance is None or cls.instance.pid != os.getpid():
+                cls.instance = cls()
+                cls.instance.start()
+                atexit.register(cls.instance.flush)
+        return cls.instance
+
+    def submit(self, span: Span) -> None:
+        if len(self.spans) >= settings.TRACING_QUEUE_SIZE:
+            self.dropped += 1
+            return
+        self.spans.append(span)
+        if len(self.spans) >= BATCH_SIZE:
+            self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(EXPORT_INTERVAL)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export all waiting spans."""
+        with self.lock:
+            spans = []
+            while self.spans:
+                spans.append(self.spans.popleft().to_otlp())
+            if self.dropped:
+                logger.warning(
+                    "Dropped %s spans, the export queue was full", self.dropped
+                )
+                self.dropped = 0
+            for start in range(0, len(spans), BATCH_SIZE):
+                try:
+                    export(spans[start : start + BATCH_SIZE])
+                except (OSError, httpx.HTTPError):
+                    logger.warning("Could not export spans", exc_info=True)
+
+
+def export(spans: list[dict]) -> None:
+    if settings.TRACING_EXPORTER == "file":
+        with open(settings.TRACING_FILE, "a") as file:  # noqa: PTH123
+            file.writelines(json.dumps(span) + "\n" for span in spans)
+    elif settings.TRACING_EXPORTER == "otlp":
+        resource = {"service.name": settings.TRACING_SERVICE_NAME}
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": otlp_attributes(resource)},
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+            ]
+        }
+        httpx.post(
+            settings.TRACING_OTLP_ENDPOINT, json=payload, timeout=10
+        ).raise_for_status()
+
+
+class TracingMiddleware:
+    """Trace requests, removed unless `TRACING_EXPORTER` is set."""
+
+    def __init__(self, get_response):
+        if not settings.TRACING_EXPORTER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from bubble.core.monitoring import view_label  # noqa: PLC0415
+
+        with trace(
+            request.method,
+            kind="server",
+            traceparent=request.headers.get(TRACEPARENT),
+            **{"http.request.method": request.method, "url.path": request.path},
+        ) as request_span:
+            response = self.get_response(request)
+            if request_span is not None:
+                route = view_label(request)
+                request_span.name = f"{request.method} {route}"
+                request_span.attributes["http.route"] = route
+                request_span.attributes["http.response.status_code"] = (
+                    response.status_code
+                )
+                if response.status_code >= 500:  # noqa: PLR2004
+                    request_span.error = f"HTTP {response.status_code}"
+                response[TRACE_ID_HEADER] = request_span.context.trace_id
+        return response
+
+
+# Celery, connected in `bubble.core.signals` if tracing is enabled
+
+
+def inject_task_headers(sender=None, headers=None, **kwargs):
+    """Propagate the trace to published tasks, see `before_task_publish`."""
+    if headers is not None:
+        inject(headers)
+
+
+def start_task_trace(sender=None, task_id=None, task=None, **kwargs):
+    request = task.request
+    traceparent = getattr(request, TRACEPARENT, None) or (
+        getattr(request, "headers", None) or {}
+    ).get(TRACEPARENT)
+    request.tracing_token = open_trace(
+        f"celery {task.name}",
+        kind="consumer",
+        traceparent=traceparent,
+        **{"celery.task_name": task.name, "celery.task_id": task_id},
+    )
+
+
+def end_task_trace(sender=None, task_id=None, task=None, state=None, **kwargs):
+    token = getattr(task.request, "tracing_token", None)
+    if token is not None:
+        close_trace(token, "" if state == "SUCCESS" else f"Task {state}")
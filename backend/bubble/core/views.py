@@ -1,9 +1,14 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect
+from django.utils.crypto import constant_time_compare
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils.translation import gettext as _
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from bubble.core import monitoring
 
 
 @require_POST
@@ -36,3 +41,22 @@ def set_theme(request):
     if not url_has_allowed_host_and_scheme(next_url, allowed_hosts=None):
         next_url = "/"
     return redirect(next_url)
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Return the Prometheus metrics, see `bubble.core.monitoring`.
+
+    Requires `Authorization: Bearer <METRICS_BEARER_TOKEN>` if the setting is set.
+    Without a token the metrics are forbidden if `METRICS_REQUIRE_TOKEN` is set.
+    """
+    token = settings.METRICS_BEARER_TOKEN
+    if not token and settings.METRICS_REQUIRE_TOKEN:
+        return HttpResponse(status=403)
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    registry = monitoring.get_registry(*monitoring.WEB_COLLECTORS)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -9,18 +9,36 @@ from django.contrib.sessions.models import Session
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
 
+from bubble.core import tracing
+from bubble.core.monitoring import GROUP_SEND_DURATION
+
 logger = logging.getLogger(__name__)
 
 
+def group_send(group: str, message: dict) -> None:
+    """Send `message` to the channel layer `group`, timing and tracing the send."""
+    with (
+        GROUP_SEND_DURATION.labels(message["type"]).time(),
+        tracing.span(
+            "group_send",
+            kind="producer",
+            **{
+                "messaging.destination.name": group,
+                "messaging.message.type": message["type"],
+            },
+        ),
+    ):
+        async_to_sync(get_channel_layer().group_send)(group, message)
+
+
 @receiver(user_logged_out)
 def notify_logout(sender, request, user, **kwargs):
     """Notify WebSocket clients when user logs out."""
     if user and user.is_authenticated:
-        channel_layer = get_channel_layer()
         user_channel = f"user_{user.id}"
 
         # Send session invalidation message to all connections for this user
-        async_to_sync(channel_layer.group_send)(
+        group_send(
             user_channel,
             {
                 "type": "session.invalidated",
@@ -39,11 +57,10 @@ def notify_session_delete(sender, instance, **kwargs):
         user_id = session_data.get("_auth_user_id")
 
         if user_id:
-            channel_layer = get_channel_layer()
             user_channel = f"user_{user_id}"
 
             # Send session invalidation message
-            async_to_sync(channel_layer.group_send)(
+            group_send(
                 user_channel,
                 {
                     "type": "session.invalidated",
@@ -63,7 +80,6 @@ def send_user_notification(user_id: int, message: str, title: str | None = None)
         user_id: The ID of the user to notify
         message_data: Dictionary containing message details
     """
-    channel_layer = get_channel_layer()
     user_channel = f"user_{user_id}"
 
     payload = {
@@ -76,7 +92,7 @@ def send_user_notification(user_id: int, message: str, title: str | None = None)
     if title is not None:
         payload["data"]["title"] = title
 
-    async_to_sync(channel_layer.group_send)(user_channel, payload)
+    group_send(user_channel, payload)
 
 
 def send_message_notification(
@@ -90,7 +106,6 @@ def send_message_notification(
         message: The message text to display
         booking_uuid: Optional booking UUID to include in the notification
     """
-    channel_layer = get_channel_layer()
     user_channel = f"user_{user_id}"
 
     data = {"message": message}
@@ -101,4 +116,4 @@ def send_message_notification(
         "type": "notification.message",
         "data": {"type": "new_message", "data": data},
     }
-    async_to_sync(channel_layer.group_send)(user_channel, payload)
+    group_send(user_channel, payload)
@@ -1,6 +1,8 @@
 import anthropic
 from django.conf import settings
 
+from bubble.core.monitoring import observe_ai_call
+
 ANTHROPIC_API_KEY = getattr(settings, "ANTHROPIC_API_KEY", "")
 ANTHROPIC_MODEL = getattr(settings, "ANTHROPIC_MODEL", "claude-2")
 
@@ -20,10 +22,11 @@ def call_model(
     if extra_prompt:
         content.append(extra_prompt)
 
-    message = client.messages.create(
-        model=model,
-        max_tokens=max_tokens,
-        messages=[{"role": "user", "content": content}],
-    )
+    with observe_ai_call("anthropic", "messages"):
+        message = client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": content}],
+        )
 
     return "".join([m.text for m in message.content])
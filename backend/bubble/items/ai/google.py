@@ -4,15 +4,18 @@ from typing import Any
 
 from google import genai
 
+from bubble.core.monitoring import observe_ai_call
+
 
 def call_model(contents: Any, model: str = "gemini-2.5-flash-lite") -> dict:
     """Call the Google Gemini model with the given prompt."""
     client = genai.Client()
 
-    response = client.models.generate_content(
-        model=os.environ.get("AI_MODEL", "gemini-2.5-flash-lite"),
-        contents=contents,
-    )
+    with observe_ai_call("google", "generate_content"):
+        response = client.models.generate_content(
+            model=os.environ.get("AI_MODEL", "gemini-2.5-flash-lite"),
+            contents=contents,
+        )
 
     cleaned_response = response.text.strip().replace("```json", "").replace("```", "")
     return json.loads(cleaned_response)
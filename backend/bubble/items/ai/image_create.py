@@ -9,6 +9,8 @@ import os
 
 from google import genai
 
+from bubble.core.monitoring import observe_ai_call
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,13 +29,14 @@ def generate_image_from_prompt(
 
     logger.info("Generating image with model %s", model_name)
 
-    response = client.models.generate_images(
-        model=model_name,
-        prompt=f"Generate an image of: {prompt}",
-        config=genai.types.GenerateImagesConfig(
-            number_of_images=1,
-        ),
-    )
+    with observe_ai_call("google", "generate_images"):
+        response = client.models.generate_images(
+            model=model_name,
+            prompt=f"Generate an image of: {prompt}",
+            config=genai.types.GenerateImagesConfig(
+                number_of_images=1,
+            ),
+        )
 
     if not response.generated_images:
         msg = "No images generated"
@@ -5,11 +5,19 @@ from __future__ import annotations
 import logging
 
 import django_filters
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
 from django.db.models import Q, QuerySet
 from pgvector.django import CosineDistance
 
 from bubble.items.embeddings import get_embedding_model
-from bubble.items.models import ConditionType, Item, ItemEmbedding, ItemStatus
+from bubble.items.models import (
+    CatalogueEntry,
+    ConditionType,
+    Item,
+    ItemEmbedding,
+    ItemStatus,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -110,3 +118,62 @@ class ItemFilter(django_filters.FilterSet):
         )
 
         return queryset.filter(pk__in=embeddings_qs.values_list("pk", flat=True))
+
+
+class CatalogueFilter(django_filters.FilterSet):
+    """Filter catalogue entries, the published counterpart of `ItemFilter`.
+
+    Supported query params are those of `ItemFilter` without `published`,
+    `search` matches whole words of name and description with web search
+    syntax, e.g. `"red bike" -broken`.
+    """
+
+    status = django_filters.MultipleChoiceFilter(
+        choices=[
+            (value, label)
+            for value, label in ItemStatus.choices
+            if value in ItemStatus.published()
+        ],
+        field_name="status",
+        conjoined=False,
+    )
+    conditions = django_filters.MultipleChoiceFilter(
+        choices=ConditionType.choices,
+        field_name="condition",
+        conjoined=False,
+    )
+    min_sale_price = django_filters.NumberFilter(
+        field_name="sale_price", lookup_expr="gte"
+    )
+    max_sale_price = django_filters.NumberFilter(
+        field_name="sale_price", lookup_expr="lte"
+    )
+    min_rental_price = django_filters.NumberFilter(
+        field_name="rental_price", lookup_expr="gte"
+    )
+    max_rental_price = django_filters.NumberFilter(
+        field_name="rental_price", lookup_expr="lte"
+    )
+    search = django_filters.CharFilter(method="filter_search")
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="gte"
+    )
+    created_before = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="lte"
+    )
+
+    class Meta:
+        model = CatalogueEntry
+        fields = {
+            "category": ["exact"],
+            "user": ["exact"],
+        }
+
+    def filter_search(self, queryset: QuerySet[CatalogueEntry], name: str, value: str):
+        """Full text search through the indexed search vector."""
+        if not value:
+            return queryset
+        query = SearchQuery(
+            value, config=settings.CATALOGUE_SEARCH_CONFIG, search_type="websearch"
+        )
+        return queryset.filter(search_vector=query)
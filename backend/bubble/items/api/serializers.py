@@ -1,10 +1,15 @@
 """Serializers for items API."""
 
+import contextlib
+
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from djmoney.contrib.django_rest_framework import MoneyField
 from rest_framework import serializers, status
 
-from bubble.items.models import Image, Item, money_defaults
+from bubble.core.api.serializers import CompiledReadMixin
+from bubble.core.api.sparse import SparseFieldsSerializerMixin
+from bubble.items.models import CatalogueEntry, Image, Item, money_defaults
 
 
 class ItemOwnerException(serializers.ValidationError):
@@ -20,6 +25,7 @@ class ImageSerializer(serializers.ModelSerializer):
     thumbnail = serializers.ImageField(read_only=True)
     preview = serializers.ImageField(read_only=True)
     ordering = serializers.IntegerField(required=False, allow_null=True)
+    duplicates = serializers.SerializerMethodField()
 
     class Meta:
         model = Image
@@ -30,8 +36,20 @@ class ImageSerializer(serializers.ModelSerializer):
             "thumbnail",
             "preview",
             "item",
+            "width",
+            "height",
+            "placeholder",
+            "duplicates",
+        ]
+        read_only_fields = [
+            "id",
+            "thumbnail",
+            "preview",
+            "width",
+            "height",
+            "placeholder",
+            "duplicates",
         ]
-        read_only_fields = ["id", "thumbnail", "preview"]
 
     def get_fields(self):
         """Override to make fields read-only on update."""
@@ -44,6 +62,20 @@ class ImageSerializer(serializers.ModelSerializer):
 
         return fields
 
+    def get_duplicates(self, obj) -> list[dict] | None:
+        """Return near-duplicate images if they were looked up on upload."""
+        duplicates = getattr(obj, "duplicates", None)
+        if duplicates is None:
+            return None
+        return [
+            {
+                "id": str(duplicate.id),
+                "item": str(duplicate.item_id),
+                "distance": duplicate.distance,
+            }
+            for duplicate in duplicates
+        ]
+
     def validate_item(self, value):
         """Ensure only item owners can create images for their items."""
         request = self.context.get("request")
@@ -53,12 +85,37 @@ class ImageSerializer(serializers.ModelSerializer):
         return value
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class ImageUploadSerializer(serializers.Serializer):
+    """Multiple image files uploaded for one item."""
+
+    original = serializers.ListField(
+        child=serializers.ImageField(),
+        allow_empty=False,
+        max_length=settings.ITEM_IMAGES_BULK_MAX,
+    )
+
+
+class ImageOrderSerializer(serializers.Serializer):
+    """Image ids of an item in their new order."""
+
+    image_order = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False
+    )
+
+
+class ImageIdsSerializer(serializers.Serializer):
+    """Image ids of an item to delete."""
+
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+
+class ItemSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for Item model."""
 
     images = ImageSerializer(many=True, read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     first_image = serializers.SerializerMethodField()
+    first_image_details = serializers.SerializerMethodField()
     sale_price = MoneyField(**money_defaults, required=False, allow_null=True)
     rental_price = MoneyField(**money_defaults, required=False, allow_null=True)
 
@@ -72,6 +129,9 @@ class ItemSerializer(serializers.ModelSerializer):
             "date_updated",
             "images",
         ]
+        expandable_fields = ["images"]
+        # Read from the prefetched first image
+        field_columns = {"first_image": [], "first_image_details": []}
 
     def get_first_image(self, obj):
         """Get the first image of the item."""
@@ -84,6 +144,17 @@ class ItemSerializer(serializers.ModelSerializer):
                 return first_image.thumbnail.url
         return None
 
+    def get_first_image_details(self, obj) -> dict | None:
+        """Return dimensions and placeholder to lay out the first image."""
+        first_image = obj.get_first_image()
+        if first_image is None:
+            return None
+        return {
+            "width": first_image.width,
+            "height": first_image.height,
+            "placeholder": first_image.placeholder,
+        }
+
     def validate(self, attrs):
         """
         Ensure that both sale_price and rental_price are not set at the same time.
@@ -110,7 +181,74 @@ class ItemSerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
 
-class ItemListSerializer(ItemSerializer):
+class ItemBulkListSerializer(serializers.ListSerializer):
+    """
+    Create or update many items in a constant number of queries.
+
+    For updates the instance is a queryset of the items the user may change.
+    Every entry names its item by `id`, all items are loaded with one query.
+    """
+
+    def to_internal_value(self, data):
+        self.items_by_id = {}
+        self.validated_items = []
+        self.validated_ids = set()
+        if self.instance is not None and isinstance(data, list):
+            ids = set()
+            for entry in data:
+                with contextlib.suppress(serializers.ValidationError, TypeError):
+                    ids.add(self.parse_id(entry))
+            self.items_by_id = self.instance.in_bulk(ids)
+        return super().to_internal_value(data)
+
+    def parse_id(self, entry):
+        return serializers.UUIDField().to_internal_value(entry.get("id"))
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            try:
+                pk = self.parse_id(data)
+            except (serializers.ValidationError, AttributeError) as exc:
+                raise serializers.ValidationError(
+                    {"id": _("A valid item id is required.")}
+                ) from exc
+            item = self.items_by_id.get(pk)
+            if item is None or pk in self.validated_ids:
+                raise serializers.ValidationError(
+                    {"id": _("Unknown or repeated item.")}
+                )
+            self.child.instance = item
+            self.child.initial_data = data
+            self.validated_items.append(item)
+            self.validated_ids.add(pk)
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        items = [model(**attrs) for attrs in validated_data]
+        return model.objects.bulk_create_items(
+            items, history_user=self.context["request"].user
+        )
+
+    def update(self, instance, validated_data):
+        fields = set()
+        for item, attrs in zip(self.validated_items, validated_data, strict=True):
+            for name, value in attrs.items():
+                setattr(item, name, value)
+            fields.update(attrs)
+        return self.child.Meta.model.objects.bulk_update_items(
+            self.validated_items, fields, history_user=self.context["request"].user
+        )
+
+
+class ItemBulkSerializer(ItemSerializer):
+    """Serializer for items created or updated together."""
+
+    class Meta(ItemSerializer.Meta):
+        list_serializer_class = ItemBulkListSerializer
+
+
+class ItemListSerializer(CompiledReadMixin, ItemSerializer):
     """Lightweight serializer for item lists."""
 
     images = None
@@ -119,4 +257,63 @@ class ItemListSerializer(ItemSerializer):
 class ItemMinimalSerializer(ItemListSerializer):
     class Meta:
         model = Item
-        fields = ["id", "name", "first_image", "rental_price", "sale_price"]
+        fields = [
+            "id",
+            "name",
+            "first_image",
+            "first_image_details",
+            "rental_price",
+            "sale_price",
+        ]
+
+
+class CatalogueEntrySerializer(CompiledReadMixin, serializers.ModelSerializer):
+    """Published item as shown in the public catalogue."""
+
+    id = serializers.UUIDField(source="item_id", read_only=True)
+    first_image = serializers.SerializerMethodField()
+    first_image_details = serializers.SerializerMethodField()
+    sale_price = MoneyField(**money_defaults, read_only=True)
+    rental_price = MoneyField(**money_defaults, read_only=True)
+
+    class Meta:
+        model = CatalogueEntry
+        fields = [
+            "id",
+            "user",
+            "owner_name",
+            "name",
+            "slug",
+            "category",
+            "condition",
+            "status",
+            "sale_price",
+            "rental_price",
+            "rental_period",
+            "first_image",
+            "first_image_details",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+    def get_first_image(self, obj) -> str | None:
+        """Return the absolute URL of the first image thumbnail."""
+        if not obj.thumbnail_source:
+            return None
+        # The thumbnail of an unsaved image is named after its original only
+        thumbnail = Image(original=obj.thumbnail_source).thumbnail
+        request = self.context.get("request")
+        if request:
+            return request.build_absolute_uri(thumbnail.url)
+        return thumbnail.url
+
+    def get_first_image_details(self, obj) -> dict | None:
+        """Return dimensions and placeholder to lay out the first image."""
+        if not obj.thumbnail_source:
+            return None
+        return {
+            "width": obj.image_width,
+            "height": obj.image_height,
+            "placeholder": obj.image_placeholder,
+        }
@@ -3,26 +3,53 @@
 import contextlib
 import uuid as _uuid
 
+from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.files.base import ContentFile
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, viewsets
+from drf_spectacular.utils import extend_schema
+from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import DjangoModelPermissions, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    AllowAny,
+    DjangoModelPermissions,
+    DjangoObjectPermissions,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework.response import Response
 
+from bubble.core.api.conditional import ConditionalGetMixin
+from bubble.core.api.pagination import OptionalCursorPagination
+from bubble.core.api.response_cache import ResponseCacheMixin
+from bubble.core.api.sparse import SparseFieldsViewMixin
 from bubble.items.ai.image_analyze import analyze_image
 from bubble.items.ai.image_create import generate_image_from_prompt
 from bubble.items.api.serializers import (
+    CatalogueEntrySerializer,
+    ImageIdsSerializer,
+    ImageOrderSerializer,
     ImageSerializer,
+    ImageUploadSerializer,
+    ItemBulkSerializer,
     ItemListSerializer,
+    ItemOwnerException,
     ItemSerializer,
 )
-from bubble.items.models import Image, Item
+from bubble.items.models import CatalogueEntry, Image, Item
+
+from .filters import CatalogueFilter, ItemFilter
+
 
-from .filters import ItemFilter
+class ItemChangePermissions(DjangoObjectPermissions):
+    """Require change permission on the item for every write method."""
+
+    perms_map = {
+        **DjangoObjectPermissions.perms_map,
+        "POST": ["%(app_label)s.change_%(model_name)s"],
+        "DELETE": ["%(app_label)s.change_%(model_name)s"],
+    }
 
 
 class ItemBaseViewSet(viewsets.GenericViewSet):
@@ -30,6 +57,7 @@ class ItemBaseViewSet(viewsets.GenericViewSet):
 
     lookup_field = "id"
     serializer_class = ItemListSerializer
+    pagination_class = OptionalCursorPagination
 
     # Filtering / searching / ordering
     filterset_class = ItemFilter
@@ -48,58 +76,187 @@ class ItemBaseViewSet(viewsets.GenericViewSet):
             return ItemListSerializer
         return ItemSerializer
 
+    def prefetch_images(self, queryset):
+        """Load only the first image for lists, all images otherwise."""
+        first_image = self.wants("first_image", "first_image_details")
+        if self.action in ("list", "my_items"):
+            return queryset.with_first_image() if first_image else queryset
+        if first_image or self.wants("images"):
+            return queryset.prefetch_related("images")
+        return queryset
+
 
-class PublicItemViewSet(viewsets.ReadOnlyModelViewSet, ItemBaseViewSet):
+class PublicItemViewSet(
+    SparseFieldsViewMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet,
+    ItemBaseViewSet,
+):
     """
     ViewSet for retrieving published items.
     This viewset is read-only and only returns items with a published status.
     """
 
-    queryset = (
-        Item.objects.published().select_related("user").prefetch_related("images")
-    )
+    queryset = Item.objects.published().select_related("user")
     permission_classes = [IsAuthenticatedOrReadOnly]
+    list_cache_tags = ("items",)
+    object_cache_tag = "item"
+    public_deletions = True
+
+    def get_queryset(self):
+        return self.prefetch_images(super().get_queryset())
+
+    def get_cache_tags(self, request):
+        """Lists of one category only change with items of that category."""
+        category = request.query_params.getlist("category")
+        if self.action == "list" and len(category) == 1:
+            return [f"items.category:{category[0]}"]
+        return super().get_cache_tags(request)
+
+
+class CatalogueViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for browsing the public catalogue of published items.
+
+    Reads the denormalized `CatalogueEntry` table, so lists and filters need
+    no joins. Use public items for all details of an item.
+    """
+
+    queryset = CatalogueEntry.objects.all()
+    serializer_class = CatalogueEntrySerializer
+    permission_classes = [AllowAny]
+    pagination_class = OptionalCursorPagination
+    lookup_field = "item"
+    lookup_url_kwarg = "id"
+
+    filterset_class = CatalogueFilter
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    ordering_fields = ["created_at", "updated_at", "sale_price", "rental_price"]
+    ordering = ["-created_at"]
 
 
-class ItemViewSet(viewsets.ModelViewSet, ItemBaseViewSet):
+class ItemViewSet(
+    SparseFieldsViewMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+    ItemBaseViewSet,
+):
     """
     ViewSet for retrieving, creating, updating, and deleting items.
     """
 
     def get_queryset(self):
         """Return items belonging to the authenticated user."""
-        return (
-            Item.objects.get_for_user(self.request.user)
-            .select_related("user")
-            .prefetch_related("images")
+        return self.prefetch_images(
+            Item.objects.get_for_user(self.request.user).select_related("user")
         )
 
     def perform_create(self, serializer):
         """Set the user when creating an item."""
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        request=ItemBulkSerializer(many=True),
+        responses=ItemListSerializer(many=True),
+    )
+    @action(detail=False, methods=["post", "patch"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create or update many items in one request.
+
+        post: list of new items
+        patch: list of partial items, each identified by its `id`
+
+        Items and their history are written with bulk queries, embeddings and
+        promotion to books are handled once for the whole batch.
+        """
+        instance = self.get_queryset() if request.method == "PATCH" else None
+        serializer = ItemBulkSerializer(
+            instance,
+            data=request.data,
+            many=True,
+            partial=instance is not None,
+            allow_empty=False,
+            max_length=settings.ITEMS_BULK_MAX,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        if instance is None:
+            items = serializer.save(user=request.user)
+            for item in items:
+                # New items have no images yet
+                item.first_images = []
+            response_status = status.HTTP_201_CREATED
+        else:
+            items = serializer.save()
+            response_status = status.HTTP_200_OK
+
+        data = ItemListSerializer(
+            items, many=True, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=response_status)
+
     @action(detail=True, methods=["put"])
-    def reorder_images(self, request, uuid=None):
+    def reorder_images(self, request, *args, **kwargs):
         """Reorder images for an item."""
         item = self.get_object()
+        self._reorder_images(item, request.data)
+        return Response({"success": True})
 
-        image_order = request.data.get("image_order", [])
-
-        if not isinstance(image_order, list):
-            return Response({"error": "image_order must be a list"}, status=400)
-
-        # Validate that all image UUIDs belong to this item
-        item_image_uuids = {str(img.uuid) for img in item.images.all()}
-        provided_image_uuids = {str(img_uuid) for img_uuid in image_order}
+    @action(
+        detail=True,
+        methods=["post", "put", "delete"],
+        url_path="images",
+        permission_classes=[ItemChangePermissions],
+    )
+    def images(self, request, *args, **kwargs):
+        """
+        Manage all images of an item in one request.
 
-        if not provided_image_uuids.issubset(item_image_uuids):
-            return Response({"error": "Invalid image UUIDs provided"}, status=400)
+        post: upload multiple files given as `original`, appended in order
+        put: reorder images, given as `image_order` list of image ids
+        delete: delete the images given as `ids` list of image ids
 
-        # Update the ordering of each image
-        for index, image_uuid in enumerate(image_order):
-            Image.objects.filter(uuid=image_uuid, item=item).update(ordering=index)
+        Each operation costs a constant number of queries, independent of the
+        number of images.
+        """
+        item = self.get_object()
 
-        return Response({"success": True})
+        if request.method == "POST":
+            if item.user != request.user:
+                raise ItemOwnerException
+            upload = ImageUploadSerializer(data=request.data)
+            upload.is_valid(raise_exception=True)
+            images = Image.objects.bulk_create_for_item(
+                item, upload.validated_data["original"]
+            )
+            serializer = ImageSerializer(
+                images, many=True, context=self.get_serializer_context()
+            )
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if request.method == "PUT":
+            self._reorder_images(item, request.data)
+            return Response({"success": True})
+
+        ids = ImageIdsSerializer(data=request.data)
+        ids.is_valid(raise_exception=True)
+        deleted, _deleted_per_model = Image.objects.filter(
+            item=item, pk__in=ids.validated_data["ids"]
+        ).delete()
+        return Response({"deleted": deleted})
+
+    def _reorder_images(self, item: Item, data) -> None:
+        """Apply the image order from `data` with a single UPDATE."""
+        serializer = ImageOrderSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        image_order = serializer.validated_data["image_order"]
+
+        updated = Image.objects.reorder(item, image_order)
+        if updated != len(set(image_order)):
+            # rolled back by the request transaction
+            raise ValidationError({"image_order": _("Invalid image ids provided.")})
 
     @action(detail=True, methods=["put"])
     def ai_describe(self, request, *args, **kwargs):
@@ -197,6 +354,12 @@ class ImageViewSet(viewsets.ModelViewSet):
                 # Get the count of existing images for this item
                 existing_count = Image.objects.filter(item=item).count()
                 serializer.save(ordering=existing_count)
+                self._flag_duplicates(serializer.instance)
                 return
 
         serializer.save()
+        self._flag_duplicates(serializer.instance)
+
+    def _flag_duplicates(self, image: Image):
+        """Attach near-duplicates from the owner's catalogue to the new image."""
+        image.duplicates = list(image.find_near_duplicates())
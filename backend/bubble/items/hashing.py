@@ -0,0 +1,42 @@
+"""Perceptual hashing for duplicate image detection."""
+
+from PIL import Image as PILImage
+
+HASH_SIZE = 8
+
+# Hashes are stored in a signed 64 bit BigIntegerField
+_SIGNED_LIMIT = 1 << 63
+_UNSIGNED_LIMIT = 1 << 64
+
+
+def dhash(image: PILImage.Image, hash_size: int = HASH_SIZE) -> int:
+    """
+    Compute the difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail
+    and every bit encodes whether a pixel is brighter than its right neighbour.
+    Re-encoded, resized or slightly edited copies of a photo keep a hash with a
+    small Hamming distance to the original.
+
+    Returns:
+        int: The hash as signed 64 bit integer, ready for database storage.
+    """
+    small = image.convert("L").resize(
+        (hash_size + 1, hash_size), PILImage.Resampling.LANCZOS
+    )
+    pixels = small.get_flattened_data()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    if value >= _SIGNED_LIMIT:
+        value -= _UNSIGNED_LIMIT
+    return value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Return the number of differing bits between two stored hashes."""
+    return ((first ^ second) % _UNSIGNED_LIMIT).bit_count()
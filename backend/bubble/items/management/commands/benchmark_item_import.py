@@ -0,0 +1,72 @@
+"""Compare importing items one by one with the bulk create path."""
+
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bubble.items.models import CategoryType, Item
+from bubble.items.tasks import update_item_embeddings
+
+
+class Command(BaseCommand):
+    help = (
+        "Import items with Item.save() and with the bulk create path, report "
+        "items per second and roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1000,
+            help="Number of items per import (default: 1000).",
+        )
+        parser.add_argument(
+            "--books",
+            type=float,
+            default=0.1,
+            help="Share of items in the books category (default: 0.1).",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        books = round(count * options["books"])
+
+        single = self.measure(self.save_each, count, books)
+        bulk = self.measure(self.bulk_create, count, books)
+        self.stdout.write(f"Item.save(): {count / single:,.0f} items/s ({single:.2f}s)")
+        self.stdout.write(f"Bulk create: {count / bulk:,.0f} items/s ({bulk:.2f}s)")
+        self.stdout.write(f"Speedup: {single / bulk:.1f}x")
+
+    def measure(self, import_items, count: int, books: int) -> float:
+        """Return the seconds `import_items` takes, without keeping any rows."""
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username=f"benchmark-{uuid.uuid4().hex[:8]}"
+            )
+            items = [
+                Item(
+                    user=user,
+                    # Repeated names exercise the slug suffixes
+                    name=f"Benchmark item {index % 100}",
+                    category=CategoryType.BOOKS if index < books else "",
+                )
+                for index in range(count)
+            ]
+            start = time.perf_counter()
+            import_items(items, user)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    def save_each(self, items, user):
+        for item in items:
+            item.save()
+
+    def bulk_create(self, items, user):
+        items = Item.objects.bulk_create_items(items, history_user=user)
+        # Runs after the commit otherwise, include it in the measurement
+        update_item_embeddings([str(item.pk) for item in items])
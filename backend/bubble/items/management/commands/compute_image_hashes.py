@@ -0,0 +1,48 @@
+"""Backfill hashes, dimensions and placeholders of existing images."""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from bubble.items.models import Image
+
+FIELDS = ["sha256", "phash", "width", "height", "placeholder"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute missing content and perceptual hashes, dimensions and "
+        "placeholders of item images."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of images to update per query (default: 200).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        batch: list[Image] = []
+        updated = 0
+
+        images = Image.objects.filter(
+            Q(phash__isnull=True) | Q(sha256="") | Q(width__isnull=True)
+        ).exclude(original="")
+        for image in images.iterator(chunk_size=batch_size):
+            try:
+                image.sha256 = image.compute_sha256()
+            except OSError:
+                self.stderr.write(f"Missing file for image {image.pk}")
+                continue
+            image.analyze_image()
+            batch.append(image)
+            if len(batch) >= batch_size:
+                updated += Image.objects.bulk_update(batch, FIELDS)
+                batch = []
+
+        if batch:
+            updated += Image.objects.bulk_update(batch, FIELDS)
+
+        self.stdout.write(self.style.SUCCESS(f"Analyzed {updated} images."))
@@ -0,0 +1,188 @@
+"""Show the query plans of the hot item queries with and without their indexes.
+
+The command works on a temporary copy of the item table, which hides the real
+one for its database session, so the synthetic rows and dropped indexes never
+touch the real table. Still run it against a development or staging database,
+not production: with `--items 0` it copies all items, and the plans of
+`--analyze` run the queries.
+"""
+
+import random
+import re
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from bubble.bookings.models import Booking, BookingStatus
+from bubble.items.api.filters import ItemFilter
+from bubble.items.models import CategoryType, Item, ItemStatus
+
+# Indexes added for the queries below, dropped for the plans before them
+HOT_INDEXES = (
+    "item_published_created_idx",
+    "item_published_category_idx",
+    "item_published_sale_idx",
+    "item_published_rental_idx",
+    "item_user_created_idx",
+    "item_rented_idx",
+)
+
+SEED_PREFIX = "explain-"
+# Table of CREATE INDEX statements, replaced by the temporary copy
+INDEX_TABLE_RE = re.compile(r" ON (?:ONLY )?\S+ USING ")
+
+
+def hot_queries(user_id):
+    """Return the querysets of the public lists, owner lists and booking scans."""
+    published = Item.objects.published().order_by("-created_at", "-id")
+    active_bookings = Booking.objects.filter(
+        Q(status=BookingStatus.CONFIRMED),
+        Q(time_from__lte=timezone.now()),
+        item=OuterRef("pk"),
+    )
+    return {
+        "public list": published[:20],
+        "public list of a category": published.filter(category=CategoryType.BOOKS)[:20],
+        "public list by sale price range": ItemFilter(
+            {"min_sale_price": "10", "max_sale_price": "20"}, queryset=published
+        ).qs[:20],
+        "public list by rental price": published.filter(rental_price__lte=5).order_by(
+            "rental_price"
+        )[:20],
+        "own items": Item.objects.filter(user_id=user_id).order_by(
+            "-created_at", "-id"
+        )[:20],
+        "rented items to free": Item.objects.filter(status=ItemStatus.RENTED)
+        .filter(~Exists(active_bookings))
+        .values("id"),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot item queries on synthetic data, first with the "
+        "partial and composite item indexes and then without them. Runs on a "
+        "temporary copy of the item table, which is rolled back. Do not run it "
+        "against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=100_000,
+            help="Number of synthetic items, 0 uses existing data (default: 100000).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the synthetic data (default: 0).",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run the queries with EXPLAIN ANALYZE to show actual timings.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_scratch_table(copy_rows=not options["items"])
+            user_id = self.seed(options["items"], options["seed"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE items_item")
+
+            after = self.explain(user_id, analyze=options["analyze"])
+            with connection.cursor() as cursor:
+                for name in HOT_INDEXES:
+                    cursor.execute(
+                        f"DROP INDEX pg_temp.{connection.ops.quote_name(name)}"
+                    )
+            before = self.explain(user_id, analyze=options["analyze"])
+            transaction.set_rollback(True)
+
+        for name, plan in after.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write("Without indexes:")
+            self.stdout.write(before[name])
+            self.stdout.write("With indexes:")
+            self.stdout.write(plan)
+            self.stdout.write("")
+
+    def create_scratch_table(self, *, copy_rows: bool) -> None:
+        """
+        Create a temporary copy of the item table with the same indexes.
+
+        Temporary tables come first in the search path, so queries of this
+        session use the copy. Its indexes keep their names in the temporary
+        schema.
+        """
+        table = connection.ops.quote_name(Item._meta.db_table)  # noqa: SLF001
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_schema()")
+            source = f"{connection.ops.quote_name(cursor.fetchone()[0])}.{table}"
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes "
+                "WHERE schemaname = current_schema() AND tablename = %s",
+                [Item._meta.db_table],  # noqa: SLF001
+            )
+            indexes = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {table} "
+                f"(LIKE {source} INCLUDING ALL EXCLUDING INDEXES)"
+            )
+            for indexdef in indexes:
+                cursor.execute(
+                    INDEX_TABLE_RE.sub(f" ON pg_temp.{table} USING ", indexdef, 1)
+                )
+            if copy_rows:
+                cursor.execute(f"INSERT INTO pg_temp.{table} SELECT * FROM {source}")  # noqa: S608
+
+    def seed(self, count: int, seed: int) -> uuid.UUID | None:
+        """Insert `count` items, 100 per owner, and return the id of an owner."""
+        if not count:
+            return Item.objects.values_list("user_id", flat=True).first()
+
+        rng = random.Random(seed)  # noqa: S311
+        # The copy has no foreign keys, owners need not exist
+        users = [
+            uuid.UUID(int=rng.getrandbits(128)) for _ in range(max(count // 100, 1))
+        ]
+        categories = [value for value, _ in CategoryType.choices]
+        statuses = [value for value, _ in ItemStatus.choices]
+        items = []
+        for index in range(count):
+            price = Decimal(rng.randrange(100, 10_000)) / 100
+            for_sale = rng.choice((True, False))
+            items.append(
+                Item(
+                    user_id=rng.choice(users),
+                    name=f"Item {index}",
+                    slug=f"{SEED_PREFIX}{index}",
+                    category=rng.choice(categories),
+                    # Most items are drafts or published and available
+                    status=rng.choices(statuses, weights=[30, 5, 45, 5, 5, 10])[0],
+                    sale_price=price if for_sale else None,
+                    rental_price=None if for_sale else price / 10,
+                )
+            )
+        Item.objects.bulk_create(items, batch_size=5000)
+        # Spread creation over two years, bulk_create sets the current time
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [rng.uniform(-1, 1)])
+            cursor.execute(
+                "UPDATE items_item SET created_at = "
+                "now() - random() * interval '730 days' WHERE slug LIKE %s",
+                [f"{SEED_PREFIX}%"],
+            )
+        return users[0]
+
+    def explain(self, user_id, *, analyze: bool) -> dict[str, str]:
+        return {
+            name: queryset.explain(analyze=analyze)
+            for name, queryset in hot_queries(user_id).items()
+        }
@@ -0,0 +1,25 @@
+"""Rebuild the public catalogue from the items."""
+
+from django.core.management.base import BaseCommand
+
+from bubble.items.models import CatalogueEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the catalogue entries of all public items and delete all "
+        "others. Signals keep the catalogue current, run this after deploying "
+        "it or after changing items with raw queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of items refreshed per batch (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        refreshed = CatalogueEntry.objects.rebuild(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} entries."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="phash",
+            field=models.BigIntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Perceptual hash (dHash) of the original image",
+                null=True,
+            ),
+        ),
+    ]
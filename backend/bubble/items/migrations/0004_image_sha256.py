@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0003_image_phash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="SHA-256 digest of the original image bytes",
+                max_length=64,
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0004_image_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Height of the original image in pixels",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="placeholder",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Tiny inline JPEG shown while the image loads",
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="width",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Width of the original image in pixels",
+                null=True,
+            ),
+        ),
+    ]
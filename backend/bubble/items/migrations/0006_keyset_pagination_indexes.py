@@ -0,0 +1,20 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0005_image_dimensions_placeholder"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="item_created_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import F
+
+OWNER_CODENAMES = ["change_item", "delete_item"]
+
+
+def prune_owner_permissions(apps, schema_editor):
+    """Owners get these permissions from OwnerPermissionBackend."""
+    ItemUserObjectPermission = apps.get_model("items", "ItemUserObjectPermission")
+    ItemUserObjectPermission.objects.filter(
+        permission__content_type__app_label="items",
+        permission__codename__in=OWNER_CODENAMES,
+        user=F("content_object__user"),
+    ).delete()
+
+
+def restore_owner_permissions(apps, schema_editor):
+    Item = apps.get_model("items", "Item")
+    ItemUserObjectPermission = apps.get_model("items", "ItemUserObjectPermission")
+    Permission = apps.get_model("auth", "Permission")
+
+    permissions = Permission.objects.filter(
+        content_type__app_label="items", codename__in=OWNER_CODENAMES
+    )
+    for permission in permissions:
+        ItemUserObjectPermission.objects.bulk_create(
+            [
+                ItemUserObjectPermission(
+                    permission=permission, user_id=user_id, content_object_id=item_id
+                )
+                for item_id, user_id in Item.objects.filter(
+                    user__isnull=False
+                ).values_list("pk", "user_id")
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0006_keyset_pagination_indexes"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(prune_owner_permissions, restore_owner_permissions),
+    ]
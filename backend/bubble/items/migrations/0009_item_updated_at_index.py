@@ -0,0 +1,20 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0008_catalogue_entry"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["updated_at", "id"], name="item_updated_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:19
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without blocking writes to the items table
+    atomic = False
+
+    dependencies = [
+        ("items", "0009_item_updated_at_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(("status__in", (2, 3, 4, 5))),
+                fields=["-created_at", "-id"],
+                name="item_published_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(("status__in", (2, 3, 4, 5))),
+                fields=["category", "-created_at", "-id"],
+                name="item_published_category_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(
+                    ("sale_price__isnull", False), ("status__in", (2, 3, 4, 5))
+                ),
+                fields=["sale_price"],
+                name="item_published_sale_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(
+                    ("rental_price__isnull", False), ("status__in", (2, 3, 4, 5))
+                ),
+                fields=["rental_price"],
+                name="item_published_rental_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="item_user_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(("status", 4)), fields=["id"], name="item_rented_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0010_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="image",
+            name="phash",
+            field=models.BigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Perceptual hash (dHash) of the original image",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:42
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without blocking image uploads
+    atomic = False
+
+    dependencies = [
+        ("items", "0011_image_phash_without_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="image",
+            index=models.Index(
+                condition=models.Q(("phash__isnull", False)),
+                fields=["item"],
+                include=("phash",),
+                name="image_item_phash_idx",
+            ),
+        ),
+    ]
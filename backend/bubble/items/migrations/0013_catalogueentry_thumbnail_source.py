@@ -0,0 +1,44 @@
+# Generated by Django 5.2.11 on 2026-10-19 14:02
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_catalogue(apps, schema_editor):
+    CatalogueEntry = apps.get_model("items", "CatalogueEntry")
+    Image = apps.get_model("items", "Image")
+    CatalogueEntry.objects.filter(
+        models.Q(item__internal=True) | models.Q(item__active=False)
+    ).delete()
+    first_original = (
+        Image.objects.filter(item=models.OuterRef("item"))
+        .order_by("ordering")
+        .values("original")[:1]
+    )
+    CatalogueEntry.objects.update(
+        thumbnail_source=Coalesce(models.Subquery(first_original), models.Value(""))
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("items", "0012_image_item_phash_index"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="catalogueentry",
+            old_name="thumbnail",
+            new_name="thumbnail_source",
+        ),
+        migrations.AlterField(
+            model_name="catalogueentry",
+            name="thumbnail_source",
+            field=models.CharField(
+                blank=True,
+                help_text="Name of the original of the first image, shown as thumbnail",
+                max_length=255,
+            ),
+        ),
+        migrations.RunPython(backfill_catalogue, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,38 @@
+import hashlib
+import itertools
+import logging
 import uuid
+from operator import attrgetter
 from pathlib import Path
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from djmoney.models.fields import MoneyField
+from djmoney.utils import get_currency_field_name
 from guardian.models import GroupObjectPermissionBase, UserObjectPermissionBase
-from guardian.shortcuts import assign_perm, get_objects_for_user
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToCover, ResizeToFill
 from pgvector.django import VectorField
+from PIL import Image as PILImage
 from simple_history.models import HistoricalRecords
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
+from bubble.items import storage
 from bubble.items.embeddings import get_embedding_model
+from bubble.items.hashing import dhash
+from bubble.items.permissions import item_access, shared_user_pks_by_item
+from bubble.items.placeholders import placeholder_data_uri
 from config.settings.base import AUTH_USER_MODEL
 
+logger = logging.getLogger(__name__)
+
 money_defaults = {
     "max_digits": 10,
     "decimal_places": 2,
@@ -62,19 +79,136 @@ class CategoryType(models.TextChoices):
     VEHICLES = "vehicles", _("Vehicles")
 
 
-class ItemManager(models.Manager):
+def first_image_prefetch(lookup: str = "images") -> models.Prefetch:
+    """
+    Prefetch only the first image of each item into `Item.first_images`.
+
+    The sliced prefetch loads the images of all items on a page in a single
+    query. `lookup` may span relations, e.g. `item__images` for bookings.
+    """
+    return models.Prefetch(
+        lookup,
+        queryset=Image.objects.order_by("ordering")[:1],
+        to_attr="first_images",
+    )
+
+
+# Sent instead of `post_save` when items are created or updated in bulk, with
+# the arguments `items`, `created`, `update_fields` and `history_user`
+items_bulk_saved = Signal()
+
+# Sent by `ItemQuerySet.touch` with the argument `item_ids`
+items_touched = Signal()
+
+
+class ItemQuerySet(models.QuerySet):
+    def with_first_image(self) -> "ItemQuerySet":
+        """Load the first image of every item, see `Item.get_first_image`."""
+        return self.prefetch_related(first_image_prefetch())
+
+    def catalogued(self) -> "ItemQuerySet":
+        """Filter items shown in the public catalogue, see `CatalogueEntry`."""
+        return self.filter(
+            status__in=ItemStatus.published(), active=True, internal=False
+        )
+
+    def touch(self) -> int:
+        """
+        Mark items as modified after changes to related rows like images.
+
+        Keeps `updated_at` usable as validator for conditional requests, see
+        bubble.core.api.conditional. Bypasses history and save signals, sends
+        `items_touched` instead.
+        """
+        updated = self.update(updated_at=timezone.now())
+        item_ids = list(self.values_list("pk", flat=True))
+        items_touched.send(sender=Item, item_ids=item_ids)
+        return updated
+
+    def bulk_create_items(self, items: list["Item"], history_user=None) -> list["Item"]:
+        """
+        Create items with slugs and history in a constant number of queries.
+
+        Slugs are allocated like `Item.save` does. Receivers of
+        `items_bulk_saved` handle side effects of the whole batch at once.
+        """
+        unnamed = [item for item in items if not item.slug]
+        with transaction.atomic():
+            self.allocate_slugs(unnamed)
+            try:
+                with transaction.atomic():
+                    items = bulk_create_with_history(
+                        items, self.model, default_user=history_user
+                    )
+            except IntegrityError:
+                # A concurrent save took one of the slugs
+                self.allocate_slugs(unnamed, retry=True)
+                items = bulk_create_with_history(
+                    items, self.model, default_user=history_user
+                )
+            items_bulk_saved.send(
+                sender=Item,
+                items=items,
+                created=True,
+                update_fields=None,
+                history_user=history_user,
+            )
+        return items
+
+    def allocate_slugs(self, items: list["Item"], *, retry: bool = False) -> None:
+        """Derive unique slugs from the names with a single query."""
+        bases = [slugify(item.name) for item in items]
+        taken = set()
+        if not retry:
+            taken = set(
+                Item.objects.filter(slug__in=set(bases)).values_list("slug", flat=True)
+            )
+        for item, base in zip(items, bases, strict=True):
+            if not base or base in taken or retry:
+                suffix = uuid.uuid4().hex if retry else item.id.hex
+                item.slug = item._suffixed_slug(base, suffix)  # noqa: SLF001
+            else:
+                item.slug = base
+            taken.add(item.slug)
+
+    def bulk_update_items(
+        self, items: list["Item"], fields, history_user=None
+    ) -> list["Item"]:
+        """Save `fields` of items with history in a constant number of queries."""
+        opts = self.model._meta  # noqa: SLF001
+        update_fields = {*fields, "updated_at"}
+        # Money amounts are stored next to their currency
+        update_fields.update(
+            get_currency_field_name(field.name, field)
+            for field in map(opts.get_field, fields)
+            if isinstance(field, MoneyField)
+        )
+
+        now = timezone.now()
+        for item in items:
+            item.updated_at = now
+        with transaction.atomic():
+            bulk_update_with_history(
+                items, self.model, sorted(update_fields), default_user=history_user
+            )
+            items_bulk_saved.send(
+                sender=Item,
+                items=items,
+                created=False,
+                update_fields=update_fields,
+                history_user=history_user,
+            )
+        return items
+
+
+class ItemManager(models.Manager.from_queryset(ItemQuerySet)):
     def published(self) -> models.QuerySet:
         """Return a queryset of published items."""
         return self.filter(status__in=ItemStatus.published())
 
     def get_for_user(self, user) -> models.QuerySet:
-        """Return a queryset filtered by user permissions."""
-        items_with_change_permission = get_objects_for_user(
-            user,
-            f"{self.model._meta.app_label}.change_{self.model._meta.model_name}",  # noqa: SLF001
-            accept_global_perms=False,
-        )
-        return self.filter(pk__in=items_with_change_permission)
+        """Return the items a user owns or may change through sharing."""
+        return self.filter(item_access(user, self.model))
 
     def semantic_search(self, query: str, limit: int = 10) -> models.QuerySet:
         """
@@ -186,6 +320,50 @@ class Item(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination, see bubble.core.api.pagination
+            models.Index(fields=["-created_at", "-id"], name="item_created_at_id_idx"),
+            # Change feeds, see bubble.core.api.pagination.DeltaPagination
+            models.Index(fields=["updated_at", "id"], name="item_updated_at_id_idx"),
+            # Public lists, see `manage.py explain_hot_queries` for the plans.
+            # They filter on the status only. `active` and `internal` are read
+            # when catalogue entries are refreshed by primary key, so they are
+            # not part of the conditions.
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(status__in=ItemStatus.published()),
+                name="item_published_created_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                condition=models.Q(status__in=ItemStatus.published()),
+                name="item_published_category_idx",
+            ),
+            models.Index(
+                fields=["sale_price"],
+                condition=models.Q(
+                    status__in=ItemStatus.published(), sale_price__isnull=False
+                ),
+                name="item_published_sale_idx",
+            ),
+            models.Index(
+                fields=["rental_price"],
+                condition=models.Q(
+                    status__in=ItemStatus.published(), rental_price__isnull=False
+                ),
+                name="item_published_rental_idx",
+            ),
+            # Lists of the own items
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="item_user_created_idx"
+            ),
+            # Rented items are scanned every few minutes by check_bookings_active
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status=ItemStatus.RENTED),
+                name="item_rented_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 condition=(
@@ -200,33 +378,79 @@ class Item(models.Model):
         return f"{self.pk} - {self.name}" or f"Item {self.pk}"
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            original_slug = slugify(self.name)
-            queryset = self._meta.model.objects.all()
-            if self.pk:
-                queryset = queryset.exclude(pk=self.pk)
-
-            counter = 1
-            while queryset.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
-
-        super().save(*args, **kwargs)
-
-        if self.user:
-            # give all object permission to self.request.user on instance
-            app_label = self._meta.model._meta.app_label  # noqa: SLF001
-            model_name = self._meta.model._meta.model_name  # noqa: SLF001
-            assign_perm(f"{app_label}.change_{model_name}", self.user, obj=self)
-            assign_perm(f"{app_label}.delete_{model_name}", self.user, obj=self)
+        # Owners need no permission rows, see bubble.items.permissions
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            self._save_with_new_slug(*args, **kwargs)
+
+    def _save_with_new_slug(self, *args, **kwargs):
+        """
+        Save with a slug derived from the name in a constant number of queries.
+
+        The plain name is used if it is free, otherwise a suffix from the
+        primary key keeps it unique. Only a concurrent save taking the same
+        slug makes the insert fail; it is then retried with a random suffix.
+        """
+        base = slugify(self.name)
+        # Slugs are unique across items and all subclasses like books, whose
+        # pk is the pointer to the item and only set by the insert
+        taken = (
+            Item.objects.filter(slug=base).exclude(pk=self.id).exists()
+            if base
+            else True
+        )
+        self.slug = self._suffixed_slug(base, self.id.hex) if taken else base
+
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError:
+            if not Item.objects.filter(slug=self.slug).exclude(pk=self.id).exists():
+                raise
+            self.slug = self._suffixed_slug(base, uuid.uuid4().hex)
+            super().save(*args, **kwargs)
+
+    def _suffixed_slug(self, base: str, suffix: str) -> str:
+        max_length = self._meta.get_field("slug").max_length
+        suffix = suffix[:8]
+        if not base:
+            return suffix
+        return f"{base[: max_length - len(suffix) - 1]}-{suffix}"
+
+    @classmethod
+    def sync_audiences(cls, items) -> dict:
+        """
+        Return the users whose change feeds list each item, and if public
+        ones do, by the pk of the item.
+        """
+        shared = shared_user_pks_by_item(item.pk for item in items)
+        return {
+            item.pk: (
+                [item.user_id, *shared.get(str(item.pk), [])],
+                item.status in ItemStatus.published(),
+            )
+            for item in items
+        }
 
     def is_ready_for_display(self):
         """Check if item has minimum required fields to be displayed."""
         return bool(self.name and self.category)
 
     def get_first_image(self):
-        """Return the first image of the item based on ordering."""
-        return self.images.order_by("ordering").first()
+        """
+        Return the first image of the item based on ordering.
+
+        Uses images loaded by `ItemQuerySet.with_first_image()` or
+        `prefetch_related("images")` and only queries without either.
+        """
+        if not hasattr(self, "first_images"):
+            prefetched = getattr(self, "_prefetched_objects_cache", {}).get("images")
+            if prefetched is not None:
+                self.first_images = sorted(prefetched, key=attrgetter("ordering"))[:1]
+            else:
+                self.first_images = list(self.images.order_by("ordering")[:1])
+        return self.first_images[0] if self.first_images else None
 
 
 class ItemUserObjectPermission(UserObjectPermissionBase):
@@ -252,18 +476,276 @@ class ItemEmbedding(models.Model):
         return f"Embedding for {self.item.name} ({self.item.id})"
 
 
+def search_vector(item: Item) -> SearchVector:
+    """Return the full text search vector of an item, the name ranks highest."""
+    config = settings.CATALOGUE_SEARCH_CONFIG
+    return SearchVector(
+        models.Value(item.name), config=config, weight="A"
+    ) + SearchVector(models.Value(item.description), config=config, weight="B")
+
+
+class CatalogueEntryQuerySet(models.QuerySet):
+    def refresh(self, item_ids) -> int:
+        """
+        Bring the entries of `item_ids` in line with their items.
+
+        Published items are inserted or updated, entries of all other items
+        are deleted. `item_ids` may be a list or a queryset of ids, the number
+        of queries does not depend on it.
+        """
+        items = list(
+            Item.objects.filter(pk__in=item_ids)
+            .catalogued()
+            .select_related("user")
+            .with_first_image()
+        )
+        self.filter(item_id__in=item_ids).exclude(
+            item_id__in=[item.pk for item in items]
+        ).delete()
+
+        entries = [self.model.from_item(item) for item in items]
+        opts = self.model._meta  # noqa: SLF001
+        self.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["item"],
+            update_fields=[
+                field.name for field in opts.concrete_fields if not field.primary_key
+            ],
+        )
+        return len(entries)
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """Refresh the entries of all items, in batches of `batch_size` items."""
+        self.exclude(item_id__in=Item.objects.catalogued().values("pk")).delete()
+        item_ids = Item.objects.catalogued().values_list("pk", flat=True)
+        refreshed = 0
+        for batch in itertools.batched(item_ids.iterator(batch_size), batch_size):
+            refreshed += self.refresh(list(batch))
+        return refreshed
+
+
+class CatalogueEntry(models.Model):
+    """
+    Denormalized row of a published item for the public catalogue.
+
+    Holds what public lists show and filter on, so they read a single narrow
+    table. Entries follow their items through `CatalogueEntry.objects.refresh`,
+    run in a task after the commit of saves and `ItemQuerySet.touch`, see
+    bubble.items.signals. Only active, public items that are published have
+    an entry.
+    """
+
+    item = models.OneToOneField(
+        Item,
+        on_delete=models.CASCADE,
+        related_name="catalogue_entry",
+        primary_key=True,
+    )
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+    )
+    owner_name = models.CharField(max_length=255)
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200, db_index=False)
+    category = models.CharField(max_length=100, blank=True, choices=CategoryType)
+    condition = models.IntegerField(choices=ConditionType)
+    status = models.IntegerField(choices=ItemStatus)
+    sale_price = MoneyField(
+        **money_defaults,
+        blank=True,
+        null=True,
+        default_currency=settings.DEFAULT_CURRENCY,
+    )
+    rental_price = MoneyField(
+        **money_defaults,
+        blank=True,
+        null=True,
+        default_currency=settings.DEFAULT_CURRENCY,
+    )
+    rental_period = models.CharField(max_length=1, blank=True, choices=RentalPeriodType)
+    thumbnail_source = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text=_("Name of the original of the first image, shown as thumbnail"),
+    )
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_placeholder = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    search_vector = SearchVectorField(null=True)
+
+    objects = CatalogueEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name_plural = _("catalogue entries")
+        indexes = [
+            # Keyset pagination, see bubble.core.api.pagination
+            models.Index(fields=["-created_at", "-item"], name="catalogue_created_idx"),
+            models.Index(
+                fields=["category", "-created_at"], name="catalogue_category_idx"
+            ),
+            models.Index(fields=["user", "-created_at"], name="catalogue_user_idx"),
+            GinIndex(fields=["search_vector"], name="catalogue_search_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_item(cls, item: Item) -> "CatalogueEntry":
+        """Build the entry of an item with its user and first image loaded."""
+        image = item.get_first_image()
+        return cls(
+            item=item,
+            user=item.user,
+            owner_name=item.user.name or item.user.username,
+            name=item.name,
+            slug=item.slug,
+            category=item.category,
+            condition=item.condition,
+            status=item.status,
+            sale_price=item.sale_price,
+            rental_price=item.rental_price,
+            rental_period=item.rental_period,
+            thumbnail_source=image.original.name if image else "",
+            image_width=image.width if image else None,
+            image_height=image.height if image else None,
+            image_placeholder=image.placeholder if image else "",
+            created_at=item.created_at,
+            updated_at=item.updated_at,
+            search_vector=search_vector(item),
+        )
+
+
 def upload_to_item_images(instance: "Image", filename: str):
+    if storage.is_enabled() and instance.sha256:
+        return storage.content_addressed_name(instance.sha256, filename)
+
     extension: str = Path(filename).suffix or ".jpg"
     item_creation_datestr = instance.item.created_at.strftime("%Y/%m/%d")
     item_prefix: str = f"items/{item_creation_datestr}/{instance.item.id}"
     return f"{item_prefix}/{str(uuid.uuid4())[0:8]}/original{extension}"
 
 
+class HammingDistance(models.Func):
+    """Number of differing bits between two 64 bit integer expressions."""
+
+    function = "bit_count"
+    template = "%(function)s((%(expressions)s)::bit(64))"
+    arg_joiner = " # "
+    output_field = models.IntegerField()
+
+
+class ImageQuerySet(models.QuerySet):
+    def near_duplicates(self, phash: int, *, user_id, max_distance: int | None = None):
+        """
+        Return images of the items of `user_id` within `max_distance` bits.
+
+        The result is annotated with `distance` and ordered closest first.
+        No index serves the distance itself, so the images are first narrowed
+        to the items of the owner, whose hashes `image_item_phash_idx`
+        covers. The cost grows with the images of one owner, not the table.
+        """
+        if max_distance is None:
+            max_distance = settings.ITEM_IMAGE_DUPLICATE_DISTANCE
+        return (
+            self.filter(
+                item__in=Item.objects.filter(user_id=user_id).values("pk"),
+                phash__isnull=False,
+            )
+            .annotate(
+                distance=HammingDistance(
+                    "phash", Cast(models.Value(phash), models.BigIntegerField())
+                )
+            )
+            .filter(distance__lte=max_distance)
+            .order_by("distance")
+        )
+
+    def bulk_create_for_item(self, item: "Item", files) -> list["Image"]:
+        """
+        Create images for all uploaded `files` in a constant number of queries.
+
+        New images are appended after the existing ones in upload order.
+        """
+        start = self.filter(item=item).count()
+        images = [
+            self.model(item=item, original=file, ordering=start + index)
+            for index, file in enumerate(files)
+        ]
+        for image in images:
+            image.analyze_original()
+
+        with transaction.atomic():
+            if storage.is_enabled():
+                storage.link_stored_originals(images)
+            images = self.bulk_create(images)
+            Item.objects.filter(pk=item.pk).touch()
+        return images
+
+    def reorder(self, item: "Item", image_ids: list) -> int:
+        """Set the ordering of the item's images with a single UPDATE."""
+        updated = self.filter(item=item, pk__in=image_ids).update(
+            ordering=models.Case(
+                *[
+                    models.When(pk=image_id, then=models.Value(index))
+                    for index, image_id in enumerate(image_ids)
+                ],
+                output_field=models.IntegerField(),
+            )
+        )
+        if updated:
+            Item.objects.filter(pk=item.pk).touch()
+        return updated
+
+    def delete(self):
+        item_ids = list(self.order_by().values_list("item_id", flat=True).distinct())
+        result = super().delete()
+        Item.objects.filter(pk__in=item_ids).touch()
+        return result
+
+
 class Image(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     original = models.ImageField(upload_to=upload_to_item_images, max_length=255)
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="images")
     ordering = models.IntegerField(default=0)
+    phash = models.BigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Perceptual hash (dHash) of the original image"),
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text=_("SHA-256 digest of the original image bytes"),
+    )
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Width of the original image in pixels"),
+    )
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Height of the original image in pixels"),
+    )
+    placeholder = models.TextField(
+        blank=True,
+        editable=False,
+        help_text=_("Tiny inline JPEG shown while the image loads"),
+    )
 
     thumbnail = ImageSpecField(
         source="original",
@@ -278,12 +760,85 @@ class Image(models.Model):
         options={"quality": 88},
     )
 
+    objects = ImageQuerySet.as_manager()
+
     class Meta:
         ordering = ["item", "ordering"]
+        indexes = [
+            # Near-duplicate lookups, see ImageQuerySet.near_duplicates
+            models.Index(
+                fields=["item"],
+                include=["phash"],
+                condition=models.Q(phash__isnull=False),
+                name="image_item_phash_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Image for {self.item.name} ({self.filename})"
 
+    def save(self, *args, **kwargs):
+        self._save_original(*args, **kwargs)
+        Item.objects.filter(pk=self.item_id).touch()
+
+    def _save_original(self, *args, **kwargs):
+        if not self.original or self.original._committed:  # noqa: SLF001
+            super().save(*args, **kwargs)
+            return
+
+        # a new file was uploaded
+        self.analyze_original()
+        if not storage.is_enabled():
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            storage.link_stored_originals([self])
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Item.objects.filter(pk=self.item_id).touch()
+        return result
+
+    def analyze_original(self) -> None:
+        """Compute hashes, dimensions and placeholder of a new original."""
+        self.sha256 = self.compute_sha256()
+        self.analyze_image()
+
+    def compute_sha256(self) -> str:
+        """Compute the SHA-256 digest of the original image file."""
+        digest = hashlib.sha256()
+        for chunk in self.original.chunks():
+            digest.update(chunk)
+        self.original.seek(0)
+        return digest.hexdigest()
+
+    def analyze_image(self) -> None:
+        """
+        Set the perceptual hash, dimensions and placeholder of the original.
+
+        The file is decoded once for all of them.
+        """
+        try:
+            with PILImage.open(self.original) as img:
+                self.width, self.height = img.size
+                self.phash = dhash(img)
+                self.placeholder = placeholder_data_uri(img)
+        except (OSError, ValueError):
+            logger.warning("Could not analyze original of image %s", self.pk)
+        finally:
+            if not self.original.closed:
+                self.original.seek(0)
+
+    def find_near_duplicates(self) -> models.QuerySet:
+        """Return similar images of the same item or other items of the owner."""
+        if self.phash is None:
+            return Image.objects.none()
+        return Image.objects.exclude(pk=self.pk).near_duplicates(
+            self.phash, user_id=self.item.user_id
+        )
+
     @property
     def filename(self):
         """Return the filename of the original image."""
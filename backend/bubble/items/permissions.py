@@ -0,0 +1,212 @@
+"""Object permissions of items.
+
+Owners implicitly may change and delete their items, `OwnerPermissionBackend`
+grants that without any stored permission rows. Guardian object permissions
+are only used for items explicitly shared with other users or groups.
+
+The ids of items shared with a user are cached per model. Signals invalidate
+the caches of the users affected by a change: the user of a permission row,
+the members of a group for group permissions, the user joining or leaving a
+group, and the users an item was shared with when it is deleted.
+"""
+
+import secrets
+import uuid
+from collections.abc import Iterable
+from functools import cache
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import BaseBackend
+from django.core.cache import cache as default_cache
+from django.db import models
+from django.db.models.functions import Cast
+from guardian.models import GroupObjectPermission, UserObjectPermission
+from guardian.shortcuts import get_objects_for_user, get_users_with_perms
+
+OWNER_ACTIONS = ("change", "delete")
+
+
+@cache
+def owner_permissions(model: type[models.Model]) -> frozenset[str]:
+    """
+    Return the permissions owners implicitly have on instances of `model`.
+
+    Includes the permissions of parent models, e.g. `items.change_item` for
+    books, with and without app label, as guardian accepts both.
+    """
+    permissions = set()
+    for klass in (model, *model._meta.get_parent_list()):  # noqa: SLF001
+        opts = klass._meta  # noqa: SLF001
+        for action in OWNER_ACTIONS:
+            codename = f"{action}_{opts.model_name}"
+            permissions.update((codename, f"{opts.app_label}.{codename}"))
+    return frozenset(permissions)
+
+
+class OwnerPermissionBackend(BaseBackend):
+    """Grant item owners change and delete permission on their items."""
+
+    def has_perm(self, user_obj, perm, obj=None):
+        from bubble.items.models import Item  # noqa: PLC0415
+
+        if not isinstance(obj, Item) or not user_obj.is_active:
+            return False
+        if obj.user_id is None or obj.user_id != user_obj.pk:
+            return False
+        return perm in owner_permissions(type(obj))
+
+
+SHARED_IDS_CACHE_PREFIX = "items:shared-ids"
+SHARED_IDS_GENERATION_KEY = f"{SHARED_IDS_CACHE_PREFIX}:generation"
+
+
+def item_access(user, model: type[models.Model], prefix: str = "") -> models.Q:
+    """
+    Return a condition matching items `user` owns or may change.
+
+    `prefix` is the lookup to the item, e.g. `item__` to filter bookings.
+    """
+    condition = models.Q(**{f"{prefix}pk__in": shared_object_ids(user, model)})
+    if user.is_authenticated:
+        condition |= models.Q(**{f"{prefix}user": user})
+    return condition
+
+
+def shared_object_ids(user, model: type[models.Model]) -> list:
+    """Return the primary keys of `model` instances shared with `user`."""
+    if not user.is_authenticated:
+        return resolve_shared_object_ids(user, model)
+
+    key = shared_ids_cache_key(model, user.pk)
+    packed = default_cache.get(key)
+    if packed is None:
+        ids = resolve_shared_object_ids(user, model)
+        default_cache.set(key, pack_ids(ids), settings.ITEM_PERMISSION_CACHE_TIMEOUT)
+        return ids
+    return unpack_ids(packed)
+
+
+def resolve_shared_object_ids(user, model: type[models.Model]) -> list:
+    opts = model._meta  # noqa: SLF001
+    shared = get_objects_for_user(
+        user,
+        f"{opts.app_label}.change_{opts.model_name}",
+        klass=model,
+        accept_global_perms=False,
+    )
+    return list(shared.values_list("pk", flat=True))
+
+
+def pack_ids(ids: list[uuid.UUID]) -> bytes:
+    """Store sorted UUIDs as 16 bytes each."""
+    return b"".join(sorted(pk.bytes for pk in ids))
+
+
+def unpack_ids(packed: bytes) -> list[uuid.UUID]:
+    return [
+        uuid.UUID(bytes=packed[offset : offset + 16])
+        for offset in range(0, len(packed), 16)
+    ]
+
+
+def new_generation() -> int:
+    # Random instead of incremented, so an evicted generation is never reused
+    return secrets.randbits(32)
+
+
+def shared_ids_cache_key(
+    model: type[models.Model], user_pk, generation: int | None = None
+) -> str:
+    if generation is None:
+        generation = shared_ids_generation()
+    label = model._meta.label_lower  # noqa: SLF001
+    return f"{SHARED_IDS_CACHE_PREFIX}:{generation}:{label}:{user_pk}"
+
+
+def shared_ids_generation() -> int:
+    return default_cache.get_or_set(SHARED_IDS_GENERATION_KEY, new_generation, None)
+
+
+def item_models() -> list[type[models.Model]]:
+    """Return `Item` and its subclasses like `Book`."""
+    item = apps.get_model("items", "Item")
+    return [model for model in apps.get_models() if issubclass(model, item)]
+
+
+def invalidate_shared_object_ids(
+    user_pks: Iterable, for_models: Iterable[type[models.Model]] | None = None
+) -> None:
+    """Forget the cached shared ids of users, of all item models by default."""
+    user_pks = list(user_pks)
+    generation = shared_ids_generation()
+    default_cache.delete_many(
+        [
+            shared_ids_cache_key(model, user_pk, generation)
+            for model in (item_models() if for_models is None else for_models)
+            for user_pk in user_pks
+        ]
+    )
+
+
+def invalidate_all_shared_object_ids() -> None:
+    """Forget the cached shared ids of all users, e.g. after raw imports."""
+    default_cache.set(SHARED_IDS_GENERATION_KEY, new_generation(), None)
+
+
+def group_member_pks(group_pk) -> list:
+    user_groups = get_user_model().groups.through
+    return list(
+        user_groups.objects.filter(group_id=group_pk).values_list("user_id", flat=True)
+    )
+
+
+def shared_user_pks(item) -> list:
+    """Return the users `item` is shared with, directly or through groups."""
+    return shared_user_pks_by_item([item.pk]).get(str(item.pk), [])
+
+
+def shared_user_pks_by_item(item_pks: Iterable) -> dict[str, list]:
+    """Return the users each item is shared with, by the string of its pk."""
+    from bubble.items.models import (  # noqa: PLC0415
+        ItemGroupObjectPermission,
+        ItemUserObjectPermission,
+    )
+
+    item_pks = list(item_pks)
+    object_pks = [str(pk) for pk in item_pks]
+    item_pk = Cast("content_object", models.CharField())
+    shares = (
+        ItemUserObjectPermission.objects.filter(content_object__in=item_pks)
+        .values_list(item_pk, "user")
+        .union(
+            UserObjectPermission.objects.filter(object_pk__in=object_pks).values_list(
+                "object_pk", "user"
+            ),
+            ItemGroupObjectPermission.objects.filter(
+                content_object__in=item_pks, group__user__isnull=False
+            ).values_list(item_pk, "group__user"),
+            GroupObjectPermission.objects.filter(
+                object_pk__in=object_pks, group__user__isnull=False
+            ).values_list("object_pk", "group__user"),
+        )
+    )
+    users = {}
+    for object_pk, user_pk in shares:
+        users.setdefault(object_pk, []).append(user_pk)
+    return users
+
+
+def users_with_change_permission(item) -> list:
+    """Return the owner and all users the item is shared with for changes."""
+    users = list(
+        get_users_with_perms(
+            item,
+            only_with_perms_in=[f"change_{item._meta.model_name}"],  # noqa: SLF001
+            with_group_users=False,
+        )
+    )
+    if item.user is not None and item.user not in users:
+        users.insert(0, item.user)
+    return users
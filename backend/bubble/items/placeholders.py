@@ -0,0 +1,26 @@
+"""Low quality image placeholders shown while an image loads."""
+
+import base64
+from io import BytesIO
+
+from PIL import Image as PILImage
+
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+
+
+def placeholder_data_uri(image: PILImage.Image, size: int = PLACEHOLDER_SIZE) -> str:
+    """
+    Render a tiny JPEG of the image as a data URI.
+
+    The longer side is scaled down to `size` pixels, which keeps the encoded
+    placeholder below a kilobyte. Clients show it blurred and stretched to the
+    image dimensions until the thumbnail has loaded.
+    """
+    small = image.convert("RGB")
+    small.thumbnail((size, size), PILImage.Resampling.BILINEAR)
+
+    buffer = BytesIO()
+    small.save(buffer, format="JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return f"data:image/jpeg;base64,{encoded}"
@@ -1,13 +1,39 @@
-"""Signals for automatic embedding generation."""
+"""Signals for embeddings, image storage, the catalogue and permission caching."""
 
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
+from guardian.models import GroupObjectPermission, UserObjectPermission
 
+from bubble.core import tracing
+from bubble.core.api import response_cache
+from bubble.items import permissions, storage, tasks
 from bubble.items.embeddings import generate_item_embedding
-from bubble.items.models import Item, ItemEmbedding
+from bubble.items.models import (
+    CatalogueEntry,
+    CategoryType,
+    Image,
+    Item,
+    ItemEmbedding,
+    ItemGroupObjectPermission,
+    ItemUserObjectPermission,
+    items_bulk_saved,
+    items_touched,
+)
 
 
 @receiver(post_save, sender=Item)
+@tracing.traced
 def update_item_embedding(sender, instance, created, **kwargs):
     """
     Automatically generate and update embeddings when an Item is saved.
@@ -51,3 +77,194 @@ def update_item_embedding(sender, instance, created, **kwargs):
             ItemEmbedding.objects.update_or_create(
                 item=instance, defaults={"vector": vector_embedding}
             )
+
+
+@receiver(items_bulk_saved, sender=Item)
+def update_bulk_item_embeddings(sender, items, created, update_fields, **kwargs):
+    """Generate embeddings of items saved in bulk in one task after the commit."""
+    if not created and not {"name", "description"} & set(update_fields):
+        return
+    item_ids = [str(item.pk) for item in items]
+    transaction.on_commit(partial(tasks.update_item_embeddings.delay, item_ids))
+
+
+def refresh_catalogue_on_commit(item_ids) -> None:
+    """Refresh the catalogue entries of items in a task after the commit."""
+    item_ids = [str(pk) for pk in item_ids]
+    if item_ids:
+        transaction.on_commit(partial(tasks.refresh_catalogue_entries.delay, item_ids))
+
+
+@receiver(post_save, sender=Item)
+def refresh_catalogue_entry(sender, instance, **kwargs):
+    """Keep the catalogue entry of an item current, see `CatalogueEntry`."""
+    if not kwargs.get("raw", False):
+        refresh_catalogue_on_commit([instance.pk])
+
+
+@receiver(items_bulk_saved, sender=Item)
+def refresh_bulk_catalogue_entries(sender, items, **kwargs):
+    refresh_catalogue_on_commit([item.pk for item in items])
+
+
+@receiver(items_touched, sender=Item)
+def refresh_touched_catalogue_entries(sender, item_ids, **kwargs):
+    refresh_catalogue_on_commit(item_ids)
+
+
+@receiver(post_save, sender=get_user_model())
+def refresh_catalogue_owner_name(sender, instance, created, **kwargs):
+    """Show the new name of a user on the catalogue entries of their items."""
+    update_fields = kwargs.get("update_fields")
+    if created or kwargs.get("raw", False):
+        return
+    if update_fields is not None and not {"name", "username"} & set(update_fields):
+        return
+    owner_name = instance.name or instance.username
+    CatalogueEntry.objects.filter(user=instance).exclude(owner_name=owner_name).update(
+        owner_name=owner_name
+    )
+
+
+def invalidate_item_responses(items, categories=()) -> None:
+    """
+    Retire cached responses showing or listing any of `items`.
+
+    Lists of `categories` are retired as well, they showed items that moved
+    to another category.
+    """
+    tags = {"items", *(f"items.category:{category}" for category in categories)}
+    for item in items:
+        tags.add(f"item:{item.pk}")
+        tags.add(f"items.category:{item.category}")
+    response_cache.invalidate(*tags)
+
+
+@receiver(pre_save, sender=Item)
+def remember_item_category(sender, instance, raw, update_fields, **kwargs):
+    """Keep the stored category to retire the lists of it after a change."""
+    if raw or instance._state.adding:  # noqa: SLF001
+        return
+    if update_fields is not None and "category" not in update_fields:
+        return
+    instance._stored_category = (  # noqa: SLF001
+        Item.objects.filter(pk=instance.pk).values_list("category", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_item_cached_responses(sender, instance, **kwargs):
+    stored = getattr(instance, "_stored_category", None)
+    invalidate_item_responses([instance], [stored] if stored is not None else [])
+
+
+@receiver(items_bulk_saved, sender=Item)
+def invalidate_bulk_item_cached_responses(
+    sender, items, created, update_fields, **kwargs
+):
+    # The previous categories are unknown, retire the lists of all of them
+    moved = not created and "category" in update_fields
+    invalidate_item_responses(items, ["", *CategoryType.values] if moved else [])
+
+
+@receiver(items_touched, sender=Item)
+def invalidate_touched_item_cached_responses(sender, item_ids, **kwargs):
+    """Related rows like images changed, the categories stay the same."""
+    response_cache.invalidate("items", *(f"item:{pk}" for pk in item_ids))
+
+
+@receiver(post_delete, sender=Image)
+def release_image_original(sender, instance, **kwargs):
+    """Garbage collect shared originals once their last image is deleted."""
+    name = instance.original.name
+    if storage.is_content_addressed(name):
+        transaction.on_commit(partial(storage.release_original, name, instance.sha256))
+
+
+def invalidate_now_and_on_commit(function, *args):
+    """
+    Invalidate cached permissions right away and again after the commit.
+
+    The second call drops entries other requests cached from the state
+    before the transaction was committed.
+    """
+    function(*args)
+    transaction.on_commit(partial(function, *args))
+
+
+def permission_model(instance):
+    """Return the item model of a generic guardian permission row, if any."""
+    model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+    if model is not None and issubclass(model, Item):
+        return model
+    return None
+
+
+@receiver(post_save, sender=ItemUserObjectPermission)
+@receiver(post_delete, sender=ItemUserObjectPermission)
+def invalidate_item_user_permissions(sender, instance, **kwargs):
+    invalidate_now_and_on_commit(
+        permissions.invalidate_shared_object_ids, [instance.user_id], [Item]
+    )
+
+
+@receiver(post_save, sender=UserObjectPermission)
+@receiver(post_delete, sender=UserObjectPermission)
+def invalidate_generic_user_permissions(sender, instance, **kwargs):
+    model = permission_model(instance)
+    if model is not None:
+        invalidate_now_and_on_commit(
+            permissions.invalidate_shared_object_ids, [instance.user_id], [model]
+        )
+
+
+@receiver(post_save, sender=ItemGroupObjectPermission)
+@receiver(post_delete, sender=ItemGroupObjectPermission)
+def invalidate_item_group_permissions(sender, instance, **kwargs):
+    invalidate_now_and_on_commit(
+        permissions.invalidate_shared_object_ids,
+        permissions.group_member_pks(instance.group_id),
+        [Item],
+    )
+
+
+@receiver(post_save, sender=GroupObjectPermission)
+@receiver(post_delete, sender=GroupObjectPermission)
+def invalidate_generic_group_permissions(sender, instance, **kwargs):
+    model = permission_model(instance)
+    if model is not None:
+        invalidate_now_and_on_commit(
+            permissions.invalidate_shared_object_ids,
+            permissions.group_member_pks(instance.group_id),
+            [model],
+        )
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def invalidate_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """Forget the shared ids of the users joining or leaving groups."""
+    if not reverse:
+        # The groups of a user changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_now_and_on_commit(
+                permissions.invalidate_shared_object_ids, [instance.pk]
+            )
+    elif action in ("post_add", "post_remove"):
+        invalidate_now_and_on_commit(permissions.invalidate_shared_object_ids, pk_set)
+    elif action == "pre_clear":
+        # The members are unknown after clearing the group
+        invalidate_now_and_on_commit(
+            permissions.invalidate_shared_object_ids,
+            permissions.group_member_pks(instance.pk),
+        )
+
+
+@receiver(pre_delete, sender=Item)
+def invalidate_deleted_item_shares(sender, instance, **kwargs):
+    """Forget the shared ids of users the item was shared with."""
+    user_pks = permissions.shared_user_pks(instance)
+    if user_pks:
+        transaction.on_commit(
+            partial(permissions.invalidate_shared_object_ids, user_pks)
+        )
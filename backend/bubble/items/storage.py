@@ -0,0 +1,132 @@
+"""Content-addressed storage for original item images.
+
+When ``ITEM_IMAGES_CONTENT_ADDRESSED`` is enabled, originals are stored under
+a path derived from the SHA-256 of their bytes. Images with identical content
+share one file, and the imagekit derivatives that are named after it. The
+number of ``Image`` rows pointing at a file is its reference count; the file
+and its derivatives are removed once the last row is deleted.
+"""
+
+import logging
+import posixpath
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from imagekit.utils import suggest_extension
+
+logger = logging.getLogger(__name__)
+
+CONTENT_ADDRESSED_PREFIX = "items/sha256"
+
+
+def is_enabled() -> bool:
+    return settings.ITEM_IMAGES_CONTENT_ADDRESSED
+
+
+def content_addressed_name(sha256: str, filename: str) -> str:
+    """Return the storage path for an original with the given digest."""
+    extension = Path(filename).suffix.lower() or ".jpg"
+    return (
+        f"{CONTENT_ADDRESSED_PREFIX}/{sha256[0:2]}/{sha256[2:4]}/"
+        f"{sha256}/original{extension}"
+    )
+
+
+def cachefile_name(generator) -> str:
+    """
+    Name imagekit derivatives `<IMAGEKIT_CACHEFILE_DIR>/<source name>/<hash><ext>`.
+
+    Unlike imagekit's `source_name_as_path` the source keeps its extension,
+    so the media garbage collector finds the original by its exact name.
+    """
+    source_name = getattr(generator.source, "name", None) or ""
+    extension = suggest_extension(source_name, generator.format)
+    return posixpath.join(
+        settings.IMAGEKIT_CACHEFILE_DIR,
+        source_name,
+        f"{generator.get_hash()}{extension}",
+    )
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(name) and name.startswith(f"{CONTENT_ADDRESSED_PREFIX}/")
+
+
+def lock_content(*digests: str) -> None:
+    """
+    Serialize linking and releasing of digests until the transaction ends.
+
+    Prevents a file from being garbage collected while a concurrent upload
+    of the same content is linking to it.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtextextended(digest, 0)) "
+            "FROM unnest(%s::text[]) AS digest ORDER BY digest",
+            [sorted(set(digests))],
+        )
+
+
+def link_stored_originals(images) -> None:
+    """
+    Point new images at already stored originals with the same content.
+
+    Images sharing content within `images` are linked to the first of them,
+    whose file is stored right away. Costs two queries for any number of
+    images.
+    """
+    from bubble.items.models import Image  # noqa: PLC0415
+
+    images = [image for image in images if image.sha256]
+    if not images:
+        return
+
+    lock_content(*(image.sha256 for image in images))
+
+    stored = dict(
+        Image.objects.filter(
+            sha256__in={image.sha256 for image in images},
+            original__startswith=f"{CONTENT_ADDRESSED_PREFIX}/",
+        )
+        .exclude(pk__in=[image.pk for image in images])
+        .values_list("sha256", "original")
+    )
+
+    for image in images:
+        name = stored.get(image.sha256)
+        if name is None:
+            candidate = content_addressed_name(image.sha256, image.original.name)
+            if image.original.storage.exists(candidate):
+                name = candidate
+
+        if name is not None:
+            # Assigning the name marks the file as committed, so it is not
+            # uploaded again
+            image.original = name
+        else:
+            image.original.save(image.original.name, image.original.file, save=False)
+            stored[image.sha256] = image.original.name
+
+
+def release_original(name: str, sha256: str) -> bool:
+    """
+    Delete a content-addressed original once no image references it.
+
+    Returns whether it was deleted, i.e. not linked by an image meanwhile.
+    """
+    from bubble.items.models import Image  # noqa: PLC0415
+
+    with transaction.atomic():
+        lock_content(sha256)
+        if Image.objects.filter(original=name).exists():
+            return False
+
+        orphan = Image(original=name)
+        for derivative in (orphan.thumbnail, orphan.preview):
+            if derivative.storage.exists(derivative.name):
+                derivative.storage.delete(derivative.name)
+        orphan.original.storage.delete(name)
+
+    logger.info("Released content-addressed image %s", name)
+    return True
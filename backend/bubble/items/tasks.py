@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from celery import shared_task
+
+from bubble.items.embeddings import generate_item_embedding
+from bubble.items.models import CatalogueEntry, Item, ItemEmbedding
+
+
+@shared_task(bind=True)
+def update_item_embeddings(self, item_ids: list[str]) -> int:
+    """Generate the embeddings of many items and store them with one query.
+
+    Runs after items were created or updated in bulk, see
+    `ItemQuerySet.bulk_create_items`.
+    """
+    embeddings = []
+    for item in Item.objects.filter(pk__in=item_ids).only("id", "name", "description"):
+        vector = generate_item_embedding(item)
+        if vector is not None:
+            embeddings.append(ItemEmbedding(item=item, vector=vector))
+
+    ItemEmbedding.objects.bulk_create(
+        embeddings,
+        update_conflicts=True,
+        unique_fields=["item"],
+        update_fields=["vector"],
+    )
+    return len(embeddings)
+
+
+@shared_task
+def refresh_catalogue_entries(item_ids: list[str]) -> int:
+    """Bring the catalogue entries of items in line after they were saved.
+
+    Scheduled after the commit by the signals of items and images, so the
+    entries and their images are not built while the request runs.
+    """
+    return CatalogueEntry.objects.refresh(item_ids)
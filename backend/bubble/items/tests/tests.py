@@ -2,22 +2,49 @@
 
 # mypy: ignore-errors
 
+import base64
+import json
+import uuid
+from datetime import timedelta
 from decimal import Decimal
 from io import BytesIO
 from unittest.mock import patch
 
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from djmoney.money import Money
+from guardian.shortcuts import assign_perm, remove_perm
 from PIL import Image as PILImage
-from rest_framework import status
+from rest_framework import serializers, status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.test import APIClient
 
+from bubble.books.models import Author, Book
+from bubble.core import metrics
+from bubble.core.api import response_cache
 from bubble.core.permissions_config import DefaultGroup
+from bubble.items import permissions, storage
 from bubble.items.ai.image_analyze import ItemImageResult
-from bubble.items.models import Image, Item, ItemStatus
+from bubble.items.api.serializers import ItemListSerializer, ItemMinimalSerializer
+from bubble.items.api.views import ItemViewSet
+from bubble.items.hashing import hamming_distance
+from bubble.items.models import (
+    CatalogueEntry,
+    CategoryType,
+    Image,
+    Item,
+    ItemStatus,
+    ItemUserObjectPermission,
+)
 from bubble.items.tests.factories import ItemOwnerUserFactory
+from bubble.items.tests.utils import ListQueriesMixin, create_image
 from bubble.users.tests.factories import UserFactory
 
 TEST_PASSWORD = "testpass123"  # noqa: S105
@@ -876,3 +903,1182 @@ class AIDescribeItemTestCase(TestCase):
 
         # Verify analyze_image was not called
         mock_analyze_image.assert_not_called()
+
+
+class ImageDuplicateDetectionTestCase(TestCase):
+    """Test perceptual hash based duplicate detection on upload."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory(
+            username="hashowner", email="hash@example.com", password=TEST_PASSWORD
+        )
+        self.item = Item.objects.create(name="Drill", user=self.owner)
+        self.other_item = Item.objects.create(name="Drill copy", user=self.owner)
+
+    def create_test_image(self, box=(10, 10, 60, 60), size=(100, 100)):
+        """Create a JPEG with a dark box at the given position."""
+        img = PILImage.new("RGB", (100, 100), color="white")
+        img.paste((20, 20, 20), box)
+        img = img.resize(size)
+        img_io = BytesIO()
+        img.save(img_io, format="JPEG")
+        return SimpleUploadedFile(
+            "test_image.jpg", img_io.getvalue(), content_type="image/jpeg"
+        )
+
+    def test_phash_is_computed_on_save(self):
+        image = Image.objects.create(item=self.item, original=self.create_test_image())
+        assert image.phash is not None
+
+    def test_resized_copy_has_small_distance(self):
+        first = Image.objects.create(item=self.item, original=self.create_test_image())
+        resized = Image.objects.create(
+            item=self.item, original=self.create_test_image(size=(250, 250))
+        )
+        different = Image.objects.create(
+            item=self.item, original=self.create_test_image(box=(50, 0, 100, 40))
+        )
+
+        assert hamming_distance(first.phash, resized.phash) <= (
+            settings.ITEM_IMAGE_DUPLICATE_DISTANCE
+        )
+        assert hamming_distance(first.phash, different.phash) > (
+            settings.ITEM_IMAGE_DUPLICATE_DISTANCE
+        )
+
+    def test_upload_flags_duplicates_across_catalogue(self):
+        existing = Image.objects.create(
+            item=self.other_item, original=self.create_test_image()
+        )
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.post(
+            reverse("api:image-list"),
+            {"item": str(self.item.id), "original": self.create_test_image()},
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        duplicates = response.data["duplicates"]
+        assert [d["id"] for d in duplicates] == [str(existing.id)]
+        assert duplicates[0]["item"] == str(self.other_item.id)
+
+    def test_upload_ignores_other_users_images(self):
+        stranger = ItemOwnerUserFactory()
+        stranger_item = Item.objects.create(name="Other drill", user=stranger)
+        Image.objects.create(item=stranger_item, original=self.create_test_image())
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.post(
+            reverse("api:image-list"),
+            {"item": str(self.item.id), "original": self.create_test_image()},
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["duplicates"] == []
+
+
+@override_settings(ITEM_IMAGES_CONTENT_ADDRESSED=True)
+class ContentAddressedImageStorageTestCase(TestCase):
+    """Test deduplicated storage of identical original images."""
+
+    def setUp(self):
+        self.owner = ItemOwnerUserFactory()
+        self.item = Item.objects.create(name="Lamp", user=self.owner)
+        self.other_item = Item.objects.create(name="Lamp", user=self.owner)
+
+    def create_test_image(self, color="red"):
+        img = PILImage.new("RGB", (40, 40), color=color)
+        img_io = BytesIO()
+        img.save(img_io, format="JPEG")
+        return SimpleUploadedFile(
+            "upload.jpg", img_io.getvalue(), content_type="image/jpeg"
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first = Image.objects.create(item=self.item, original=self.create_test_image())
+        second = Image.objects.create(
+            item=self.other_item, original=self.create_test_image()
+        )
+
+        assert first.sha256 == second.sha256
+        assert first.original.name == second.original.name
+        assert storage.is_content_addressed(first.original.name)
+        assert first.thumbnail.name == second.thumbnail.name
+
+    def test_different_uploads_use_different_files(self):
+        first = Image.objects.create(item=self.item, original=self.create_test_image())
+        second = Image.objects.create(
+            item=self.item, original=self.create_test_image(color="blue")
+        )
+
+        assert first.original.name != second.original.name
+
+    def test_file_is_released_with_last_reference(self):
+        first = Image.objects.create(item=self.item, original=self.create_test_image())
+        second = Image.objects.create(
+            item=self.other_item, original=self.create_test_image()
+        )
+        name = first.original.name
+        file_storage = first.original.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        assert file_storage.exists(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        assert not file_storage.exists(name)
+
+
+class ItemBulkImagesAPITestCase(TestCase):
+    """Test bulk upload, reorder and delete of item images."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.item = Item.objects.create(name="Bike", user=self.owner)
+        self.url = reverse("api:item-images", kwargs={"id": self.item.id})
+        self.client.force_authenticate(user=self.owner)
+
+    def create_test_image(self, color="red"):
+        img = PILImage.new("RGB", (40, 40), color=color)
+        img_io = BytesIO()
+        img.save(img_io, format="JPEG")
+        return SimpleUploadedFile(
+            "upload.jpg", img_io.getvalue(), content_type="image/jpeg"
+        )
+
+    def create_images(self, count):
+        return [
+            Image.objects.create(
+                item=self.item, original=self.create_test_image(), ordering=index
+            )
+            for index in range(count)
+        ]
+
+    def upload(self, count):
+        files = [self.create_test_image() for _ in range(count)]
+        return self.client.post(self.url, {"original": files}, format="multipart")
+
+    def test_upload_multiple_images(self):
+        self.create_images(1)
+
+        response = self.upload(3)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 3  # noqa: PLR2004
+        orderings = list(
+            self.item.images.order_by("ordering").values_list("ordering", flat=True)
+        )
+        assert orderings == [0, 1, 2, 3]
+
+    def test_upload_queries_are_constant(self):
+        self.upload(1)  # Warm up the permission caches of the owner
+        with CaptureQueriesContext(connection) as two:
+            self.upload(2)
+        with CaptureQueriesContext(connection) as five:
+            self.upload(5)
+
+        assert len(two) == len(five)
+
+    def test_upload_by_non_owner_fails(self):
+        self.client.force_authenticate(user=ItemOwnerUserFactory())
+
+        response = self.upload(1)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not self.item.images.exists()
+
+    def test_reorder_images_with_single_update(self):
+        images = self.create_images(3)
+        new_order = [str(images[2].id), str(images[0].id), str(images[1].id)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                self.url, {"image_order": new_order}, format="json"
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        ordered = self.item.images.order_by("ordering").values_list("id", flat=True)
+        assert [str(image_id) for image_id in ordered] == new_order
+        updates = [q for q in queries if q["sql"].startswith('UPDATE "items_image"')]
+        assert len(updates) == 1
+
+    def test_reorder_images_action(self):
+        images = self.create_images(2)
+        url = reverse("api:item-reorder-images", kwargs={"id": self.item.id})
+
+        response = self.client.put(
+            url,
+            {"image_order": [str(images[1].id), str(images[0].id)]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        images[1].refresh_from_db()
+        assert images[1].ordering == 0
+
+    def test_reorder_rejects_foreign_images(self):
+        images = self.create_images(1)
+        other_item = Item.objects.create(name="Other", user=self.owner)
+        foreign = Image.objects.create(
+            item=other_item, original=self.create_test_image()
+        )
+
+        response = self.client.put(
+            self.url,
+            {"image_order": [str(foreign.id), str(images[0].id)]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_bulk_delete_images(self):
+        images = self.create_images(4)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                self.url,
+                {"ids": [str(images[0].id), str(images[1].id)]},
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["deleted"] == 2  # noqa: PLR2004
+        assert list(self.item.images.all()) == images[2:]
+        deletes = [
+            q for q in queries if q["sql"].startswith('DELETE FROM "items_image"')
+        ]
+        assert len(deletes) == 1
+
+
+class ImagePlaceholderTestCase(TestCase):
+    """Test dimensions and placeholders computed on upload."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.item = Item.objects.create(name="Tent", user=self.owner)
+        self.client.force_authenticate(user=self.owner)
+
+    def create_test_image(self, size=(120, 80)):
+        img = PILImage.new("RGB", size, color="green")
+        img_io = BytesIO()
+        img.save(img_io, format="JPEG")
+        return SimpleUploadedFile(
+            "tent.jpg", img_io.getvalue(), content_type="image/jpeg"
+        )
+
+    def test_dimensions_and_placeholder_are_computed(self):
+        image = Image.objects.create(item=self.item, original=self.create_test_image())
+
+        assert (image.width, image.height) == (120, 80)
+        assert image.placeholder.startswith("data:image/jpeg;base64,")
+        assert len(image.placeholder) < 1024  # noqa: PLR2004
+
+    def test_item_list_includes_first_image_details(self):
+        Image.objects.create(
+            item=self.item, original=self.create_test_image((60, 90)), ordering=1
+        )
+        first = Image.objects.create(
+            item=self.item, original=self.create_test_image(), ordering=0
+        )
+        Item.objects.create(name="No images", user=self.owner)
+
+        response = self.client.get(reverse("api:item-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        details = {
+            result["name"]: result["first_image_details"]
+            for result in response.data["results"]
+        }
+        assert details["Tent"] == {
+            "width": 120,
+            "height": 80,
+            "placeholder": first.placeholder,
+        }
+        assert details["No images"] is None
+
+
+class ItemListQueryCountTestCase(ListQueriesMixin, TestCase):
+    """Test that item lists resolve first images in a constant number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+
+    def create_items(self, count):
+        for index in range(count):
+            item = Item.objects.create(
+                name=f"Item {index}", user=self.owner, status=ItemStatus.AVAILABLE
+            )
+            for ordering in (1, 0):
+                create_image(item, ordering)
+
+    def test_item_list(self):
+        self.assert_constant_queries(reverse("api:item-list"), self.create_items)
+
+    def test_public_item_list(self):
+        self.assert_constant_queries(reverse("api:public-item-list"), self.create_items)
+
+    def test_first_image_respects_ordering(self):
+        self.create_items(1)
+        item = Item.objects.with_first_image().get()
+
+        with self.assertNumQueries(0):
+            first_image = item.get_first_image()
+
+        assert first_image.ordering == 0
+
+
+class ItemCursorPaginationTestCase(TestCase):
+    """Test opt-in keyset pagination of item lists."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+        self.items = [
+            Item.objects.create(name=f"Item {index}", user=self.owner)
+            for index in range(5)
+        ]
+
+    def test_cursor_pages_cover_all_items_once(self):
+        url = reverse("api:item-list") + "?pagination=cursor&page_size=2"
+        names = []
+        while url:
+            response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data["count"] is None
+            names += [result["name"] for result in response.data["results"]]
+            url = response.data["next"]
+
+        assert names == [item.name for item in reversed(self.items)]
+
+    def test_cursor_count_is_optional(self):
+        response = self.client.get(
+            reverse("api:item-list") + "?pagination=cursor&count=true"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == len(self.items)
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse("api:item-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == len(self.items)
+        assert "previous" in response.data
+
+
+class ItemSaveTestCase(TestCase):
+    """Test slug allocation and permission assignment in Item.save."""
+
+    def setUp(self):
+        self.owner = ItemOwnerUserFactory()
+
+    def create_item(self, name="Bohrmaschine"):
+        return Item.objects.create(name=name, user=self.owner)
+
+    def test_slugs_are_unique(self):
+        items = [self.create_item() for _ in range(3)]
+
+        assert items[0].slug == "bohrmaschine"
+        assert len({item.slug for item in items}) == len(items)
+        assert all(item.slug.startswith("bohrmaschine") for item in items[1:])
+
+    def test_book_with_taken_slug(self):
+        item = self.create_item(name="Momo")
+
+        book = Book.objects.create(name="Momo", user=self.owner)
+
+        assert book.slug != item.slug
+        assert book.slug == f"momo-{book.id.hex[:8]}"
+
+    def test_item_without_name_gets_slug(self):
+        first = self.create_item(name="")
+        second = self.create_item(name="")
+
+        assert first.slug
+        assert first.slug != second.slug
+
+    def test_create_queries_do_not_grow_with_duplicate_names(self):
+        self.create_item()
+        with CaptureQueriesContext(connection) as first:
+            self.create_item()
+        for _ in range(5):
+            self.create_item()
+        with CaptureQueriesContext(connection) as later:
+            self.create_item()
+
+        assert len(first) == len(later)
+
+    def test_update_does_not_assign_permissions(self):
+        item = self.create_item()
+        item.status = ItemStatus.RENTED
+
+        with CaptureQueriesContext(connection) as queries:
+            item.save(update_fields=["status"])
+
+        assert not [q for q in queries if "guardian" in q["sql"]]
+        assert not [q for q in queries if "objectpermission" in q["sql"]]
+        assert self.owner.has_perm("items.change_item", item)
+
+
+class OwnerPermissionTestCase(TestCase):
+    """Test implicit owner permissions and explicit sharing."""
+
+    def setUp(self):
+        self.owner = ItemOwnerUserFactory()
+        self.other = ItemOwnerUserFactory()
+        self.item = Item.objects.create(name="Ladder", user=self.owner)
+
+    def test_owner_has_permissions_without_rows(self):
+        assert not ItemUserObjectPermission.objects.exists()
+        assert self.owner.has_perm("items.change_item", self.item)
+        assert self.owner.has_perm("delete_item", self.item)
+        assert not self.other.has_perm("items.change_item", self.item)
+
+    def test_get_for_user_includes_owned_and_shared_items(self):
+        shared = Item.objects.create(name="Saw", user=self.other)
+        Item.objects.create(name="Private", user=self.other)
+        assign_perm("items.change_item", self.owner, shared)
+
+        items = set(Item.objects.get_for_user(self.owner))
+
+        assert items == {self.item, shared}
+        assert self.owner.has_perm("items.change_item", shared)
+
+    def test_owner_can_update_item(self):
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+
+        response = client.patch(
+            reverse("api:item-detail", kwargs={"id": self.item.id}),
+            {"name": "Long ladder"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        self.item.refresh_from_db()
+        assert self.item.name == "Long ladder"
+
+
+class SharedItemCacheTestCase(TestCase):
+    """Test caching and invalidation of the items shared with a user."""
+
+    def setUp(self):
+        self.user = ItemOwnerUserFactory()
+        self.other = ItemOwnerUserFactory()
+        self.item = Item.objects.create(name="Canoe", user=self.other)
+
+    def test_shared_ids_are_cached(self):
+        permissions.shared_object_ids(self.user, Item)
+
+        with self.assertNumQueries(0):
+            assert permissions.shared_object_ids(self.user, Item) == []
+
+    def test_grant_and_revoke_invalidate_cache(self):
+        assert self.item not in Item.objects.get_for_user(self.user)
+
+        assign_perm("items.change_item", self.user, self.item)
+        assert self.item in Item.objects.get_for_user(self.user)
+
+        remove_perm("items.change_item", self.user, self.item)
+        assert self.item not in Item.objects.get_for_user(self.user)
+
+    def test_group_share_invalidates_cache(self):
+        group = Group.objects.create(name="Paddlers")
+        assign_perm("items.change_item", group, self.item)
+        assert self.item not in Item.objects.get_for_user(self.user)
+
+        self.user.groups.add(group)
+
+        assert self.item in Item.objects.get_for_user(self.user)
+
+    def test_group_membership_keeps_cache_of_other_users(self):
+        permissions.shared_object_ids(self.other, Item)
+
+        self.user.groups.add(Group.objects.create(name="Paddlers"))
+
+        with self.assertNumQueries(0):
+            permissions.shared_object_ids(self.other, Item)
+
+    def test_group_members_leaving_invalidates_cache(self):
+        group = Group.objects.create(name="Paddlers")
+        assign_perm("items.change_item", group, self.item)
+        group.user_set.add(self.user)
+        assert self.item in Item.objects.get_for_user(self.user)
+
+        group.user_set.clear()
+
+        assert self.item not in Item.objects.get_for_user(self.user)
+
+    def test_delete_invalidates_cache(self):
+        # Generic permission rows of books are not deleted with them
+        book = Book.objects.create(name="Momo", user=self.other)
+        assign_perm("books.change_book", self.user, book)
+        assert permissions.shared_object_ids(self.user, Book) == [book.pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+
+        assert permissions.shared_object_ids(self.user, Book) == []
+
+    def test_ids_are_packed_sorted(self):
+        ids = [uuid.uuid4() for _ in range(3)]
+
+        assert permissions.unpack_ids(permissions.pack_ids(ids)) == sorted(ids)
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test ETag and Last-Modified handling of item endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+        self.item = Item.objects.create(name="Kayak", user=self.owner)
+        self.list_url = reverse("api:item-list")
+        self.detail_url = reverse("api:item-detail", kwargs={"id": self.item.id})
+
+    def create_test_image(self):
+        img_io = BytesIO()
+        PILImage.new("RGB", (20, 20)).save(img_io, format="JPEG")
+        return SimpleUploadedFile("kayak.jpg", img_io.getvalue())
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.list_url)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not [q for q in queries if "items_image" in q["sql"]]
+
+    def test_changes_invalidate_list_etag(self):
+        etag = self.client.get(self.list_url)["ETag"]
+
+        self.item.name = "Sea kayak"
+        self.item.save()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_deleted_item_invalidates_list_etag(self):
+        other = Item.objects.create(name="Paddle", user=self.owner)
+        etag = self.client.get(self.list_url)["ETag"]
+
+        other.delete()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_new_image_invalidates_detail(self):
+        response = self.client.get(self.detail_url)
+        etag = response["ETag"]
+        assert response["Last-Modified"]
+
+        Image.objects.create(item=self.item, original=self.create_test_image())
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["images"]) == 1
+
+    def test_detail_validators_come_from_the_object(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not [q for q in queries if "MAX(" in q["sql"]]
+
+    def test_not_modified_checks_object_permissions(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        with patch.object(
+            ItemViewSet, "check_object_permissions", side_effect=PermissionDenied
+        ):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_renamed_author_invalidates_book_etag(self):
+        book = Book.objects.create(name="Momo", user=self.owner)
+        author = Author.objects.create(name="M. Ende")
+        book.authors.add(author)
+        url = reverse("api:book-detail", kwargs={"id": book.id})
+        etag = self.client.get(url)["ETag"]
+
+        author.name = "Michael Ende"
+        author.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["authors"][0]["name"] == "Michael Ende"
+
+    def test_etag_depends_on_user(self):
+        self.item.status = ItemStatus.AVAILABLE
+        self.item.save()
+        url = reverse("api:public-item-detail", kwargs={"id": self.item.id})
+        etag = self.client.get(url)["ETag"]
+
+        self.client.force_authenticate(user=ItemOwnerUserFactory())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+class CompiledReadTestCase(TestCase):
+    """Test that compiled list serializers match DRF's generic output."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+
+    def test_list_matches_generic_serializer(self):
+        item = Item.objects.create(
+            name="Kayak",
+            description="Two seats",
+            user=self.owner,
+            rental_price=Money("12.50", "EUR"),
+            status=ItemStatus.AVAILABLE,
+        )
+        img_io = BytesIO()
+        PILImage.new("RGB", (20, 20)).save(img_io, format="JPEG")
+        Image.objects.create(
+            item=item, original=SimpleUploadedFile("kayak.jpg", img_io.getvalue())
+        )
+
+        response = self.client.get(reverse("api:item-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        item = Item.objects.with_first_image().get(pk=item.pk)
+        for serializer_class in (ItemListSerializer, ItemMinimalSerializer):
+            serializer = serializer_class(context={"request": response.wsgi_request})
+            assert serializer.to_representation(item) == (
+                serializers.Serializer.to_representation(serializer, item)
+            )
+        serializer = ItemListSerializer(context={"request": response.wsgi_request})
+        assert response.data["results"] == [
+            serializers.Serializer.to_representation(serializer, item)
+        ]
+
+
+class SparseFieldsTestCase(TestCase):
+    """Test the fields and expand query parameters of item endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+        self.item = Item.objects.create(
+            name="Kayak", description="Two seats", user=self.owner
+        )
+        img_io = BytesIO()
+        PILImage.new("RGB", (20, 20)).save(img_io, format="JPEG")
+        self.image = Image.objects.create(
+            item=self.item,
+            original=SimpleUploadedFile("kayak.jpg", img_io.getvalue()),
+        )
+        self.detail_url = reverse("api:item-detail", kwargs={"id": self.item.id})
+
+    def test_list_only_requested_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("api:item-list"), {"fields": "id,name"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [{"id": str(self.item.id), "name": "Kayak"}]
+        assert not [q for q in queries if "items_image" in q["sql"]]
+        assert not [q for q in queries if '"items_item"."description"' in q["sql"]]
+
+    def test_unknown_field(self):
+        response = self.client.get(self.detail_url, {"fields": "id,secret"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "fields" in response.data
+
+    def test_collapsed_images(self):
+        response = self.client.get(self.detail_url, {"expand": ""})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["images"] == [self.image.id]
+        assert response.data["first_image"]
+
+    def test_expanded_images(self):
+        response = self.client.get(
+            self.detail_url, {"fields": "id,images", "expand": "images"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["images"][0]["id"] == str(self.image.id)
+
+    def test_writes_ignore_fields(self):
+        response = self.client.patch(
+            f"{self.detail_url}?fields=id",
+            {"description": "Three seats"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["description"] == "Three seats"
+        self.item.refresh_from_db()
+        assert self.item.description == "Three seats"
+
+
+class ItemBulkAPITestCase(TestCase):
+    """Test creating and updating many items in one request."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+        self.url = reverse("api:item-bulk")
+
+    def create(self, entries):
+        return self.client.post(self.url, entries, format="json")
+
+    def test_create_items(self):
+        response = self.create(
+            [
+                {"name": "Kayak", "rental_price": "12.00"},
+                {"name": "Kayak"},
+                {"name": "Momo", "category": CategoryType.BOOKS},
+            ]
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED, response.content
+        assert [item["name"] for item in response.data] == ["Kayak", "Kayak", "Momo"]
+        items = Item.objects.filter(user=self.owner)
+        assert items.count() == 3  # noqa: PLR2004
+        slugs = set(items.values_list("slug", flat=True))
+        assert len(slugs) == 3  # noqa: PLR2004
+        assert "kayak" in slugs
+        assert Item.history.filter(id__in=items).count() == 3  # noqa: PLR2004
+        assert Book.objects.filter(name="Momo", user=self.owner).exists()
+        assert Book.history.filter(name="Momo").count() == 1
+
+    def test_create_in_constant_queries(self):
+        def count_queries(count):
+            entries = [{"name": f"Item {index}"} for index in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.create(entries)
+            assert response.status_code == status.HTTP_201_CREATED
+            return len(queries)
+
+        count_queries(1)  # Warm up the permission cache of the user
+        assert count_queries(2) == count_queries(10)
+
+    def test_embeddings_scheduled_once(self):
+        with (
+            patch("bubble.items.tasks.update_item_embeddings.delay") as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.create([{"name": "Kayak"}, {"name": "Paddle"}])
+
+        assert response.status_code == status.HTTP_201_CREATED
+        delay.assert_called_once()
+        assert set(delay.call_args.args[0]) == {item["id"] for item in response.data}
+
+    @override_settings(ITEMS_BULK_MAX=2)
+    def test_create_too_many(self):
+        response = self.create([{"name": "A"}, {"name": "B"}, {"name": "C"}])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Item.objects.filter(user=self.owner).exists()
+
+    def test_update_items(self):
+        kayak = Item.objects.create(name="Kayak", user=self.owner)
+        paddle = Item.objects.create(name="Paddle", user=self.owner)
+
+        response = self.client.patch(
+            self.url,
+            [
+                {"id": str(kayak.id), "name": "Sea kayak"},
+                {"id": str(paddle.id), "sale_price": "5.00"},
+            ],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK, response.content
+        kayak.refresh_from_db()
+        paddle.refresh_from_db()
+        assert kayak.name == "Sea kayak"
+        assert kayak.slug == "kayak"
+        assert paddle.sale_price == Money("5.00", "EUR")
+        assert paddle.name == "Paddle"
+        assert kayak.history.count() == 2  # noqa: PLR2004
+
+    def test_update_requires_permission(self):
+        other = Item.objects.create(name="Canoe", user=ItemOwnerUserFactory())
+
+        response = self.client.patch(
+            self.url, [{"id": str(other.id), "name": "Mine"}], format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        other.refresh_from_db()
+        assert other.name == "Canoe"
+
+    def test_update_to_books_category(self):
+        item = Item.objects.create(name="Momo", user=self.owner)
+
+        response = self.client.patch(
+            self.url,
+            [{"id": str(item.id), "category": CategoryType.BOOKS}],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Book.objects.filter(pk=item.pk).exists()
+
+
+class CatalogueTestCase(TestCase):
+    """Test the denormalized public catalogue and its endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory(name="Kim")
+        # Entries are refreshed in a task after the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item = Item.objects.create(
+                name="Red bike",
+                description="Fast city bike",
+                user=self.owner,
+                status=ItemStatus.AVAILABLE,
+                sale_price=Money("50.00", "EUR"),
+            )
+        self.url = reverse("api:catalogue-list")
+
+    def test_entry_follows_item(self):
+        entry = CatalogueEntry.objects.get(pk=self.item.pk)
+        assert entry.name == "Red bike"
+        assert entry.owner_name == "Kim"
+        assert entry.sale_price == Money("50.00", "EUR")
+
+        self.item.name = "Blue bike"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        entry.refresh_from_db()
+        assert entry.name == "Blue bike"
+
+        self.item.status = ItemStatus.DRAFT
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        assert not CatalogueEntry.objects.filter(pk=self.item.pk).exists()
+
+    def test_entry_follows_images_and_owner(self):
+        img_io = BytesIO()
+        PILImage.new("RGB", (20, 10)).save(img_io, format="JPEG")
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(
+                item=self.item,
+                original=SimpleUploadedFile("bike.jpg", img_io.getvalue()),
+            )
+        self.owner.name = "Kim K."
+        self.owner.save()
+
+        entry = CatalogueEntry.objects.get(pk=self.item.pk)
+        assert entry.thumbnail_source == image.original.name
+        assert entry.image_width == 20  # noqa: PLR2004
+        assert entry.owner_name == "Kim K."
+
+        response = self.client.get(self.url)
+        assert response.data["results"][0]["first_image"].endswith(image.thumbnail.url)
+
+    def test_entry_is_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.item.name = "Blue bike"
+            self.item.save()
+
+        assert CatalogueEntry.objects.get(pk=self.item.pk).name == "Red bike"
+        callbacks[0]()
+        assert CatalogueEntry.objects.get(pk=self.item.pk).name == "Blue bike"
+
+    def test_internal_and_inactive_items_are_not_listed(self):
+        self.item.internal = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        assert not CatalogueEntry.objects.filter(pk=self.item.pk).exists()
+
+        self.item.internal = False
+        self.item.active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        assert not CatalogueEntry.objects.filter(pk=self.item.pk).exists()
+        assert CatalogueEntry.objects.rebuild() == 0
+
+    def test_entries_of_bulk_saved_items(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            items = Item.objects.bulk_create_items(
+                [
+                    Item(name="Tent", user=self.owner, status=ItemStatus.AVAILABLE),
+                    Item(name="Stove", user=self.owner),
+                ]
+            )
+
+        assert CatalogueEntry.objects.filter(pk=items[0].pk).exists()
+        assert not CatalogueEntry.objects.filter(pk=items[1].pk).exists()
+
+    def test_rebuild(self):
+        CatalogueEntry.objects.all().delete()
+
+        assert CatalogueEntry.objects.rebuild() == 1
+        assert CatalogueEntry.objects.filter(pk=self.item.pk).exists()
+
+    def test_list_reads_single_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [row["id"] for row in response.data["results"]] == [str(self.item.id)]
+        assert response.data["results"][0]["owner_name"] == "Kim"
+        assert not [q for q in queries if "items_item" in q["sql"]]
+
+    def test_full_text_search(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(
+                name="Lamp", user=self.owner, status=ItemStatus.AVAILABLE
+            )
+
+        response = self.client.get(self.url, {"search": "bike"})
+        assert [row["name"] for row in response.data["results"]] == ["Red bike"]
+
+        response = self.client.get(self.url, {"search": "city -lamp"})
+        assert [row["name"] for row in response.data["results"]] == ["Red bike"]
+
+    def test_cursor_pagination(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(
+                name="Lamp", user=self.owner, status=ItemStatus.AVAILABLE
+            )
+
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert [row["name"] for row in response.data["results"]] == ["Lamp"]
+
+        response = self.client.get(response.data["next"])
+        assert [row["name"] for row in response.data["results"]] == ["Red bike"]
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=60)
+class ResponseCacheTestCase(TestCase):
+    """Test the tag invalidated cache of anonymous public responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.item = Item.objects.create(
+            name="Kayak",
+            user=self.owner,
+            status=ItemStatus.AVAILABLE,
+            category=CategoryType.SPORTS,
+        )
+        self.list_url = reverse("api:public-item-list")
+        self.detail_url = reverse("api:public-item-detail", kwargs={"id": self.item.id})
+
+    def get_names(self, params=None):
+        """Return the listed names and the number of queries on tables."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, params)
+        assert response.status_code == status.HTTP_200_OK
+        names = [row["name"] for row in response.json()["results"]]
+        # Savepoints of ATOMIC_REQUESTS are opened for hits as well
+        table_queries = [
+            q for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))
+        ]
+        return names, len(table_queries)
+
+    def test_hit_without_queries(self):
+        names, _ = self.get_names({"status": "2", "category": "sports"})
+        assert names == ["Kayak"]
+
+        # Same parameters in another order
+        names, queries = self.get_names({"category": "sports", "status": "2"})
+        assert names == ["Kayak"]
+        assert queries == 0
+
+        counters = metrics.get_counters(*response_cache.METRICS)
+        assert counters[response_cache.HITS_METRIC] >= 1
+
+    def test_saving_item_invalidates(self):
+        self.get_names()
+        self.item.name = "Sea kayak"
+        self.item.save()
+
+        names, queries = self.get_names()
+        assert names == ["Sea kayak"]
+        assert queries > 0
+
+    def test_other_category_keeps_cache(self):
+        self.get_names({"category": "sports"})
+        Item.objects.create(
+            name="Lamp",
+            user=self.owner,
+            status=ItemStatus.AVAILABLE,
+            category=CategoryType.FURNITURE,
+        )
+
+        _, queries = self.get_names({"category": "sports"})
+        assert queries == 0
+
+        self.item.category = CategoryType.FURNITURE
+        self.item.save()
+        names, _ = self.get_names({"category": "sports"})
+        assert names == []
+
+    def test_moved_item_invalidates_previous_category(self):
+        Item.objects.create(
+            name="Canoe",
+            user=self.owner,
+            status=ItemStatus.AVAILABLE,
+            category=CategoryType.SPORTS,
+        )
+        params = {"category": "sports", "pagination": "cursor", "page_size": 1}
+        response = self.client.get(self.list_url, {**params, "count": "true"})
+        assert response.json()["count"] == 2  # noqa: PLR2004
+
+        # The kayak is not on the cached page, only its count changes
+        item = Item.objects.get(pk=self.item.pk)
+        item.category = CategoryType.FURNITURE
+        item.save()
+
+        response = self.client.get(self.list_url, {**params, "count": "true"})
+        assert response.json()["count"] == 1
+
+    def test_image_invalidates_detail(self):
+        assert self.client.get(self.detail_url).json()["first_image"] is None
+        img_io = BytesIO()
+        PILImage.new("RGB", (20, 20)).save(img_io, format="JPEG")
+        Image.objects.create(
+            item=self.item,
+            original=SimpleUploadedFile("kayak.jpg", img_io.getvalue()),
+        )
+
+        assert self.client.get(self.detail_url).json()["first_image"]
+
+    def test_cached_etag(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_authenticated_not_cached(self):
+        self.get_names()
+        self.client.force_authenticate(user=self.owner)
+
+        _, queries = self.get_names()
+        assert queries > 0
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTestCase(TestCase):
+    """Test the `updated_since` change feed of items."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = ItemOwnerUserFactory()
+        self.client.force_authenticate(user=self.owner)
+        self.url = reverse("api:item-list")
+        self.since = timezone.now().isoformat()
+        self.kayak = Item.objects.create(name="Kayak", user=self.owner)
+        self.paddle = Item.objects.create(name="Paddle", user=self.owner)
+
+    def sync(self, since, **params):
+        response = self.client.get(self.url, {"updated_since": since, **params})
+        assert response.status_code == status.HTTP_200_OK, response.content
+        return response.data
+
+    def test_changes_and_deletions(self):
+        data = self.sync(self.since)
+        assert [row["name"] for row in data["results"]] == ["Kayak", "Paddle"]
+        assert data["deleted"] == []
+        assert data["has_more"] is False
+
+        self.kayak.name = "Sea kayak"
+        self.kayak.save()
+        paddle_id = str(self.paddle.pk)
+        self.paddle.delete()
+
+        data = self.sync(data["cursor"])
+        assert [row["name"] for row in data["results"]] == ["Sea kayak"]
+        assert data["deleted"] == [paddle_id]
+
+        data = self.sync(data["cursor"])
+        assert data["results"] == []
+        assert data["deleted"] == []
+
+    def test_deletions_of_visible_items_only(self):
+        other = Item.objects.create(name="Tent", user=ItemOwnerUserFactory())
+        sharer = ItemOwnerUserFactory()
+        shared = Item.objects.create(name="Canoe", user=sharer)
+        assign_perm("items.change_item", self.owner, shared)
+        shared_id = str(shared.pk)
+        other.delete()
+        shared.delete()
+
+        data = self.sync(self.since)
+        assert data["deleted"] == [shared_id]
+
+    def test_public_deletions(self):
+        public = Item.objects.create(
+            name="Tent", user=self.owner, status=ItemStatus.AVAILABLE
+        )
+        public_id = str(public.pk)
+        public.delete()
+        self.kayak.delete()
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(
+            reverse("api:public-item-list"), {"updated_since": self.since}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.content
+        assert response.data["deleted"] == [public_id]
+
+    def test_pages(self):
+        data = self.sync(self.since, page_size=1)
+        assert [row["name"] for row in data["results"]] == ["Kayak"]
+        assert data["has_more"] is True
+
+        data = self.sync(data["cursor"], page_size=1)
+        assert [row["name"] for row in data["results"]] == ["Paddle"]
+        assert data["has_more"] is False
+
+    def test_sparse_fields(self):
+        data = self.sync(self.since, fields="id")
+        assert data["results"][0] == {"id": str(self.kayak.pk)}
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"updated_since": "yesterday"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_naive_cursor(self):
+        naive = timezone.now().replace(tzinfo=None).isoformat()
+        cursor = base64.urlsafe_b64encode(
+            json.dumps([[naive, None], [naive, None]]).encode()
+        ).decode()
+
+        response = self.client.get(self.url, {"updated_since": cursor})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_expired_cursor(self):
+        since = timezone.now() - timedelta(
+            days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1
+        )
+
+        response = self.client.get(self.url, {"updated_since": since.isoformat()})
+        assert response.status_code == status.HTTP_410_GONE
+
+    def test_untracked_model(self):
+        response = self.client.get(
+            reverse("api:catalogue-list"), {"updated_since": self.since}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,58 @@
+"""Helpers for tests of lists showing item images."""
+
+from collections.abc import Callable
+from io import BytesIO
+from operator import itemgetter
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image as PILImage
+from rest_framework import status
+
+from bubble.items.models import Image, Item
+
+
+def create_image(item: Item, ordering: int = 0) -> Image:
+    """Create a small JPEG image of `item`."""
+    img_io = BytesIO()
+    PILImage.new("RGB", (20, 20)).save(img_io, format="JPEG")
+    return Image.objects.create(
+        item=item,
+        original=SimpleUploadedFile("item.jpg", img_io.getvalue()),
+        ordering=ordering,
+    )
+
+
+class ListQueriesMixin:
+    """Assert that lists load their rows in a constant number of queries."""
+
+    def count_queries(self, url: str, params: dict | None = None):
+        """Return the number of queries of a GET of `url` and its results."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)  # type: ignore[attr-defined]
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries), response.data["results"]
+
+    def assert_constant_queries(
+        self,
+        url: str,
+        create: Callable[[int], object],
+        first_image: Callable[[dict], object] = itemgetter("first_image"),
+    ) -> None:
+        """
+        Assert that `url` lists 2 and 7 rows in the same number of queries.
+
+        `create(count)` adds rows to the list, each with a first image that
+        `first_image` reads from its result. A first request warms up the
+        caches of the user, e.g. of the items shared with them.
+        """
+        create(2)
+        self.count_queries(url)
+        few, _ = self.count_queries(url)
+        create(5)
+        many, results = self.count_queries(url)
+
+        assert few == many
+        assert len(results) == 7  # noqa: PLR2004
+        assert all(first_image(result) for result in results)
@@ -1,11 +1,17 @@
 from rest_framework.routers import SimpleRouter
 
-from .api.views import ImageViewSet, ItemViewSet, PublicItemViewSet
+from .api.views import (
+    CatalogueViewSet,
+    ImageViewSet,
+    ItemViewSet,
+    PublicItemViewSet,
+)
 
 router = SimpleRouter()
 
 router.register("items", ItemViewSet, basename="item")
 router.register("public-items", PublicItemViewSet, basename="public-item")
 router.register("images", ImageViewSet, basename="image")
+router.register("catalogue", CatalogueViewSet, basename="catalogue")
 
 urlpatterns = router.urls
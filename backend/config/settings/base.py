@@ -120,6 +120,7 @@ AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend",
     "guardian.backends.ObjectPermissionBackend",
+    "bubble.items.permissions.OwnerPermissionBackend",
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-user-model
 # or "users.User"
@@ -155,6 +156,9 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "allow_cidr.middleware.AllowCIDRMiddleware",
+    "bubble.core.monitoring.MetricsMiddleware",
+    "bubble.core.tracing.TracingMiddleware",
+    "bubble.core.slow_queries.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -167,6 +171,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
+    "bubble.core.profiling.ProfilingMiddleware",
 ]
 
 # STATIC
@@ -189,6 +194,9 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# Derivatives are stored below the full name of their original, which the
+# media garbage collector looks up, see bubble/items/storage.py
+IMAGEKIT_SPEC_CACHEFILE_NAMER = "bubble.items.storage.cachefile_name"
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -474,6 +482,93 @@ SPECTACULAR_SETTINGS = {
 
 DEFAULT_CURRENCY = env("DEFAULT_CURRENCY", default="EUR")
 
+# Maximum Hamming distance between perceptual hashes of two images that are
+# still considered near-duplicates (out of 64 bits)
+ITEM_IMAGE_DUPLICATE_DISTANCE = env.int("ITEM_IMAGE_DUPLICATE_DISTANCE", default=6)
+
+# Store item image originals by content hash, so identical uploads share one
+# file and one set of generated thumbnails
+ITEM_IMAGES_CONTENT_ADDRESSED = env.bool("ITEM_IMAGES_CONTENT_ADDRESSED", default=False)
+
+# Maximum number of images uploaded to an item in a single request
+ITEM_IMAGES_BULK_MAX = env.int("ITEM_IMAGES_BULK_MAX", default=20)
+
+# Maximum number of items created or updated in a single request
+ITEMS_BULK_MAX = env.int("ITEMS_BULK_MAX", default=1000)
+
+# PostgreSQL text search configuration of the public catalogue search
+CATALOGUE_SEARCH_CONFIG = env("CATALOGUE_SEARCH_CONFIG", default="simple")
+
+# Seconds anonymous API responses are cached at most. Signals invalidate them
+# when the data they show changes, 0 disables the response cache.
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=60 * 60 * 24)
+
+# Models whose deletions delta sync clients receive as tombstones, see
+# bubble.core.api.pagination.DeltaPagination
+SYNC_MODELS = ["items.Item", "books.Book", "bookings.Booking", "bookings.Message"]
+
+# Days tombstones are kept, clients with older cursors must reload everything
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int("SYNC_TOMBSTONE_RETENTION_DAYS", default=30)
+
+# Seconds of changes every delta sync response repeats, as transactions that are
+# still running commit rows modified before the response
+SYNC_OVERLAP_SECONDS = env.int("SYNC_OVERLAP_SECONDS", default=30)
+
+# Bearer token required to read /metrics, e.g. when the port is reachable from
+# outside the cluster. Empty to allow anyone reaching the backend directly,
+# unless METRICS_REQUIRE_TOKEN is set as in production.
+METRICS_BEARER_TOKEN = env("METRICS_BEARER_TOKEN", default="")
+METRICS_REQUIRE_TOKEN = False
+# Port Celery workers serve their Prometheus metrics on, 0 to disable
+METRICS_WORKER_PORT = env.int("METRICS_WORKER_PORT", default=0)
+
+# Tracing of requests, signal receivers, Celery tasks and external calls, see
+# bubble/core/tracing.py: "file", "otlp" or empty to disable it
+TRACING_EXPORTER = env("TRACING_EXPORTER", default="")
+# Share of requests and tasks traced, unless a traceparent header decides
+TRACING_SAMPLE_RATE = env.float("TRACING_SAMPLE_RATE", default=0.01)
+# JSON lines file of the "file" exporter
+TRACING_FILE = env("TRACING_FILE", default="traces.jsonl")
+# OTLP/HTTP endpoint of the "otlp" exporter, e.g. of an OpenTelemetry collector
+TRACING_OTLP_ENDPOINT = env(
+    "TRACING_OTLP_ENDPOINT", default="http://localhost:4318/v1/traces"
+)
+TRACING_SERVICE_NAME = env("TRACING_SERVICE_NAME", default="bubble")
+# Spans waiting for export per process, further ones are dropped
+TRACING_QUEUE_SIZE = env.int("TRACING_QUEUE_SIZE", default=2048)
+
+# Milliseconds from which SQL statements are recorded as slow queries, see
+# bubble/core/slow_queries.py, 0 to disable recording
+SLOW_QUERY_THRESHOLD_MS = env.float("SLOW_QUERY_THRESHOLD_MS", default=200)
+# Share of slow SELECT statements explained with EXPLAIN (ANALYZE, BUFFERS)
+SLOW_QUERY_EXPLAIN_RATE = env.float("SLOW_QUERY_EXPLAIN_RATE", default=0.1)
+# Seconds before the plan of a slow query is captured again
+SLOW_QUERY_EXPLAIN_INTERVAL = env.int("SLOW_QUERY_EXPLAIN_INTERVAL", default=60 * 60)
+# Milliseconds an EXPLAIN ANALYZE may run, as it executes the statement again
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = env.int("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", default=10000)
+
+# On-demand profiling of single requests and WebSocket connections, see
+# bubble/core/profiling.py. Disabled, it adds no work to any request.
+REQUEST_PROFILING = env.bool("REQUEST_PROFILING", default=False)
+# Seconds between two stack samples of a profiled request
+REQUEST_PROFILING_INTERVAL = env.float("REQUEST_PROFILING_INTERVAL", default=0.001)
+# Seconds tokens of `manage.py profile_token` are accepted
+REQUEST_PROFILING_TOKEN_MAX_AGE = env.int(
+    "REQUEST_PROFILING_TOKEN_MAX_AGE", default=60 * 60
+)
+
+# Seconds the ids of items shared with a user are cached. Changes to permission
+# rows invalidate the cache, the timeout covers bulk changes without signals.
+ITEM_PERMISSION_CACHE_TIMEOUT = env.int("ITEM_PERMISSION_CACHE_TIMEOUT", default=300)
+
+# Media garbage collection, see bubble/core/storage_gc.py. The weekly task
+# only reports orphaned files unless MEDIA_GC_DELETE is enabled.
+MEDIA_GC_DELETE = env.bool("MEDIA_GC_DELETE", default=False)
+MEDIA_GC_BATCH_SIZE = env.int("MEDIA_GC_BATCH_SIZE", default=500)
+# Files younger than this may belong to uploads that are not committed yet
+MEDIA_GC_MIN_AGE_HOURS = env.int("MEDIA_GC_MIN_AGE_HOURS", default=24)
+MEDIA_GC_BATCH_SLEEP = env.float("MEDIA_GC_BATCH_SLEEP", default=0.0)
+
 CONSTANCE_ADDITIONAL_FIELDS = {
     "item_visibility": [
         "django.forms.fields.ChoiceField",
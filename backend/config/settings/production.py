@@ -59,6 +59,11 @@ CONSTANCE_BACKEND = "constance.backends.database.DatabaseBackend"
 CONSTANCE_DATABASE_CACHE_BACKEND = "default"
 
 
+# METRICS
+# ------------------------------------------------------------------------------
+# /metrics is closed until METRICS_BEARER_TOKEN is set
+METRICS_REQUIRE_TOKEN = True
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#secure-proxy-ssl-header
@@ -37,3 +37,10 @@ MEDIA_URL = "http://media.testserver/"
 # ------------------------------------------------------------------------------
 
 CONSTANCE_BACKEND = "constance.backends.database.DatabaseBackend"
+
+# The cache outlives the test transactions, tests enable it when needed
+RESPONSE_CACHE_TIMEOUT = 0
+# Slow queries are recorded outside of the test transactions
+SLOW_QUERY_THRESHOLD_MS = 0
+# Tasks run in the process, tests run callbacks of commits when needed
+CELERY_TASK_ALWAYS_EAGER = True
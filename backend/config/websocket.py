@@ -6,6 +6,7 @@ from django.core.asgi import get_asgi_application
 from django.urls import path
 
 from bubble.core.consumers import NotificationConsumer
+from bubble.core.profiling import profile_consumers
 
 # Define WebSocket URL patterns
 websocket_urlpatterns = [
@@ -16,6 +17,8 @@ websocket_urlpatterns = [
 application = ProtocolTypeRouter(
     {
         "http": get_asgi_application(),
-        "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+        "websocket": AuthMiddlewareStack(
+            profile_consumers(URLRouter(websocket_urlpatterns))
+        ),
     }
 )